@@ -0,0 +1,95 @@
+# fuzzy_matcher_benchmark.py times fuzzy completion per keystroke on a large vocabulary
+#
+# Run from the repository root:  python -m benchmarks.fuzzy_matcher_benchmark [--words FILE] [--size N]
+
+import argparse
+import gc
+import heapq
+import random
+import statistics
+import sys
+import time
+
+from src.managers.fuzzy_matcher import FuzzyMatcher, score, subsequence_pattern
+
+# Sub-words the synthetic identifiers are made of
+SYLLABLES = ['get', 'set', 'user', 'name', 'id', 'config', 'load', 'save', 'file', 'path', 'http', 'request',
+             'handler', 'manager', 'index', 'buffer', 'text', 'widget', 'flare', 'search', 'token', 'parse',
+             'render', 'cache', 'item', 'list', 'map', 'value', 'key', 'node', 'palette', 'theme', 'link',
+             'document', 'editor', 'keyword', 'line', 'offset', 'match', 'result', 'query', 'window', 'pool']
+
+# Queries typed one character at a time: abbreviations, camel-case initials and plain prefixes
+QUERIES = ['hndlr', 'getUN', 'gun', 'usrnm', 'cfgld', 'fsearch', 'tokpar', 'docEd', 'kwmatch', 'lnoff',
+           'rndcch', 'pltthm', 'srchres', 'qrywin', 'bufidx', 'flrlnk', 'xyz', 'httpreq']
+
+
+def synthetic_vocabulary(size, seed=7):
+    """ `size` distinct identifiers in camelCase and snake_case, some with numeric suffixes. """
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        parts = [rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4))]
+        word = parts[0] + ''.join(part.capitalize() for part in parts[1:]) if rng.random() < 0.5 else '_'.join(parts)
+        if rng.random() < 0.3:
+            word += str(rng.randint(0, 999))
+        words.add(word)
+    return sorted(words)
+
+
+def brute_force(words, query, k):
+    """ Scores of the `k` best words for a query, every matching word scored. """
+    pattern = subsequence_pattern(query.lower())
+    scores = (score(query.lower(), word) for word in words if pattern.search(word.lower()))
+    return heapq.nlargest(k, (value for value in scores if value is not None))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--words', help='Vocabulary file, one word per line (default: synthetic identifiers)')
+    parser.add_argument('--size', type=int, default=200_000, help='Size of the synthetic vocabulary')
+    parser.add_argument('--k', type=int, default=10, help='Results per lookup')
+    parser.add_argument('--budget-ms', type=float, default=10.0, help='Per-keystroke budget to check against')
+    args = parser.parse_args()
+
+    if args.words:
+        with open(args.words, encoding='utf-8') as file:
+            words = [line.strip() for line in file if line.strip()]
+    else:
+        words = synthetic_vocabulary(args.size)
+    started = time.perf_counter()
+    matcher = FuzzyMatcher(words)
+    print(f'{len(words)} words indexed in {time.perf_counter() - started:.2f} s')
+
+    timings = []
+    agree_top, agree_all = 0, 0
+    for query in QUERIES:
+        per_query = []
+        gc.disable()  # As timeit does: a collection triggered by earlier allocations is not this keystroke's cost
+        try:
+            for end in range(1, len(query) + 1):
+                started = time.perf_counter()
+                results = matcher.match(query[:end], args.k)
+                per_query.append((time.perf_counter() - started) * 1000)
+        finally:
+            gc.enable()
+        timings.extend(per_query)
+        # The pruned ranking against scoring every word
+        expected = brute_force(words, query, args.k)
+        found = [value for value, _ in results]
+        agree_top += found[:1] == expected[:1]
+        agree_all += found == expected
+        top = ', '.join(word for _, word in results[:3])
+        missed = '' if found[:1] == expected[:1] else f'  (best score by brute force: {expected[0]:.2f})'
+        print(f'{query:>10}: worst keystroke {max(per_query):6.2f} ms  -> {top}{missed}')
+
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f'{len(timings)} keystrokes: mean {statistics.mean(timings):.2f} ms, p95 {p95:.2f} ms, '
+          f'max {timings[-1]:.2f} ms (budget {args.budget_ms:.0f} ms)')
+    print(f'Brute force agrees on the best match for {agree_top}/{len(QUERIES)} queries, '
+          f'on the top {args.k} scores for {agree_all}/{len(QUERIES)}')
+    return 0 if timings[-1] <= args.budget_ms else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
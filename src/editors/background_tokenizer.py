@@ -0,0 +1,156 @@
+# background_tokenizer.py tokenizes buffer snapshots off the Tk main thread and streams the results back in chunks
+
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+
+def tokenize_lines(tokenizer, lines, state):
+    """
+    Tokenizes consecutive lines starting from a lexer state. Module level so worker processes can run it.
+    Returns:
+        tuple: (per-line span lists, per-line end states)
+    """
+    line_spans, end_states = [], []
+    for line_text in lines:
+        spans, state = tokenizer.tokenize_line(line_text, state)
+        line_spans.append(spans)
+        end_states.append(state)
+    return line_spans, end_states
+
+
+def iter_line_chunks(text, chunk_lines):
+    """
+    Splits text into lists of at most `chunk_lines` lines without splitting the whole text at once,
+    so no single call holds the interpreter for long on very large snapshots.
+    """
+    position = 0
+    while True:
+        end = position
+        for _ in range(chunk_lines):
+            end = text.find('\n', end)
+            if end == -1:
+                break
+            end += 1
+        if end == -1:
+            yield text[position:].split('\n')
+            return
+        yield text[position:end - 1].split('\n')
+        position = end
+
+
+class BackgroundTokenizer:
+    """
+    Hands buffer snapshots to a worker thread (or a process pool) that tokenizes them chunk by chunk.
+    Results are queued and drained on the main thread by an `after()` poll within a small time budget.
+    Every snapshot gets a version number; results from a superseded snapshot are dropped unseen.
+    Parameters:
+        text_widget (tk.Text): Widget used for scheduling the drain on the Tk event loop.
+        tokenizer (CombinedTokenizer): The tokenizer to run; it must be picklable for process mode.
+        on_chunk (callable): on_chunk(first_line, line_spans, end_states, start_state) on the main thread.
+        chunk_lines (int): Number of lines per result chunk.
+        use_processes (bool): Tokenize chunks in parallel worker processes instead of one worker thread.
+        poll_ms (int): Delay between drains of the result queue.
+        budget_ms (float): Maximum time spent applying results per drain.
+    """
+    def __init__(self, text_widget, tokenizer, on_chunk, chunk_lines=2000, use_processes=False,
+                 poll_ms=10, budget_ms=8.0):
+        self.text_widget = text_widget
+        self.tokenizer = tokenizer
+        self.on_chunk = on_chunk
+        self.chunk_lines = chunk_lines
+        self.use_processes = use_processes
+        self.poll_ms = poll_ms
+        self.budget = budget_ms / 1000.0
+        self.version = 0
+        self.active = False
+        self.results = queue.Queue()
+        self._thread_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='heatup-tokenizer')
+        self._process_pool = None
+        self._poll_id = None
+
+    def submit(self, text, first_line=1, start_state=None):
+        """
+        Starts tokenizing a snapshot, superseding any snapshot still in flight.
+        Parameters:
+            text (str): The snapshot, starting at the beginning of `first_line`.
+            first_line (int): The buffer line the snapshot starts on.
+            start_state: Lexer state at the end of the line before `first_line`.
+        Returns:
+            int: The version number of this snapshot.
+        """
+        self.version += 1
+        self.active = True
+        worker = self._run_in_processes if self.use_processes else self._run_in_thread
+        self._thread_pool.submit(worker, self.version, text, first_line, start_state)
+        if self._poll_id is None:
+            self._poll_id = self.text_widget.after(self.poll_ms, self._drain)
+        return self.version
+
+    def cancel(self):
+        """ Supersedes the snapshot in flight; its remaining results are discarded. """
+        self.version += 1
+        self.active = False
+
+    def shutdown(self):
+        """ Cancels outstanding work and stops the worker pools. """
+        self.cancel()
+        self._thread_pool.shutdown(wait=False, cancel_futures=True)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run_in_thread(self, version, text, first_line, state):
+        # Lex chunks in order so each one starts from the true end state of the previous chunk
+        line = first_line
+        for lines in iter_line_chunks(text, self.chunk_lines):
+            if version != self.version:
+                return
+            start_state = state
+            line_spans, end_states = tokenize_lines(self.tokenizer, lines, state)
+            self.results.put((version, line, line_spans, end_states, start_state))
+            state = end_states[-1]
+            line += len(lines)
+        self.results.put((version, None, None, None, None))
+
+    def _run_in_processes(self, version, text, first_line, state):
+        # Chunks are lexed in parallel; all but the first assume the default state, which the receiver verifies
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor()
+        futures = []
+        line = first_line
+        for lines in iter_line_chunks(text, self.chunk_lines):
+            if version != self.version:
+                return
+            future = self._process_pool.submit(tokenize_lines, self.tokenizer, lines, state)
+            future.add_done_callback(lambda done, line=line, start_state=state:
+                                     self._collect(done, version, line, start_state))
+            futures.append(future)
+            line += len(lines)
+            state = None
+        wait(futures)
+        self.results.put((version, None, None, None, None))
+
+    def _collect(self, future, version, first_line, start_state):
+        # Queue the result of one process-pool chunk unless it was cancelled or failed
+        if future.cancelled() or future.exception() is not None:
+            return
+        line_spans, end_states = future.result()
+        self.results.put((version, first_line, line_spans, end_states, start_state))
+
+    def _drain(self):
+        """ Applies queued results on the main thread until the time budget for this poll is used. """
+        self._poll_id = None
+        deadline = time.perf_counter() + self.budget
+        while time.perf_counter() < deadline:
+            try:
+                version, first_line, line_spans, end_states, start_state = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if version != self.version:
+                continue  # Result of a superseded snapshot
+            if first_line is None:
+                self.active = False
+                continue
+            self.on_chunk(first_line, line_spans, end_states, start_state)
+        if self.active or not self.results.empty():
+            self._poll_id = self.text_widget.after(self.poll_ms, self._drain)
@@ -0,0 +1,155 @@
+# edit_tracker.py reports every buffer edit made to a Tk Text widget as a compact line delta
+
+
+class EditDelta:
+    """
+    Describes a single edit applied to the text buffer.
+    Parameters:
+        op (str): Either 'insert' or 'delete'.
+        start (tuple): (line, col) where the edit begins, resolved before the edit.
+        end (tuple): (line, col) where the edit ended before it was applied (equal to start for inserts).
+        text (str): The inserted text, or the text that was removed.
+    """
+    __slots__ = ('op', 'start', 'end', 'text')
+
+    def __init__(self, op, start, end, text):
+        self.op = op
+        self.start = start
+        self.end = end
+        self.text = text
+
+    @property
+    def first_line(self):
+        """ The first buffer line touched by the edit. """
+        return self.start[0]
+
+    @property
+    def lines_removed(self):
+        """ Number of newline characters removed by the edit. """
+        return self.end[0] - self.start[0]
+
+    @property
+    def lines_added(self):
+        """ Number of newline characters added by the edit. """
+        return self.text.count('\n') if self.op == 'insert' else 0
+
+    def __repr__(self):
+        return f"EditDelta(op='{self.op}', start={self.start}, end={self.end}, text={self.text[:20]!r})"
+
+
+class EditTracker:
+    """
+    Intercepts insert/delete/replace calls on a Text widget by renaming its Tcl command, so that listeners
+    receive an EditDelta for every change no matter whether it came from typing, undo or program code.
+    A widget can only be tracked once, as its command can only be renamed once: components following the
+    same widget share its tracker through `for_widget`.
+    Parameters:
+        text_widget (tk.Text): The widget whose edits should be tracked.
+    """
+    def __init__(self, text_widget):
+        if getattr(text_widget, '_edit_tracker', None) is not None:
+            raise ValueError(f'{text_widget} already has an EditTracker; share it through EditTracker.for_widget')
+        self.text_widget = text_widget
+        self.listeners = []
+        self.paused = False  # While set, edits pass straight through without producing deltas
+        self._widget_cmd = text_widget._w  # The Tcl path name; subclasses may override __str__
+        self._orig_cmd = self._widget_cmd + '_orig'
+        text_widget.tk.call('rename', self._widget_cmd, self._orig_cmd)
+        text_widget.tk.createcommand(self._widget_cmd, self._proxy)
+        text_widget._edit_tracker = self
+
+    @classmethod
+    def for_widget(cls, text_widget):
+        """ The widget's tracker, installed on first request. """
+        tracker = getattr(text_widget, '_edit_tracker', None)
+        if tracker is None:
+            tracker = cls(text_widget)
+        return tracker
+
+    def add_listener(self, callback):
+        """ Registers a callable receiving an EditDelta after each applied edit. """
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """ Unregisters a previously added listener. """
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def pause(self):
+        """
+        Stops publishing deltas, for batch edits that report their combined effect through `publish` afterwards.
+        """
+        self.paused = True
+
+    def resume(self):
+        """ Publishes deltas again after `pause`. """
+        self.paused = False
+
+    def publish(self, delta):
+        """ Hands a delta to every listener, e.g. the summary of a batch made while paused. """
+        for listener in list(self.listeners):
+            listener(delta)
+
+    def _call(self, *args):
+        # Talk to the real widget command, bypassing the proxy
+        return self.text_widget.tk.call((self._orig_cmd,) + args)
+
+    def _position(self, index):
+        # Resolve an index to a (line, col) tuple, clamping 'end' to the last editable position
+        resolved = self._call('index', index)
+        if self._call('compare', resolved, '==', 'end'):
+            resolved = self._call('index', 'end-1c')
+        line, col = str(resolved).split('.')
+        return int(line), int(col)
+
+    def _proxy(self, cmd, *args):
+        """ Forwards every widget command and publishes deltas for the ones that change the buffer. """
+        if self.paused or cmd not in ('insert', 'delete', 'replace') \
+                or str(self._call('cget', '-state')) == 'disabled':  # Tk ignores edits of a disabled widget
+            return self._call(cmd, *args)
+        deltas = []
+        if cmd == 'insert' and len(args) >= 2:
+            start = self._position(args[0])
+            # Inserted chunks are interleaved with optional tag lists: index chars ?tagList chars tagList ...?
+            text = ''.join(str(chunk) for chunk in args[1::2])
+            deltas.append(EditDelta('insert', start, start, text))
+        elif cmd == 'delete' and args:
+            deltas.extend(self._delete_deltas(args))
+        elif cmd == 'replace' and len(args) >= 3:
+            deleted = self._delete_delta(args[0], args[1])
+            text = ''.join(str(chunk) for chunk in args[2::2])
+            deltas.extend([deleted, EditDelta('insert', deleted.start, deleted.start, text)])
+
+        result = self._call(cmd, *args)
+        for delta in deltas:
+            if delta.op == 'delete' and not delta.text:
+                continue
+            self.publish(delta)
+        return result
+
+    def _delete_deltas(self, indices):
+        # `delete i1 i2 i3 i4 ...` removes several ranges: like Tk, merge the overlapping ones and take them
+        # last to first, so each delta's positions hold once the ones before it are applied
+        spans = []
+        for i in range(0, len(indices), 2):
+            start = self._position(indices[i])
+            end = self._position(indices[i + 1]) if i + 1 < len(indices) else self._position(f'{indices[i]}+1c')
+            if end > start:
+                spans.append([start, end])
+        spans.sort()
+        merged = []
+        for span in spans:
+            if merged and span[0] <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], span[1])
+            else:
+                merged.append(span)
+        return [self._delete_delta(f'{start[0]}.{start[1]}', f'{end[0]}.{end[1]}') for start, end in reversed(merged)]
+
+    def _delete_delta(self, index1, index2):
+        # Capture the span and the text about to be removed while it still exists
+        start = self._position(index1)
+        end = self._position(index2) if index2 is not None else self._position(f'{index1}+1c')
+        if end <= start:
+            return EditDelta('delete', start, start, '')
+        text = str(self._call('get', f'{start[0]}.{start[1]}', f'{end[0]}.{end[1]}'))
+        return EditDelta('delete', start, end, text)
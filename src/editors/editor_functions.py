@@ -1,27 +1,39 @@
 # Advanced Editor Functionality
+from src.editors.edit_tracker import EditTracker
+
+
 class EditorFunctions:
-    def __init__(self, root, text_widget):
+    def __init__(self, root, text_widget, edit_tracker=None):
         """
         Adds an array of advanced functionalities to the main editor
         Parameters:
             root (tk.Tk): The Tkinter root object
             text_widget (tk.Text): The main text editor widget
+            edit_tracker (EditTracker): The widget's tracker, keeping hyperlinks in step with edits; the
+                widget's shared one if omitted
         """
         self.root = root
         self.text_widget = text_widget
+        if edit_tracker is None:
+            edit_tracker = EditTracker.for_widget(text_widget)
         self.flare_widgets = {}
         self.theme_manager = PaletteManager()
-        self.cross_linking_manager = CrossLinkingManager(self.text_widget, self.flare_widgets)
+        self.cross_linking_manager = CrossLinkingManager(self.text_widget, self.flare_widgets, edit_tracker)
+        # Every hyperlink shares one tag, styled once
+        self.text_widget.tag_config(self.cross_linking_manager.links.tag,
+                                    foreground=self.theme_manager.base_colors['dark_red'])
 
     def handle_hyperlink_event(self, event):
-        # Get the word where the event occurred and create or raise the Flare Widget
+        # Follow the link under the mouse, or link the word there, then create or raise its Flare Widget
         mouse_index = self.text_widget.index("@%d,%d" % (event.x, event.y))
-        selected_word = self.text_widget.get(mouse_index, f"{mouse_index} wordend")
-        self.cross_linking_manager.insert_link(mouse_index, f"{mouse_index} wordend", selected_word)
-        # Apply the color for the hyperlink
-        self.text_widget.tag_config(selected_word, foreground=self.theme_manager.base_colors['dark_red'])
+        keyword = self.cross_linking_manager.links.keyword_at(mouse_index)
+        if keyword is None:
+            keyword = self.text_widget.get(mouse_index, f"{mouse_index} wordend")
+            if not keyword.strip():
+                return
+            self.cross_linking_manager.insert_link(mouse_index, f"{mouse_index} wordend", keyword)
         # Open or raise the Flare Widget for extensive editing
-        self.cross_linking_manager.link_to_flare(selected_word)
+        self.cross_linking_manager.link_to_flare(keyword)
 
     def setup_advanced_bindings(self):
         # Bind advanced editor functions like hyperlink event
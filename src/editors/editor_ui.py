@@ -8,6 +8,7 @@ from tkinter.ttk import Frame, Button, Label, Style
 from src.widgets.document_widget import DocumentWidget
 from src.widgets.flare_widget import FlareWidget
 from src.editors.syntax_highlighter import SyntaxHighlighter
+from src.managers.trigram_index import default_index
 from src.editora_configuration import EditorConfiguration
 
 
@@ -19,6 +20,7 @@ class EditorUI(Frame):
         super().__init__(master)
         self.initUI()
         self.palette = palette
+        self.syntax_highlighter = None  # Created on the first file open
         self.config(bg=self.palette['secondary'])  # Set the editor's bg color to a HEAT color
         self.pack(fill=tk.BOTH, expand=True)
         self.create_widgets()
@@ -109,6 +111,7 @@ class EditorUI(Frame):
         if file_path:
             with open(file_path, 'w') as f:
                 f.write(self.text_area.get(1.0, tk.END))
+            default_index().index_file_async(file_path)
 
     def initUI(self):
         """
@@ -188,8 +191,14 @@ class EditorUI(Frame):
         """
         file_path = filedialog.askopenfilename()
         with open(file_path, 'r') as file:
+            content = file.read()
             self.text_area.delete('1.0', END)
-            self.text_area.insert('1.0', file.read())
+            self.text_area.insert('1.0', content)
+        # Cached highlighting of the same content is applied at once instead of re-lexing the file
+        if self.syntax_highlighter is None:
+            self.syntax_highlighter = SyntaxHighlighter(self.text_area, self.palette)
+        self.syntax_highlighter.set_grammar_for_path(file_path)
+        self.syntax_highlighter.highlight_content(content)
 
     def on_save(self):
         """
@@ -0,0 +1,132 @@
+# grammar_registry.py maps file extensions to language grammars that are loaded and compiled only when first needed
+
+import json
+import os
+import re
+from functools import reduce
+
+from src.editors.tokenizer import CombinedTokenizer
+
+GRAMMAR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'grammars')
+
+
+class Grammar:
+    """
+    A language definition read from a grammar file: ordered single-line rules, multi-line rules and tag styles.
+    Style colors name palette entries (or are literal colors) and are resolved against the editor's palette.
+    Parameters:
+        name (str): The grammar's name, e.g. 'python'.
+        rules (list): Ordered (tag, regex) pairs; earlier rules win ties.
+        multiline_rules (list): (tag, open_regex, close_regex) triples.
+        styles (dict): tag -> style options ('foreground', 'background', 'font_style').
+        flags (int): Regular expression flags for every rule.
+    """
+    def __init__(self, name, rules, multiline_rules=(), styles=None, flags=0):
+        self.name = name
+        self.rules = list(rules)
+        self.multiline_rules = list(multiline_rules)
+        self.styles = styles or {}
+        self.flags = flags
+
+    @classmethod
+    def from_file(cls, path):
+        """ Reads a grammar from its JSON definition. """
+        with open(path, 'r', encoding='utf-8') as file:
+            definition = json.load(file)
+        styles = {}
+        for rule in definition.get('rules', []) + definition.get('multiline_rules', []):
+            styles.setdefault(rule['tag'], rule.get('style', {}))
+        flags = reduce(lambda combined, flag: combined | getattr(re, flag), definition.get('flags', []), 0)
+        return cls(definition['name'],
+                   [(rule['tag'], rule['regex']) for rule in definition.get('rules', [])],
+                   [(rule['tag'], rule['open'], rule['close']) for rule in definition.get('multiline_rules', [])],
+                   styles, flags)
+
+    def compile(self):
+        """ Builds the single-pass tokenizer for this grammar. """
+        return CombinedTokenizer(self.rules, self.flags, self.multiline_rules)
+
+    def syntax_rules(self, palette):
+        """
+        The grammar in the highlighter's rule format: tag -> {'regex': ..., 'style': {...}}, with colors
+        looked up in `palette`.
+        """
+        regexes = {}
+        for tag, regex in self.rules:
+            regexes.setdefault(tag, regex)
+        for tag, opener, _ in self.multiline_rules:
+            regexes.setdefault(tag, opener)
+        rules = {}
+        for tag, regex in regexes.items():
+            style = {option: palette.get(value, value) if option in ('foreground', 'background') else value
+                     for option, value in self.styles.get(tag, {}).items()}
+            rules[tag] = {'regex': regex, 'style': style}
+        return rules
+
+
+class GrammarRegistry:
+    """
+    Knows which grammar handles which file extension from a small index file, and reads, parses and compiles
+    a grammar the first time a file of that language is opened. Parsed grammars and compiled tokenizers are
+    kept, so every later file of the same language reuses them.
+    Parameters:
+        grammar_dir (str): Directory holding index.json and the grammar files.
+    """
+    def __init__(self, grammar_dir=GRAMMAR_DIR):
+        self.grammar_dir = grammar_dir
+        self._files = None  # grammar name -> file, read from the index on first lookup
+        self._extensions = None  # lower-case extension -> grammar name
+        self._grammars = {}
+        self._tokenizers = {}
+
+    def register(self, grammar, extensions=()):
+        """
+        Adds (or replaces) a grammar defined in code.
+        Parameters:
+            grammar (Grammar): The grammar to register.
+            extensions (iterable): File extensions, with their leading dot, handled by the grammar.
+        """
+        self._read_index()
+        self._grammars[grammar.name] = grammar
+        self._tokenizers.pop(grammar.name, None)
+        for extension in extensions:
+            self._extensions[extension.lower()] = grammar.name
+
+    def names(self):
+        """ Names of every known grammar, loaded or not. """
+        self._read_index()
+        return sorted(set(self._files) | set(self._grammars))
+
+    def name_for_path(self, path):
+        """ Name of the grammar handling `path`, or None when its extension is unknown. """
+        self._read_index()
+        return self._extensions.get(os.path.splitext(path)[1].lower())
+
+    def grammar(self, name):
+        """ The parsed grammar called `name`, loading its file on first use. Raises KeyError if unknown. """
+        if name not in self._grammars:
+            self._read_index()
+            self._grammars[name] = Grammar.from_file(os.path.join(self.grammar_dir, self._files[name]))
+        return self._grammars[name]
+
+    def tokenizer(self, name):
+        """ The compiled tokenizer of grammar `name`, compiled once and shared by every highlighter. """
+        if name not in self._tokenizers:
+            self._tokenizers[name] = self.grammar(name).compile()
+        return self._tokenizers[name]
+
+    def _read_index(self):
+        # Only the index is read up front; grammar files wait until their language is needed
+        if self._files is not None:
+            return
+        self._files, self._extensions = {}, {}
+        with open(os.path.join(self.grammar_dir, 'index.json'), 'r', encoding='utf-8') as file:
+            index = json.load(file)
+        for name, entry in index.items():
+            self._files[name] = entry['file']
+            for extension in entry.get('extensions', []):
+                self._extensions[extension.lower()] = name
+
+
+# Shared registry, so a grammar is compiled once however many editors use it
+grammar_registry = GrammarRegistry()
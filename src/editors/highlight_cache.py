@@ -0,0 +1,173 @@
+# highlight_cache.py keeps finished highlighting on disk, keyed by content hash, so reopened files are tagged at once
+
+import hashlib
+import json
+import os
+import sys
+import zlib
+from array import array
+
+# Bumped whenever the on-disk layout changes, so entries written by older versions are never misread
+CACHE_FORMAT = 1
+
+
+def content_key(content, rules_version, palette_version):
+    """
+    Builds the cache key for a buffer: highlighting is only reusable for the same text, lexed by the same rules
+    and styled with the same palette.
+    Parameters:
+        content (str): The full buffer text.
+        rules_version (str): Fingerprint of the syntax rules that produced the spans.
+        palette_version (str): Fingerprint of the palette the tags are styled with.
+    """
+    digest = hashlib.sha256()
+    digest.update(f'{CACHE_FORMAT}\0{rules_version}\0{palette_version}\0'.encode('utf-8'))
+    digest.update(content.encode('utf-8', 'surrogatepass'))
+    return digest.hexdigest()
+
+
+def fingerprint(value):
+    """ Short stable hash of a repr-able value, used for rule-set and palette versions. """
+    return hashlib.sha1(repr(value).encode('utf-8')).hexdigest()[:16]
+
+
+class HighlightCache:
+    """
+    Stores the spans and end-of-line lexer states of fully highlighted buffers as compact, zlib-compressed arrays.
+    Each entry is one file named after its key; a hit refreshes the file's modification time, and when the
+    total size exceeds `max_bytes` the least recently used entries are deleted first.
+    Parameters:
+        cache_dir (str): Directory holding the entries, defaults to ~/.heatup/highlight_cache.
+        max_bytes (int): Upper bound on the total size of all entries.
+    """
+    def __init__(self, cache_dir=None, max_bytes=64 * 1024 * 1024):
+        self.cache_dir = cache_dir or os.path.join(os.path.expanduser('~'), '.heatup', 'highlight_cache')
+        self.max_bytes = max_bytes
+
+    def load(self, key):
+        """
+        Reads an entry back.
+        Returns:
+            tuple: (spans_by_tag, line_states) where spans_by_tag maps tag -> [(line, start_col, end_line, end_col)],
+            or None when the entry is missing or unreadable; an unreadable entry is deleted.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+        except OSError:
+            return None
+        try:
+            entry = self._decode(zlib.decompress(data))
+        except Exception:  # Corrupt, truncated or foreign: whatever the decoder tripped on, it is a miss
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)  # Mark as recently used for eviction
+        except OSError:
+            pass
+        return entry
+
+    def store(self, key, spans_by_tag, line_states):
+        """
+        Writes an entry and evicts old ones if the cache grew past its size limit.
+        Parameters:
+            key (str): Key from `content_key`.
+            spans_by_tag (dict): tag -> iterable of (line, start_col, end_line, end_col) spans.
+            line_states (list): End-of-line lexer state per line: None or the index of an open multi-line rule.
+        """
+        payload = zlib.compress(self._encode(spans_by_tag, line_states))
+        path = self._path(key)
+        temporary = f'{path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(temporary, 'wb') as file:
+                file.write(payload)
+            os.replace(temporary, path)  # Readers never see a half-written entry
+        except OSError:
+            return
+        self._evict()
+
+    def clear(self):
+        """ Deletes every entry. """
+        for path, _, _ in self._entries():
+            self._remove(path)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.hlc')
+
+    @staticmethod
+    def _encode(spans_by_tag, line_states):
+        # A JSON header line followed by one flat unsigned array per tag and a signed array of line states
+        tags, blobs = [], []
+        for tag, spans in spans_by_tag.items():
+            flat = array('I')
+            for span in spans:
+                flat.extend(span)
+            tags.append([tag, len(flat)])
+            blobs.append(flat.tobytes())
+        states = array('i', (-1 if state is None else state for state in line_states))
+        header = {'format': CACHE_FORMAT, 'byteorder': sys.byteorder, 'tags': tags, 'states': len(states)}
+        return b''.join([json.dumps(header).encode('utf-8'), b'\n'] + blobs + [states.tobytes()])
+
+    @staticmethod
+    def _decode(payload):
+        newline = payload.index(b'\n')
+        header = json.loads(payload[:newline])
+        if header.get('format') != CACHE_FORMAT:
+            raise ValueError('Unsupported highlight cache format')
+        swap = header['byteorder'] != sys.byteorder
+        position = newline + 1
+
+        def take(typecode, count):
+            nonlocal position
+            values = array(typecode)
+            size = values.itemsize * count
+            if position + size > len(payload):
+                raise ValueError('Truncated highlight cache entry')
+            values.frombytes(payload[position:position + size])
+            position += size
+            if swap:
+                values.byteswap()
+            return values
+
+        spans_by_tag = {}
+        for tag, count in header['tags']:
+            flat = take('I', count)
+            spans_by_tag[tag] = list(zip(flat[0::4], flat[1::4], flat[2::4], flat[3::4]))
+        line_states = [None if state < 0 else state for state in take('i', header['states'])]
+        return spans_by_tag, line_states
+
+    def _entries(self):
+        # (path, size, mtime) of every entry in the cache directory
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return []
+        entries = []
+        for name in names:
+            if name.endswith('.hlc'):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict(self):
+        # Drop least recently used entries until the cache fits its size budget
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,131 @@
+# highlight_scheduler.py spreads highlighting work over idle time, visible lines first, within a per-tick time budget
+
+import time
+
+
+class HighlightScheduler:
+    """
+    Keeps a set of line ranges that still need highlighting and works through them from `after_idle`
+    callbacks. Each tick re-reads the viewport, so lines on screen always go first, then work proceeds
+    outward from the viewport in chunks sized to fit the remaining time budget. There is no depth cap:
+    ticks continue until every pending line is done, and scrolling changes what the next tick picks.
+    Parameters:
+        text_widget (tk.Text): The widget being highlighted.
+        highlight_lines (callable): Called as highlight_lines(first_line, last_line) to do the actual work.
+        budget_ms (float): Maximum time spent per idle tick, in milliseconds.
+        min_chunk_lines (int): Smallest number of lines handed to `highlight_lines` at once.
+    """
+    def __init__(self, text_widget, highlight_lines, budget_ms=4.0, min_chunk_lines=8):
+        self.text_widget = text_widget
+        self.highlight_lines = highlight_lines
+        self.budget = budget_ms / 1000.0
+        self.min_chunk_lines = min_chunk_lines
+        self.pending = []  # Sorted, disjoint [first, last] line ranges
+        self._lines_per_second = 20000.0  # Refined after every chunk
+        self._tick_id = None
+        self.on_idle = None  # Optional callable run when a tick finishes the last pending line
+
+    def schedule(self, first_line, last_line):
+        """ Adds a line range to the pending work and makes sure an idle tick is queued. """
+        if last_line < first_line:
+            return
+        self.pending = self._merge(self.pending + [[first_line, last_line]])
+        self._request_tick()
+
+    def shift_lines(self, first, removed, added):
+        """
+        Keeps pending ranges aligned with the buffer after lines were removed or inserted below `first`.
+        Parameters:
+            first (int): The line where the edit started.
+            removed (int): Number of lines merged into `first` by the edit.
+            added (int): Number of new lines inserted after `first`.
+        """
+        def remap(line):
+            if line <= first:
+                return line
+            if line <= first + removed:
+                return first
+            return line + added - removed
+        self.pending = self._merge([[remap(a), remap(b)] for a, b in self.pending])
+
+    def cancel(self):
+        """ Drops all pending work and any queued tick. """
+        self.pending = []
+        if self._tick_id is not None:
+            self.text_widget.after_cancel(self._tick_id)
+            self._tick_id = None
+
+    def is_idle(self):
+        """ True when there is no highlighting work left. """
+        return not self.pending
+
+    @staticmethod
+    def _merge(ranges):
+        # Sort and coalesce overlapping or adjacent ranges
+        merged = []
+        for first, last in sorted(ranges):
+            if merged and first <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], last)
+            else:
+                merged.append([first, last])
+        return merged
+
+    def _request_tick(self):
+        if self._tick_id is None and self.pending:
+            self._tick_id = self.text_widget.after_idle(self._tick)
+
+    def visible_lines(self):
+        """ First and last line currently shown in the widget. """
+        first = int(self.text_widget.index('@0,0').split('.')[0])
+        last = int(self.text_widget.index(f'@0,{self.text_widget.winfo_height()}').split('.')[0])
+        return first, last
+
+    def _take_chunk(self, visible, max_lines):
+        """
+        Removes and returns the next chunk of at most `max_lines` lines, preferring the viewport and then the
+        pending lines closest to it.
+        """
+        view_first, view_last = visible
+
+        def distance(item):
+            first, last = item[1]
+            if last < view_first:
+                return view_first - last
+            if first > view_last:
+                return first - view_last
+            return 0
+        position, (first, last) = min(enumerate(self.pending), key=distance)
+
+        if last < view_first:
+            # Above the viewport: work upward from the end nearest to it
+            chunk = (max(first, last - max_lines + 1), last)
+        else:
+            # Inside or below the viewport: work downward from the nearest line
+            start = max(first, min(view_first, last)) if first <= view_last else first
+            chunk = (start, min(last, start + max_lines - 1))
+
+        remaining = [[first, chunk[0] - 1], [chunk[1] + 1, last]]
+        self.pending[position:position + 1] = [r for r in remaining if r[0] <= r[1]]
+        return chunk
+
+    def _tick(self):
+        """ Highlights pending lines until the time budget for this idle slice runs out. """
+        self._tick_id = None
+        deadline = time.perf_counter() + self.budget
+        visible = self.visible_lines()
+        while self.pending:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            max_lines = max(self.min_chunk_lines, int(remaining * self._lines_per_second))
+            first, last = self._take_chunk(visible, max_lines)
+            started = time.perf_counter()
+            self.highlight_lines(first, last)
+            elapsed = time.perf_counter() - started
+            if elapsed > 0:
+                # Smooth the throughput estimate so a single slow chunk doesn't collapse the chunk size
+                rate = (last - first + 1) / elapsed
+                self._lines_per_second = 0.7 * self._lines_per_second + 0.3 * rate
+        if not self.pending and self.on_idle is not None:
+            self.on_idle()
+        self._request_tick()
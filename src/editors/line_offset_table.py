@@ -0,0 +1,117 @@
+# line_offset_table.py converts between character offsets and Tk "line.col" indices in pure Python
+
+from bisect import bisect_right
+from itertools import accumulate
+
+
+class LineOffsetTable:
+    """
+    Holds the character offset at which every line of a buffer starts, so offsets can be turned into Tk
+    indices (and back) with a bisect instead of a Tcl round-trip that walks the text B-tree from '1.0'.
+    Parameters:
+        text (str): The buffer (or buffer slice) the table describes.
+        origin (tuple): The (line, col) Tk position of the first character of `text`.
+    """
+    def __init__(self, text='', origin=(1, 0)):
+        self.origin = origin
+        lengths = (len(line) + 1 for line in text.split('\n')[:-1])
+        self.line_starts = [0] + list(accumulate(lengths))
+        # A shift not yet applied to line_starts[_pending_from:]; consecutive edits on one line only bump it
+        self._pending_from = None
+        self._pending_delta = 0
+
+    @classmethod
+    def attach(cls, edit_tracker, text):
+        """
+        Creates a table for the widget's current text and keeps it up to date from the tracker's deltas.
+        Parameters:
+            edit_tracker (EditTracker): Tracker installed on the widget whose buffer is described.
+            text (str): The widget's current content.
+        """
+        table = cls(text)
+        edit_tracker.add_listener(table.apply_delta)
+        return table
+
+    def line_count(self):
+        """ Number of lines in the described text. """
+        return len(self.line_starts)
+
+    def line_start(self, line):
+        """ Offset of the first character of a 1-based line. """
+        start = self.line_starts[line - 1]
+        if self._pending_from is not None and line - 1 >= self._pending_from:
+            start += self._pending_delta
+        return start
+
+    def offset_to_position(self, offset):
+        """ Converts a character offset into a (line, col) tuple in Tk coordinates. """
+        self._flush()
+        row = bisect_right(self.line_starts, offset) - 1
+        col = offset - self.line_starts[row]
+        if row == 0:
+            return self.origin[0], self.origin[1] + col
+        return self.origin[0] + row, col
+
+    def offset_to_index(self, offset):
+        """ Converts a character offset into a Tk "line.col" index string. """
+        line, col = self.offset_to_position(offset)
+        return f'{line}.{col}'
+
+    def offsets_to_indices(self, offsets):
+        """
+        Converts ascending character offsets into Tk indices, bisecting only from the previous hit's line on,
+        which keeps converting many sorted search hits cheap.
+        """
+        self._flush()
+        starts, origin_line, origin_col = self.line_starts, self.origin[0], self.origin[1]
+        row, indices = 0, []
+        for offset in offsets:
+            row = bisect_right(starts, offset, row) - 1
+            col = offset - starts[row]
+            indices.append(f'{origin_line}.{origin_col + col}' if row == 0 else f'{origin_line + row}.{col}')
+        return indices
+
+    def index_to_offset(self, index):
+        """ Converts a "line.col" index string (or a (line, col) tuple) back into a character offset. """
+        line, col = map(int, index.split('.')) if isinstance(index, str) else index
+        row = line - self.origin[0]
+        if row == 0:
+            col -= self.origin[1]
+        return self.line_start(row + 1) + col
+
+    def apply_delta(self, delta):
+        """
+        Updates the table after an edit so that it keeps describing the live buffer.
+        Parameters:
+            delta (EditDelta): The edit reported by the EditTracker.
+        """
+        offset = self.index_to_offset(delta.start)
+        line = delta.start[0] - self.origin[0]
+        if delta.op == 'insert':
+            lengths = (len(part) + 1 for part in delta.text.split('\n')[:-1])
+            new_starts = list(accumulate(lengths, initial=offset))[1:]
+            if new_starts:
+                self._flush()
+                self.line_starts[line + 1:line + 1] = new_starts
+            self._shift(line + 1 + len(new_starts), len(delta.text))
+        else:
+            removed_lines = delta.end[0] - delta.start[0]
+            if removed_lines:
+                self._flush()
+                del self.line_starts[line + 1:line + 1 + removed_lines]
+            self._shift(line + 1, -len(delta.text))
+
+    def _shift(self, first_row, delta):
+        # Defer shifting every following line start, merging with a pending shift of the same rows
+        if self._pending_from is not None and self._pending_from != first_row:
+            self._flush()
+        self._pending_from = first_row
+        self._pending_delta += delta
+
+    def _flush(self):
+        # Apply the deferred shift before anything bisects over the line starts
+        if self._pending_from is not None:
+            first, delta = self._pending_from, self._pending_delta
+            self.line_starts[first:] = [start + delta for start in self.line_starts[first:]]
+            self._pending_from = None
+            self._pending_delta = 0
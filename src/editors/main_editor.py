@@ -4,9 +4,20 @@ from tkinter.font import Font, BOLD, ITALIC
 from tkinter import Menu, simpledialog, filedialog, messagebox, font, Toplevel, Menu, Text
 
 from src.editors.editor_configuration import EditorConfiguration  # Ensure this module exists
-from src.widgets.document_widget import DocumentWidget  # Ensure this module exists
+from src.editors.edit_tracker import EditTracker
+from src.widgets.document_model import DocumentModel
 from src.widgets.flare_widget import FlareWidget  # Ensure this module exists
+from src.widgets.flare_window_pool import FlareWindowPool
 from src.editors.syntax_highlighter import SyntaxHighlighter  # Ensure this module exists
+from src.managers.autocomplete_manager import AutoCompleteManager
+from src.managers.buffer_vocabulary import shared_vocabulary
+from src.managers.flare_store import default_store
+from src.managers.link_graph import shared_link_graph
+from src.managers.project_search_manager import ProjectSearchManager
+from src.managers.replace_manager import ReplaceManager
+from src.managers.trigram_index import default_index
+from src.widgets.search_bar import SearchBar
+from src.widgets.search_results_panel import SearchResultsPanel
 
 
 class MainEditor:
@@ -21,7 +32,7 @@ class MainEditor:
         """
         self.root = root
         self.config = EditorConfiguration()
-        self.document_widgets = {} # Stores active Document Widgets indexed by the keyword
+        self.document_widgets = {} # Document models indexed by the keyword; views are created only when shown
         self.current_flare = None # Reference to the currently active Flare widget
         self.configure_root()
         self.text_widget = self.create_text_widget()
@@ -33,7 +44,12 @@ class MainEditor:
         self.editor_config = EditorConfiguration()
         self.document_widgets = {}
         self.flare_widgets = {}
+        # FLARE windows are created on first open and recycled; notes are read from the store as they open
+        self.flare_pool = FlareWindowPool(root, store=default_store(), on_save=shared_link_graph.update_document)
+        self.load_flare_notes()
         self.syntax_highlighter = None
+        self.search_bar = None  # Inline find bar, created on first use
+        self.results_panel = None  # Find-in-files window, created on first use
         self.root = root
         self.palette_manager = palette_manager
         self.font = Font(family="Courier New", size=14)
@@ -54,6 +70,10 @@ class MainEditor:
                                 bg=self.config.get_color('dark_purple')['500'],
                                 fg=self.config.get_color('white')['200'])
         self.text_area.pack(expand=True, fill=tk.BOTH)
+        # One tracker per buffer, shared by everything that follows its edits
+        self.edit_tracker = EditTracker.for_widget(self.text_area)
+        shared_vocabulary.attach(self.edit_tracker)
+        self.autocomplete_manager = AutoCompleteManager(self.text_area, vocabulary=shared_vocabulary)
         self.setup_bindings()
 
     def setup_bindings(self):
@@ -63,6 +83,7 @@ class MainEditor:
         self.text_area.bind('<Control-o>', lambda e: self.open_file())
         self.text_area.bind('<Control-s>', lambda e: self.save_file())
         self.text_area.bind('<Control-f>', lambda e: self.find_text())
+        self.text_area.bind('<Control-Shift-F>', lambda e: self.find_in_files())
 
     def setup_ui(self):
         """
@@ -83,9 +104,8 @@ class MainEditor:
             keyword (str): The keyword to create a Document Widget for
         """
         if keyword not in self.document_widgets:
-            self.document_widgets[keyword] = DocumentWidget(linked_word=keyword)
             # Set the color based on Editor's palette
-            self.document_widgets[keyword].color = self.config.palette['dark_red']
+            self.document_widgets[keyword] = DocumentModel(keyword, color=self.config.palette['dark_red'])
 
     def open_flare_widget(self, keyword):
         """
@@ -123,18 +143,56 @@ class MainEditor:
     
     def find_text(self):
         """
-        Initiates a search within the text content based on a user-provided query.
+        Opens the inline search bar; matches are highlighted and refined as the query is typed.
         """
-        search_query = simpledialog.askstring("Find", "Enter the search term:")
-        if search_query:
-            index = '1.0'
-            while True:  # Continue searching until the last character
-                index = self.text_area.search(search_query, index, nocase=True, stopindex=tk.END)
-                if not index: break
-                last_index = f"{index}+{len(search_query)}c"
-                self.text_area.tag_add('highlight', index, last_index)
-                index = last_index
-            self.text_area.tag_config('highlight', background='yellow')
+        if self.search_bar is None:
+            # The buffer's shared tracker keeps the bar's snapshot and matches current while the text is edited;
+            # completion popups are held off while replace-all edits the buffer
+            tracker = EditTracker.for_widget(self.text_area)
+            replace_manager = ReplaceManager(self.text_area, tracker, suspend=[self.autocomplete_manager])
+            self.search_bar = SearchBar(self.text_area.master, self.text_area, tracker, replace_manager=replace_manager)
+        self.search_bar.show()
+
+    def find_in_files(self, root_dir=None):
+        """
+        Opens the find-in-files panel for a project directory, asking for the directory on first use.
+        Parameters:
+            root_dir (str): Directory to search; replaces the current one when given.
+        """
+        if self.results_panel is None or root_dir is not None:
+            root_dir = root_dir or filedialog.askdirectory(title="Search in folder")
+            if not root_dir:
+                return
+            if self.results_panel is not None:
+                self.results_panel.stop()
+                self.results_panel.manager.shutdown()
+                self.results_panel.master.destroy()
+            window = Toplevel(self.root)
+            window.title(f"Find in files: {root_dir}")
+            window.protocol("WM_DELETE_WINDOW", window.withdraw)
+            manager = ProjectSearchManager(root_dir, index=default_index())
+            manager.update_index()
+            self.results_panel = SearchResultsPanel(window, manager, on_open=self.open_search_hit)
+            self.results_panel.pack(expand=True, fill='both')
+        self.results_panel.master.deiconify()
+        self.results_panel.entry.focus_set()
+
+    def open_search_hit(self, file_path, line, column):
+        """
+        Loads a file found by find-in-files into the text area and moves the cursor to the hit.
+        """
+        try:
+            with open(file_path, 'r') as file:
+                content = file.read()
+        except (IOError, UnicodeDecodeError) as e:
+            messagebox.showerror("Open failed", e)
+            return
+        self.text_area.delete('1.0', tk.END)
+        self.text_area.insert('1.0', content)
+        self.highlight_loaded_content(self.text_area, file_path, content)
+        self.text_area.mark_set(tk.INSERT, f'{line}.{column}')
+        self.text_area.see(tk.INSERT)
+        self.text_area.focus_set()
 
     def bind_events(self):
         """
@@ -167,8 +225,8 @@ class MainEditor:
         # Create a new HEAT UP Document Widget and Flare widget
         if keyword not in self.document_widgets:
             # The color property can be fetched from the color palette by string matching
-            document_widget = DocumentWidget(self.root, keyword, color=self.palette['highlight'])
-            flare = FlareWidget(title=f'FLARE: {keyword}', content='', palette=self.palette)
+            document_widget = DocumentModel(keyword, color=self.palette['highlight'])
+            flare = self.flare_pool.handle(keyword)  # No window until the FLARE is first opened
             self.document_widgets[keyword] = (document_widget, flare)
         # Toggle the visibility of the existing widget
         else:
@@ -195,6 +253,7 @@ class MainEditor:
                 content = file.read()
                 self.text_area.delete('1.0', tk.END)
                 self.text_area.insert('1.0', content)
+            self.highlight_loaded_content(self.text_area, file_path, content)
         except IOError as e:
             messagebox.showerror("Open failed", e)
         
@@ -226,10 +285,18 @@ class MainEditor:
         Creates and configures document widgets that react to 'ctrl+click' to open associated FLARE windows.
         """
         if keyword not in self.document_widgets:
-            document_widget = DocumentWidget(self.text_area, keyword, self.editor_config.get_full_palette())
-            self.document_widgets[keyword] = document_widget
-            # Bind the 'ctrl+click' functionality to the document widget
-            self.text_area.bind('<Control-Button-1>', document_widget.on_ctrl_click, add='+')
+            # Only the model is created; the text area's single Ctrl+Click binding (on_ctrl_click) serves every keyword
+            self.document_widgets[keyword] = DocumentModel(keyword)
+
+    def load_flare_notes(self):
+        """
+        Makes every stored FLARE note available by keyword, reading keywords only: note text is read when opened.
+        """
+        for handle in self.flare_pool.handles_from_store():
+            self.flare_widgets[handle.keyword] = handle
+        # Backlinks between the notes are found when first asked for, so startup reads no note text
+        shared_link_graph.add_keywords(self.flare_widgets)
+        shared_link_graph.set_corpus(self.flare_pool.store.notes)
 
     def setup_flare_widgets(self):
         """
@@ -237,8 +304,8 @@ class MainEditor:
         """
         for keyword in self.document_widgets:
             if keyword not in self.flare_widgets:
-                flare_widget = FlareWidget(self.master, keyword, self.editor_config.get_full_palette())
-                self.flare_widgets[keyword] = flare_widget
+                # A window-less handle; the pool lends it a Toplevel when it is first opened
+                self.flare_widgets[keyword] = self.flare_pool.handle(keyword)
 
     def setup_syntax_highlighter(self):
         """ Integrates the syntax highlighting mechanisms into the text editing area. """
@@ -310,8 +377,10 @@ class MainEditor:
         file_path = filedialog.askopenfilename()
         if file_path:
             with open(file_path, 'r') as file:
+                content = file.read()
                 self.text_area.delete('1.0', tk.END)
-                self.text_area.insert(tk.END, file.read())
+                self.text_area.insert(tk.END, content)
+            self.highlight_loaded_content(self.text_area, file_path, content)
 
     def save_file(self):
         """
@@ -326,14 +395,30 @@ class MainEditor:
         # Open a file and set its content to the text_widget
         file_path = tk.filedialog.askopenfilename()
         with open(file_path, 'r') as file:
+            content = file.read()
             self.text_widget.delete(1.0, tk.END)
-            self.text_widget.insert(tk.END, file.read())
+            self.text_widget.insert(tk.END, content)
+        self.highlight_loaded_content(self.text_widget, file_path, content)
+
+    def highlight_loaded_content(self, text_widget, file_path, content):
+        """
+        Highlights a freshly opened file with the grammar for its extension, applying cached spans at once
+        when the same content was seen before.
+        Parameters:
+            text_widget (tk.Text): The widget the file was loaded into.
+            file_path (str): Path of the opened file.
+            content (str): The file's content.
+        """
+        if self.syntax_highlighter is not None and self.syntax_highlighter.text_widget is text_widget:
+            self.syntax_highlighter.set_grammar_for_path(file_path)
+            self.syntax_highlighter.highlight_content(content)
 
     def save_file(self):
         # Save the current content in the text_widget to a file
         file_path = tk.filedialog.asksaveasfilename()
         with open(file_path, 'w') as file:
             file.write(self.text_widget.get(1.0, tk.END))
+        default_index().index_file_async(file_path)  # Keep find-in-files narrowing exact for this file
 
     def setup_binding(self):
         # Keyboard and mouse bindings
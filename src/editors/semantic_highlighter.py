@@ -0,0 +1,276 @@
+# semantic_highlighter.py tags Python definitions, calls, parameters and builtins from the ast, in a worker thread
+
+import ast
+import builtins
+import queue
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from src.editors.tag_batcher import TagBatcher
+
+SEMANTIC_TAGS = ('sem_definition', 'sem_call', 'sem_parameter', 'sem_builtin')
+
+BUILTIN_NAMES = frozenset(name for name in dir(builtins) if not name.startswith('_'))
+
+# Top-level lines starting with these words continue the statement above rather than starting a new block
+CONTINUATION_WORDS = ('else', 'elif', 'except', 'finally')
+
+# A block that does not parse is retried together with up to this many following blocks
+MAX_BLOCK_MERGE = 4
+
+_DEFINITION_NAME = re.compile(r'(?:async\s+)?(?:def|class)\s+(\w+)')
+
+
+class _SemanticVisitor(ast.NodeVisitor):
+    """
+    Collects (tag, line, start_col, end_line, end_col) spans for one parsed block. Columns are converted from
+    the ast's UTF-8 byte offsets to the character columns Tk uses.
+    """
+    def __init__(self, lines):
+        self.lines = lines
+        self.spans = []
+        self.parameters = []  # One set of parameter names per enclosing function
+
+    def _column(self, line, byte_col):
+        text = self.lines[line - 1]
+        if text.isascii():
+            return byte_col
+        return len(text.encode('utf-8')[:byte_col].decode('utf-8', 'ignore'))
+
+    def _add(self, tag, line, byte_col, length):
+        col = self._column(line, byte_col)
+        self.spans.append((tag, line, col, line, col + length))
+
+    def _add_name(self, node):
+        # Tag a plain name by what it refers to
+        if any(node.id in names for names in self.parameters):
+            self._add('sem_parameter', node.lineno, node.col_offset, len(node.id))
+        elif node.id in BUILTIN_NAMES:
+            self._add('sem_builtin', node.lineno, node.col_offset, len(node.id))
+
+    def _visit_definition(self, node):
+        # The name sits after 'def' / 'class' on the definition line, behind any decorators
+        line_text = self.lines[node.lineno - 1]
+        match = _DEFINITION_NAME.match(line_text, self._column(node.lineno, node.col_offset))
+        if match:
+            self.spans.append(('sem_definition', node.lineno, match.start(1), node.lineno, match.end(1)))
+
+    def _visit_function(self, node, body):
+        arguments = node.args
+        for decorator in getattr(node, 'decorator_list', ()):
+            self.visit(decorator)
+        for default in arguments.defaults + [d for d in arguments.kw_defaults if d is not None]:
+            self.visit(default)
+        names = set()
+        for argument in arguments.posonlyargs + arguments.args + arguments.kwonlyargs + \
+                [a for a in (arguments.vararg, arguments.kwarg) if a is not None]:
+            names.add(argument.arg)
+            self._add('sem_parameter', argument.lineno, argument.col_offset, len(argument.arg))
+            if argument.annotation is not None:
+                self.visit(argument.annotation)
+        if getattr(node, 'returns', None) is not None:
+            self.visit(node.returns)
+        self.parameters.append(names)
+        for statement in body:
+            self.visit(statement)
+        self.parameters.pop()
+
+    def visit_FunctionDef(self, node):
+        self._visit_definition(node)
+        self._visit_function(node, node.body)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Lambda(self, node):
+        self._visit_function(node, [node.body])
+
+    def visit_ClassDef(self, node):
+        self._visit_definition(node)
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        function = node.func
+        if isinstance(function, ast.Name):
+            if function.id in BUILTIN_NAMES and not any(function.id in names for names in self.parameters):
+                self._add('sem_builtin', function.lineno, function.col_offset, len(function.id))
+            else:
+                self._add('sem_call', function.lineno, function.col_offset, len(function.id))
+        elif isinstance(function, ast.Attribute):
+            # The attribute name ends the expression: count back from its end
+            end_col = self._column(function.end_lineno, function.end_col_offset)
+            self.spans.append(('sem_call', function.end_lineno, end_col - len(function.attr),
+                               function.end_lineno, end_col))
+            self.visit(function.value)
+        else:
+            self.visit(function)
+        for argument in node.args + node.keywords:
+            self.visit(argument)
+
+    def visit_Name(self, node):
+        self._add_name(node)
+
+
+def analyze_block(source):
+    """
+    Finds the semantic spans of one top-level block.
+    Parameters:
+        source (str): The block's source text.
+    Returns:
+        list: (tag, line, start_col, end_line, end_col) spans with lines relative to the block (1-based),
+        or None when the block does not parse.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return None
+    visitor = _SemanticVisitor(source.split('\n'))
+    visitor.visit(tree)
+    return visitor.spans
+
+
+def split_blocks(lines):
+    """
+    Splits module lines into top-level blocks: a block starts at every unindented statement line, except
+    continuations such as 'else:' and definitions directly below their decorators.
+    Returns:
+        list: Index of the first line of every block.
+    """
+    starts = []
+    previous = ''
+    for index, line in enumerate(lines):
+        first = line[:1]
+        if first and (first.isalpha() or first in '_@'):
+            word = line.split(None, 1)[0].rstrip(':')
+            if word not in CONTINUATION_WORDS and not previous.startswith('@'):
+                starts.append(index)
+        if first and not first.isspace() and first != '#':
+            previous = line
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    return starts
+
+
+class BlockAnalyzer:
+    """
+    Analyzes a whole module block by block and remembers each block's result by its text, so blocks that did
+    not change since the last pass are neither re-parsed nor re-walked, wherever they moved to.
+    """
+    def __init__(self):
+        self._results = {}  # Block text -> relative spans (None if it did not parse)
+
+    def analyze(self, text):
+        """
+        Returns:
+            dict: tag -> [(line, start_col, end_line, end_col)] with absolute 1-based lines.
+        """
+        lines = text.split('\n')
+        starts = split_blocks(lines) + [len(lines)]
+        results, spans_by_tag = {}, defaultdict(list)
+        block = 0
+        while block < len(starts) - 1:
+            # A block that does not parse on its own may be cut off by an unindented line inside a string or
+            # bracket, so retry it with the blocks that follow
+            for merged in range(1, min(MAX_BLOCK_MERGE, len(starts) - 1 - block) + 1):
+                source = '\n'.join(lines[starts[block]:starts[block + merged]])
+                spans = results[source] if source in results else self._results.get(source, False)
+                if spans is False:
+                    spans = analyze_block(source)
+                results[source] = spans
+                if spans is not None:
+                    break
+            else:
+                merged = 1
+            if spans is not None:
+                offset = starts[block]
+                for tag, line, start_col, end_line, end_col in spans:
+                    spans_by_tag[tag].append((line + offset, start_col, end_line + offset, end_col))
+            block += merged
+        self._results = results  # Drop results of blocks that no longer exist
+        return spans_by_tag
+
+
+class SemanticHighlighter:
+    """
+    Optional semantic pass for Python buffers. After typing pauses for `delay_ms`, a snapshot of the buffer is
+    analyzed with `ast` in a worker thread; the spans come back through an `after()` poll and are applied as a
+    diff, so unchanged blocks cost neither parsing nor Tcl calls. Snapshots superseded by a later edit are
+    dropped unseen. Nothing runs on the keystroke path except rescheduling the timer.
+    Parameters:
+        text_widget (tk.Text): The widget to tag.
+        styles (dict): tag -> tag_configure options for the semantic tags.
+        edit_tracker (EditTracker): Tracker whose edits trigger a new pass.
+        delay_ms (int): Quiet time after the last edit before a pass starts.
+        poll_ms (int): Delay between checks for a finished pass.
+    """
+    def __init__(self, text_widget, styles=None, edit_tracker=None, delay_ms=300, poll_ms=20):
+        self.text_widget = text_widget
+        self.delay_ms = delay_ms
+        self.poll_ms = poll_ms
+        self.version = 0
+        self.analyzer = BlockAnalyzer()
+        self.results = queue.Queue()
+        self.tag_batcher = TagBatcher(text_widget, SEMANTIC_TAGS, edit_tracker)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='heatup-semantic')
+        self._timer_id = None
+        self._poll_id = None
+        self._outstanding = 0  # Passes submitted but not yet drained
+        for tag, options in (styles or {}).items():
+            text_widget.tag_configure(tag, **options)
+            text_widget.tag_raise(tag)  # Semantic tags refine the regex tags underneath
+        if edit_tracker is not None:
+            edit_tracker.add_listener(self.on_edit)
+
+    def on_edit(self, delta):
+        """ Restarts the quiet-time timer; any pass still running is now stale. """
+        self.schedule()
+
+    def schedule(self):
+        """ Starts a pass once `delay_ms` have passed without another call. """
+        self.version += 1
+        if self._timer_id is not None:
+            self.text_widget.after_cancel(self._timer_id)
+        self._timer_id = self.text_widget.after(self.delay_ms, self._submit)
+
+    def clear(self):
+        """ Stops pending work and removes every semantic tag. """
+        self.version += 1
+        if self._timer_id is not None:
+            self.text_widget.after_cancel(self._timer_id)
+            self._timer_id = None
+        self.tag_batcher.clear()
+
+    def shutdown(self):
+        """ Clears the tags and stops the worker thread. """
+        self.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self):
+        self._timer_id = None
+        snapshot = self.text_widget.get('1.0', 'end-1c')
+        self._executor.submit(self._analyze, self.version, snapshot)
+        self._outstanding += 1
+        if self._poll_id is None:
+            self._poll_id = self.text_widget.after(self.poll_ms, self._drain)
+
+    def _analyze(self, version, snapshot):
+        # Runs in the worker thread; a pass that is already stale is reported without being analyzed
+        if version != self.version:
+            self.results.put((version, None, None))
+            return
+        spans_by_tag = self.analyzer.analyze(snapshot)
+        self.results.put((version, snapshot.count('\n') + 1, spans_by_tag))
+
+    def _drain(self):
+        """ Applies the newest finished pass, if it still matches the buffer. """
+        self._poll_id = None
+        while True:
+            try:
+                version, line_count, spans_by_tag = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self._outstanding -= 1
+            if version == self.version and spans_by_tag is not None:
+                self.tag_batcher.set_region(1, line_count, spans_by_tag)
+        if self._outstanding:
+            self._poll_id = self.text_widget.after(self.poll_ms, self._drain)
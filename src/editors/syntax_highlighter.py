@@ -2,12 +2,28 @@
 import tkinter as tk
 from tkinter.font import Font
 import re
+from collections import defaultdict
 import tkinter as tk
 from tkinter import font
 import tkinter as tk
 from tkinter import Toplevel, Text, simpledialog
 from tkinter.font import Font, BOLD, ITALIC
 
+from src.editors.background_tokenizer import BackgroundTokenizer
+from src.editors.edit_tracker import EditTracker
+from src.editors.grammar_registry import grammar_registry
+from src.editors.highlight_cache import HighlightCache, content_key, fingerprint
+from src.editors.highlight_scheduler import HighlightScheduler
+from src.editors.line_offset_table import LineOffsetTable
+from src.editors.semantic_highlighter import SemanticHighlighter
+from src.editors.tag_batcher import TagBatcher
+
+# Marker for lines whose end-of-line lexer state has not been computed yet
+UNKNOWN_STATE = object()
+
+# Grammar used until a file tells the highlighter which language it holds
+DEFAULT_GRAMMAR = 'python'
+
 
 class SyntaxHighlighter:
     """
@@ -15,11 +31,23 @@ class SyntaxHighlighter:
     """
     def __init__(self, text_widget, palette):
         self.text_widget = text_widget
+        self.grammar_name = DEFAULT_GRAMMAR  # Language rules come from the shared grammar registry
+        # Incremental mode bookkeeping: edit tracker, idle-time scheduler and one end-of-line lexer state per line
+        self.edit_tracker = None
+        self.scheduler = HighlightScheduler(text_widget, self._highlight_line_range)
+        self._line_states = []
+        self.line_table = None  # Offset <-> index table kept in step with the buffer in incremental mode
+        self._tokenizer = None
+        self._tag_batcher = None
+        self.background = None  # Optional BackgroundTokenizer for very large buffers
+        self._background_resume_id = None
+        self.highlight_cache = None  # Optional on-disk HighlightCache used by highlight_content
+        self._cache_wanted = False
+        self.semantic = None  # Optional SemanticHighlighter refining Python buffers
         self.fonts = self.generate_fonts()
         self.setup_highlighting_rules()
         self.palette = palette
         self.syntax_rules = self._compile_syntax_rules()
-        self.MAX_DEPTH = 1000
         self._apply_highlighting()
         self.patterns = self._define_syntax_patterns()
         self._setup_styles()
@@ -31,35 +59,9 @@ class SyntaxHighlighter:
         self.text_widget = text_widget
         self.palette = palette
         self.syntax_rules = self._compile_syntax_rules()
-        # Maximum depth for 'after' method to prevent stack overflow in event-driven programming environment
-        self.MAX_DEPTH = 1000
 
         self._apply_highlighting()
 
-    def _compile_syntax_rules(self):
-        """
-        Compiles a dictionary of syntax rules with associated regular expressions and styles.
-        """
-        return {
-            'keyword': {
-                'regex': r'\b(import|as|if|else|for|while|return|from|def)\b',
-                'style': {'foreground': self.palette['xanthous']},
-            },
-            'string': {
-                'regex': r'"[^"\\]*(\\.[^"\\]*)*"|\'[^\'\\]*(\\.[^\'\\]*)*\'',
-                'style': {'foreground': self.palette['wine']},
-            },
-            'comment': {
-                'regex': r'#.*',
-                'style': {'foreground': self.palette['auburn'], 'font_style': 'italic'},
-            },
-            'function': {
-                'regex': r'\bdef\s+(?P<name>\w+)\s*\(',
-                'style': {'foreground': self.palette['peach_yellow'], 'font_style': 'bold'},
-            },
-            # ... more syntax rules can be added here
-        }
-
     def generate_fonts(self):
         """ Generate different font styles for syntax highlighting. """
         base_font = Font(family="Consolas", size=12)
@@ -86,43 +88,9 @@ class SyntaxHighlighter:
             self.apply_highlighting(pattern, syntax_type)
     
     def _define_syntax_patterns(self):
-        # Patterns defined for syntax of a general programming language
-        return {
-            'keyword': r'\b(def|class|break|continue|return)\b',
-            'string': r'(\".*?\"|\'.*?\')',
-            'comment': r'\#.*',
-            'function': r'\b\w+(?=\()'
-            # Additional patterns can be added here
-        }
-
-    def _apply_highlighting(self):
-        """
-        Applies highlighting rules to all text in the Text widget using scheduled after calls to prevent UI freezing.
-        """
-        for key, rule in self.syntax_rules.items():
-            self._apply_rule(rule['regex'], rule['style'], key)
-            self.text_widget.tag_configure(key, **rule['style'])
+        # Patterns of the active grammar, one per tag
+        return {tag: rule['regex'] for tag, rule in self._compile_syntax_rules().items()}
 
-    def _apply_rule(self, pattern, style, tag, start='1.0', depth=0):
-        """
-        Applies highlighting to a given pattern recursively using the tk.after method.
-        """
-        if depth > self.MAX_DEPTH:
-            return
-        end_index = self.text_widget.search(pattern, start, tk.END, regexp=True)
-        if end_index:
-            self.text_widget.tag_add(tag, start, f"{end_index}+1c")
-            next_start = f"{end_index}+1c"
-            self.text_widget.after(1, self._apply_rule, pattern, style, tag, next_start, depth+1)
-    
-    def _apply_highlighting(self):
-        """
-        Applies highlighting rules to all text in the Text widget using scheduled after calls to prevent UI freezing.
-        """
-        for key, rule in self.syntax_rules.items():
-            self._apply_rule(rule['regex'], rule['style'], key)
-            self.text_widget.tag_configure(key, **rule['style'])
-    
     def _setup_styles(self):
         # Configures styles for each syntax pattern using the provided color palette
         for syntax_type, color_key in self.palette['syntax'].items():
@@ -139,12 +107,14 @@ class SyntaxHighlighter:
         # Clear any existing styling
         self.text_widget.tag_remove(tag, '1.0', tk.END)
         
-        # Iteratively apply styling to matching patterns
-        for match in re.finditer(pattern, self.text_widget.get('1.0', tk.END), re.IGNORECASE | re.MULTILINE):
+        # Iteratively apply styling to matching patterns, converting offsets to indices without asking Tk
+        content = self.text_widget.get('1.0', tk.END)
+        line_table = self.line_table or LineOffsetTable(content)
+        indices = []
+        for match in re.finditer(pattern, content, re.IGNORECASE | re.MULTILINE):
             start, end = match.span()
-            start_index = self.text_widget.index(f'1.0+{start}c')
-            end_index = self.text_widget.index(f'1.0+{end}c')
-            self.text_widget.tag_add(tag, start_index, end_index)
+            indices.extend((line_table.offset_to_index(start), line_table.offset_to_index(end)))
+        TagBatcher.add_ranges(self.text_widget, tag, indices)
 
 
     def generate_fonts(self):
@@ -158,28 +128,66 @@ class SyntaxHighlighter:
     
     def _compile_syntax_rules(self):
         """
-        Compiles a dictionary of syntax rules with associated regular expressions and styles.
+        Compiles a dictionary of syntax rules with associated regular expressions and styles, taken from the
+        active grammar with its colors resolved against the palette.
+        """
+        return grammar_registry.grammar(self.grammar_name).syntax_rules(self.palette)
+
+    def set_grammar_for_path(self, path):
+        """
+        Switches to the grammar registered for the file's extension; the grammar is loaded and compiled on
+        first use. Call `highlight_content` afterwards to re-highlight with the new rules.
+        Parameters:
+            path (str): Path of the file being edited.
+        Returns:
+            bool: True if the active grammar changed.
         """
+        name = grammar_registry.name_for_path(path) or DEFAULT_GRAMMAR
+        if name == self.grammar_name:
+            return False
+        if self._tag_batcher is not None:
+            self._tag_batcher.clear()  # The old grammar's tags would otherwise linger
+            self._tag_batcher = None
+        self.grammar_name = name
+        self.syntax_rules = self._compile_syntax_rules()
+        self._tokenizer = None
+        if self.background is not None:
+            self.background.tokenizer = self.tokenizer
+        self._refresh_semantic()
+        return True
+
+    def enable_semantic_highlighting(self, delay_ms=300):
+        """
+        Adds the semantic pass for Python buffers: definitions, calls, parameters and builtins are tagged from
+        the ast in a worker thread once typing pauses. Turns on incremental mode, whose edits drive the pass.
+        Parameters:
+            delay_ms (int): Quiet time after the last edit before the buffer is re-analyzed.
+        """
+        if self.edit_tracker is None:
+            self.enable_incremental_mode()
+        if self.semantic is None:
+            self.semantic = SemanticHighlighter(self.text_widget, self._semantic_styles(), self.edit_tracker,
+                                                delay_ms)
+        self._refresh_semantic()
+
+    def _semantic_styles(self):
+        # Tag options of the semantic tags, drawn on top of the regex tags
         return {
-            'keyword': {
-                'regex': r'\b(import|as|if|else|for|while|return|from|def)\b',
-                'style': {'foreground': self.palette['xanthous']},
-            },
-            'string': {
-                'regex': r'"[^"\\]*(\\.[^"\\]*)*"|\'[^\'\\]*(\\.[^\'\\]*)*\'',
-                'style': {'foreground': self.palette['wine']},
-            },
-            'comment': {
-                'regex': r'#.*',
-                'style': {'foreground': self.palette['auburn'], 'font_style': 'italic'},
-            },
-            'function': {
-                'regex': r'\bdef\s+(?P<name>\w+)\s*\(',
-                'style': {'foreground': self.palette['peach_yellow'], 'font_style': 'bold'},
-            },
-            # ... more syntax rules can be added here
+            'sem_definition': {'foreground': self.palette['peach_yellow'], 'font': self.fonts['bold']},
+            'sem_call': {'foreground': self.palette['peach_yellow']},
+            'sem_parameter': {'font': self.fonts['italic']},
+            'sem_builtin': {'foreground': self.palette['xanthous']},
         }
 
+    def _refresh_semantic(self):
+        # The semantic pass only understands Python
+        if self.semantic is None:
+            return
+        if self.grammar_name == 'python':
+            self.semantic.schedule()
+        else:
+            self.semantic.clear()
+
     def setup_highlighting_rules(self):
         """
         Sets up syntax highlighting with predefined rules and configuration based color scheme.
@@ -204,29 +212,241 @@ class SyntaxHighlighter:
             if not pos:
                 break
             end_pos = f'{pos}+{len(self.text_widget.get(pos, f"{pos} lineend"))}c'
-            self.text_widget.tag_add(tag, pos,)
-            for key, rule in self.syntax_rules.items():
-                self._apply_rule(rule['regex'], rule['style'], key)
-                self.text_widget.tag_configure(key, **rule['style'])
+            self.text_widget.tag_add(tag, pos, end_pos)
+            start = end_pos
 
     def _apply_highlighting(self):
         """
-        Applies highlighting rules to all text in the Text widget using scheduled after calls to prevent UI freezing.
+        Applies highlighting rules to all text in the Text widget. The work is handed to the scheduler, which
+        highlights the visible lines first and fills in the rest of the buffer during idle time.
         """
+        self._configure_rule_styles()
+        line_count = self._line_count()
+        self._line_states = [UNKNOWN_STATE] * line_count
+        if self.edit_tracker is None:
+            # Without edit tracking the record of applied tags may be stale
+            self.tag_batcher.reset()
+        self.scheduler.cancel()
+        self._refresh_semantic()
+        if self.background is not None:
+            # Lex what is on screen right away and let the worker fill in the rest of the buffer
+            self.scheduler.schedule(*self.scheduler.visible_lines())
+            self._submit_background(1)
+        else:
+            self.scheduler.schedule(1, line_count)
 
-    def _apply_rule(self, pattern, style, tag, start='1.0', depth=0):
+    def enable_background_tokenization(self, use_processes=False, chunk_lines=2000):
         """
-        Applies highlighting to a given pattern recursively using the tk.after method.
+        Moves full-buffer tokenization off the Tk main thread: snapshots are lexed by a worker thread (or a
+        process pool) and the results stream back in chunks while the editor stays interactive.
+        Parameters:
+            use_processes (bool): Lex chunks in parallel worker processes rather than one worker thread.
+            chunk_lines (int): Number of lines per streamed chunk.
         """
-        if depth > self.MAX_DEPTH:
+        if self.background is None:
+            self.background = BackgroundTokenizer(self.text_widget, self.tokenizer, self._apply_background_chunk,
+                                                  chunk_lines=chunk_lines, use_processes=use_processes)
+
+    def _submit_background(self, first_line):
+        # Snapshot the buffer from `first_line` on and hand it to the worker
+        state = self._line_states[first_line - 2] if first_line > 1 else None
+        if state is UNKNOWN_STATE:
+            state = None
+        snapshot = self.text_widget.get(f'{first_line}.0', 'end-1c')
+        self.background.submit(snapshot, first_line, state)
+
+    def _resume_background(self):
+        # Resubmit whatever the superseded snapshot had not delivered yet, starting at the first unlexed line
+        self._background_resume_id = None
+        if UNKNOWN_STATE in self._line_states:
+            self._submit_background(self._line_states.index(UNKNOWN_STATE) + 1)
+
+    def _apply_background_chunk(self, first_line, line_spans, end_states, start_state):
+        """
+        Tags one chunk delivered by the background tokenizer and stores its end-of-line states.
+        Parameters:
+            first_line (int): Buffer line of the first entry.
+            line_spans (list): Per-line lists of (start_col, end_col, tag).
+            end_states (list): Per-line end states.
+            start_state: The state the worker assumed at the start of the chunk.
+        """
+        last = first_line + len(line_spans) - 1
+        if last > len(self._line_states):
             return
-        end_index = self.text_widget.search(pattern, start, tk.END, regexp=True)
-        if end_index:
-            self.text_widget.tag_add(tag, start, f"{end_index}+1c")
-            next_start = f"{end_index}+1c"
-            self.text_widget.after(1, self._apply_rule, pattern, style, tag, next_start, depth+1)
+        spans_by_tag = defaultdict(list)
+        for line, spans in enumerate(line_spans, start=first_line):
+            for start_col, end_col, tag in spans:
+                spans_by_tag[tag].append((line, start_col, line, end_col))
+        self.tag_batcher.set_region(first_line, last, spans_by_tag)
+        self._line_states[first_line - 1:last] = end_states
+
+        # Chunks lexed in parallel assume the default state; re-lex where that guess turned out wrong
+        previous_state = self._line_states[first_line - 2] if first_line > 1 else None
+        if previous_state is not UNKNOWN_STATE and previous_state != start_state:
+            self.scheduler.schedule(first_line, first_line)
+        if end_states[-1] is not None and last < len(self._line_states) \
+                and self._line_states[last] is not UNKNOWN_STATE:
+            self.scheduler.schedule(last + 1, last + 1)
+        if last == len(self._line_states) and self.scheduler.is_idle():
+            self._store_in_cache()
+
+    def highlight_content(self, content, cache=None):
+        """
+        Highlights content that was just loaded into the widget. When the same content was fully highlighted
+        before with the same rules and palette, the cached spans are applied at once; otherwise the buffer is
+        highlighted as usual and the result is cached once every line is done.
+        Parameters:
+            content (str): The text now in the widget.
+            cache (HighlightCache): Cache to use; a default on-disk cache is created on first use.
+        Returns:
+            bool: True if the highlighting came from the cache.
+        """
+        if cache is not None or self.highlight_cache is None:
+            self.highlight_cache = cache or HighlightCache()
+            self.scheduler.on_idle = self._store_in_cache
+        cached = self.highlight_cache.load(content_key(content, self.rules_version(), self.palette_version()))
+        if cached is None or len(cached[1]) != self._line_count():
+            self._cache_wanted = True
+            self._apply_highlighting()
+            return False
+
+        spans_by_tag, line_states = cached
+        self._configure_rule_styles()
+        self.scheduler.cancel()
+        if self.background is not None:
+            self.background.cancel()
+        self._line_states = line_states
+        self._cache_wanted = False
+        self.tag_batcher.reset()
+        self.tag_batcher.set_region(1, len(line_states), spans_by_tag)
+        self._refresh_semantic()
+        return True
+
+    def rules_version(self):
+        """ Fingerprint of the rules the tokenizer is built from; cached spans are only valid for the same rules. """
+        return fingerprint((self.tokenizer.rules, self.tokenizer.multiline_rules))
+
+    def palette_version(self):
+        """ Fingerprint of the palette colors and font styles the syntax tags are configured with. """
+        return fingerprint([(tag, sorted(rule['style'].items())) for tag, rule in self.syntax_rules.items()])
+
+    def _store_in_cache(self):
+        # Save the finished highlighting of the current content, once per highlight_content miss
+        if not self._cache_wanted or self.highlight_cache is None or UNKNOWN_STATE in self._line_states:
+            return
+        spans_by_tag = self.tag_batcher.spans()
+        if spans_by_tag is None:
+            return
+        # Hash what is in the widget now, so edits made while highlighting cannot file spans under a stale key
+        content = self.text_widget.get('1.0', 'end-1c')
+        key = content_key(content, self.rules_version(), self.palette_version())
+        self.highlight_cache.store(key, spans_by_tag, self._line_states)
+        self._cache_wanted = False
+
+    @property
+    def tokenizer(self):
+        """ The combined single-pass tokenizer of the active grammar, compiled once per grammar. """
+        if self._tokenizer is None:
+            self._tokenizer = grammar_registry.tokenizer(self.grammar_name)
+        return self._tokenizer
+
+    @property
+    def tag_batcher(self):
+        """ Batches and diffs the syntax tags applied to the widget. """
+        if self._tag_batcher is None:
+            self._tag_batcher = TagBatcher(self.text_widget, self.tokenizer.tags, self.edit_tracker)
+        return self._tag_batcher
+
+    def _configure_rule_styles(self):
+        # Translate each rule's style into tag options, mapping 'font_style' onto the generated fonts
+        for tag, rule in self.syntax_rules.items():
+            options = dict(rule['style'])
+            font_style = options.pop('font_style', None)
+            if font_style:
+                options['font'] = self.fonts[font_style]
+            self.text_widget.tag_configure(tag, **options)
+
+    def enable_incremental_mode(self):
+        """
+        Switches to incremental highlighting: edits are tracked as they happen and only the edited lines are
+        re-highlighted, plus any following lines whose end-of-line lexer state changed as a result.
+        """
+        if self.edit_tracker is None:
+            self.edit_tracker = EditTracker.for_widget(self.text_widget)  # Shared with other components of the widget
+            self.line_table = LineOffsetTable.attach(self.edit_tracker, self.text_widget.get('1.0', 'end-1c'))
+            self.edit_tracker.add_listener(self.on_edit)
+            self._tag_batcher = None  # Rebuilt on demand so it follows the tracker's edits
+        self._apply_highlighting()
+
+    def on_edit(self, delta):
+        """
+        Keeps the per-line bookkeeping aligned with the buffer after an edit and schedules the touched lines.
+        Parameters:
+            delta (EditDelta): The edit reported by the EditTracker.
+        """
+        first, removed, added = delta.first_line, delta.lines_removed, delta.lines_added
+        if removed or added:
+            # The edited line now ends with what used to end line first+removed, so that line keeps its state
+            del self._line_states[first - 1:first - 1 + removed]
+            self._line_states[first - 1:first - 1] = [UNKNOWN_STATE] * added
+            self.scheduler.shift_lines(first, removed, added)
+        self.scheduler.schedule(first, first + added)
+        if self.background is not None and self.background.active:
+            # Line numbers of the snapshot in flight are stale now; pick it up again once typing pauses
+            self.background.cancel()
+            if self._background_resume_id is not None:
+                self.text_widget.after_cancel(self._background_resume_id)
+            self._background_resume_id = self.text_widget.after(500, self._resume_background)
+
+    def _highlight_line_range(self, first, last):
+        """
+        Re-lexes and re-tags lines `first` to `last`. If the end state of the last line changed and the next
+        line was already lexed under the old state, the following lines are scheduled as well.
+        """
+        line_count = self._line_count()
+        if len(self._line_states) != line_count:
+            # The buffer changed without edit tracking; start over from unknown states
+            self._line_states = [UNKNOWN_STATE] * line_count
+        last = min(last, line_count)
+        if first > last:
+            return
+        state = self._line_states[first - 2] if first > 1 else None
+        if state is UNKNOWN_STATE:
+            state = None
+        previous_state = self._line_states[last - 1]
+        chunk = self.text_widget.get(f'{first}.0', f'{last}.end')
+        spans_by_tag = defaultdict(list)
+        for line, line_text in enumerate(chunk.split('\n'), start=first):
+            spans, state = self._lex_line(line_text, state)
+            for start_col, end_col, tag in spans:
+                spans_by_tag[tag].append((line, start_col, line, end_col))
+            self._line_states[line - 1] = state
+        self.tag_batcher.set_region(first, last, spans_by_tag)
+
+        # Lines lexed from an unknown predecessor assumed the default state
+        if previous_state is UNKNOWN_STATE:
+            previous_state = None
+        if state != previous_state and last < line_count and self._line_states[last] is not UNKNOWN_STATE:
+            self.scheduler.schedule(last + 1, min(line_count, last + 2 * (last - first + 1)))
+
+    def _lex_line(self, line_text, state):
+        """
+        Finds the highlight spans of a single line.
+        Parameters:
+            line_text (str): The text of the line without its trailing newline.
+            state: The lexer state at the end of the previous line (None, or the open multi-line rule).
+        Returns:
+            tuple: ([(start_col, end_col, tag), ...], end_of_line_state)
+        """
+        return self.tokenizer.tokenize_line(line_text, state)
+
+    def _line_count(self):
+        # Number of lines in the buffer, ignoring Tk's implicit trailing newline
+        if self.line_table is not None:
+            return self.line_table.line_count()
+        return int(self.text_widget.index('end-1c').split('.')[0])
 
 # Example usage in the application context
 # Assume text_widget is the main text editing widget and palette is provided by the EditorConfiguration
 # syntax_highlighter = SyntaxHighlighter(text_widget, palette)
-# text_widget.bind('<KeyRelease>', lambda e: syntax_highlighter._apply_highlighting())
+# syntax_highlighter.enable_incremental_mode()  # re-highlights only edited lines, no <KeyRelease> binding needed
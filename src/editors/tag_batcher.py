@@ -0,0 +1,174 @@
+# tag_batcher.py applies highlight spans to a Text widget as a few multi-range tag calls, sending only what changed
+
+from collections import defaultdict
+
+# Marker for lines whose tags on the Tk side are unknown (never applied, or moved around by an edit)
+UNKNOWN_LINE = object()
+
+
+class TagBatcher:
+    """
+    Remembers which spans of a fixed set of tags are applied on each line and, when a region is re-tagged,
+    diffs the new spans against that record. Only the spans that disappeared are removed and only the new
+    ones are added, each as one multi-range `tag remove` / `tag add` call per tag.
+    Spans are (line, start_col, end_line, end_col) tuples and are filed under the line they start on.
+    Parameters:
+        text_widget (tk.Text): The widget carrying the tags.
+        tags (iterable): The tags this batcher owns; other tags on the widget are never touched.
+        edit_tracker (EditTracker): Optional tracker used to keep the per-line record aligned with edits.
+        max_ranges_per_call (int): Upper bound on the ranges packed into one Tcl call.
+    """
+    def __init__(self, text_widget, tags, edit_tracker=None, max_ranges_per_call=5000):
+        self.text_widget = text_widget
+        self.tags = list(tags)
+        self.max_ranges_per_call = max_ranges_per_call
+        self._line_spans = []  # Per line: None (no spans), UNKNOWN_LINE, or {tag: frozenset((col, line_span, end_col))}
+        if edit_tracker is not None:
+            edit_tracker.add_listener(self.on_edit)
+
+    def on_edit(self, delta):
+        """
+        Keeps the per-line record aligned after an edit. Tk moves tags along with the text, so lines touched
+        by the edit are marked unknown and get a clean re-tag the next time their region is applied.
+        """
+        first, removed, added = delta.first_line, delta.lines_removed, delta.lines_added
+        if first - 1 >= len(self._line_spans):
+            return
+        del self._line_spans[first:first + removed]
+        self._line_spans[first:first] = [UNKNOWN_LINE] * added
+        self._line_spans[first - 1] = UNKNOWN_LINE
+
+    def reset(self):
+        """ Forgets what was applied; the next region update re-tags it from scratch. """
+        self._line_spans = []
+
+    def clear(self):
+        """ Removes every owned tag from the whole widget. """
+        for tag in self.tags:
+            self.text_widget.tag_remove(tag, '1.0', 'end')
+        self._line_spans = []
+
+    def spans(self):
+        """
+        Every span currently recorded, as tag -> [(line, start_col, end_line, end_col)].
+        Returns None while any line's tags are unknown, since the record would then be incomplete.
+        """
+        spans_by_tag = defaultdict(list)
+        for line, entry in enumerate(self._line_spans, start=1):
+            if entry is UNKNOWN_LINE:
+                return None
+            if entry:
+                for tag, spans in entry.items():
+                    spans_by_tag[tag].extend((line, col, line + line_span, end_col)
+                                             for col, line_span, end_col in spans)
+        return spans_by_tag
+
+    def set_tag(self, tag, spans):
+        """ Replaces all spans of a single owned tag across the whole buffer. """
+        # Every line of the widget, not only the recorded ones: after a reset the record is empty, yet the
+        # widget may still carry the tag anywhere
+        line_count = int(self.text_widget.index('end-1c').split('.')[0])
+        last_line = max([len(self._line_spans), line_count] + [span[0] for span in spans])
+        self.set_region(1, last_line, {tag: spans}, tags=[tag])
+
+    def set_region(self, first_line, last_line, spans_by_tag, tags=None):
+        """
+        Makes the spans starting on lines `first_line`..`last_line` exactly `spans_by_tag`.
+        Parameters:
+            first_line (int): First line of the region.
+            last_line (int): Last line of the region.
+            spans_by_tag (dict): tag -> iterable of (line, start_col, end_line, end_col) spans.
+            tags (list): The tags being replaced; defaults to every owned tag.
+        """
+        tags = self.tags if tags is None else tags
+        if len(self._line_spans) < last_line:
+            self._line_spans.extend([UNKNOWN_LINE] * (last_line - len(self._line_spans)))
+
+        # Group the new spans per line, relative to the line they start on
+        new_lines = defaultdict(lambda: defaultdict(set))
+        for tag, spans in spans_by_tag.items():
+            for line, start_col, end_line, end_col in spans:
+                new_lines[line][tag].add((start_col, end_line - line, end_col))
+
+        # Only lines holding old or new spans (or unknown tags) need looking at
+        record = self._line_spans
+        candidates = set(new_lines)
+        candidates.update(line for line, entry in enumerate(record[first_line - 1:last_line], first_line)
+                          if entry is not None)
+
+        removes, adds = defaultdict(list), defaultdict(list)
+        unknown_runs = []
+        for line in sorted(candidates):
+            old_entry = record[line - 1]
+            new_entry = new_lines.get(line)
+            if old_entry is UNKNOWN_LINE:
+                if unknown_runs and unknown_runs[-1][1] == line - 1:
+                    unknown_runs[-1][1] = line
+                else:
+                    unknown_runs.append([line, line])
+                old_entry = None
+            stored = None
+            for tag in tags:
+                old = old_entry.get(tag, frozenset()) if old_entry else frozenset()
+                new = frozenset(new_entry.get(tag, ())) if new_entry else frozenset()
+                if new:
+                    stored = stored or {}
+                    stored[tag] = new
+                if old != new:
+                    removes[tag].extend(self._indices(line, old - new))
+                    adds[tag].extend(self._indices(line, new - old))
+            if old_entry:
+                # Keep spans of tags that were not part of this update
+                for tag, spans in old_entry.items():
+                    if tag not in tags:
+                        stored = stored or {}
+                        stored[tag] = spans
+            record[line - 1] = stored
+
+        # Lines with unknown Tk-side tags are wiped first, then all removals, then all additions
+        for first, last in unknown_runs:
+            for tag in tags:
+                removes[tag][:0] = [f'{first}.0', f'{last}.end']
+        for tag, indices in removes.items():
+            self._send_ranges(self.text_widget, 'remove', tag, indices, self.max_ranges_per_call)
+        for tag, indices in adds.items():
+            self._send_ranges(self.text_widget, 'add', tag, indices, self.max_ranges_per_call)
+
+    @staticmethod
+    def _indices(line, relative_spans):
+        # Flatten spans stored relative to `line` into Tk index pairs
+        indices = []
+        for start_col, line_span, end_col in relative_spans:
+            indices.append(f'{line}.{start_col}')
+            indices.append(f'{line + line_span}.{end_col}')
+        return indices
+
+    @staticmethod
+    def _send_ranges(text_widget, op, tag, indices, max_ranges_per_call):
+        # Send index pairs to Tk in as few `tag add` / `tag remove` calls as the chunk size allows, addressed by
+        # Tcl path name since widgets such as DocumentWidget override __str__
+        step = max_ranges_per_call * 2
+        for i in range(0, len(indices), step):
+            text_widget.tk.call(text_widget._w, 'tag', op, tag, *indices[i:i + step])
+
+    @staticmethod
+    def add_ranges(text_widget, tag, indices, max_ranges_per_call=5000):
+        """
+        Adds a tag over many ranges with one `tag add` call per chunk, without any bookkeeping.
+        Parameters:
+            text_widget (tk.Text): The widget to tag.
+            tag (str): The tag name.
+            indices (list): Flat list of start/end index pairs.
+        """
+        TagBatcher._send_ranges(text_widget, 'add', tag, indices, max_ranges_per_call)
+
+    @staticmethod
+    def remove_ranges(text_widget, tag, indices, max_ranges_per_call=5000):
+        """
+        Removes a tag from many ranges with one `tag remove` call per chunk, without any bookkeeping.
+        Parameters:
+            text_widget (tk.Text): The widget to untag.
+            tag (str): The tag name.
+            indices (list): Flat list of start/end index pairs.
+        """
+        TagBatcher._send_ranges(text_widget, 'remove', tag, indices, max_ranges_per_call)
@@ -0,0 +1,150 @@
+# tokenizer.py compiles every syntax rule into one regular expression so a buffer is tokenized in a single pass
+
+import re
+
+
+class CombinedTokenizer:
+    """
+    Joins a list of syntax rules into a single alternation of named groups.
+    Rules are tried in the order given, and the scan always continues after the end of the previous token,
+    so an earlier token swallows anything inside it: a '#' within a string never starts a comment.
+    Where two rules match at the same position the one listed first wins.
+
+    Multi-line rules (triple-quoted strings, block comments) take part in the same scan through their opening
+    delimiter, ahead of the ordinary rules. When a construct is still open at the end of a line, its index is
+    returned as the lexer state for that line, and lexing the next line with that state resumes inside it.
+    Parameters:
+        rules (list): Ordered (tag, regex) pairs; tags must be valid Python identifiers.
+        flags (int): Regular expression flags applied to the combined pattern.
+        multiline_rules (list): (tag, open_regex, close_regex) triples. `close_regex` is matched right after
+            the opener (or at the start of a continuation line) and must consume up to and including the
+            closing delimiter.
+    """
+    def __init__(self, rules, flags=0, multiline_rules=()):
+        self.rules = list(rules)
+        self.multiline_rules = list(multiline_rules)
+        self.tags = []
+        for tag, *_ in self.multiline_rules + self.rules:
+            if tag not in self.tags:
+                self.tags.append(tag)
+        alternatives = [f'(?P<_block{i}>{self._strip_groups(opener)})'
+                        for i, (_, opener, _) in enumerate(self.multiline_rules)]
+        alternatives += [f'(?P<{tag}>{self._strip_groups(pattern)})' for tag, pattern in self.rules]
+        self.regex = re.compile('|'.join(alternatives), flags)
+        self._closers = [re.compile(closer, flags) for _, _, closer in self.multiline_rules]
+
+    @staticmethod
+    def _strip_groups(pattern):
+        """
+        Turns every capturing group of a rule into a non-capturing one, so the only groups left in the
+        combined pattern are the per-rule named groups and `match.lastgroup` identifies the rule.
+        """
+        result = []
+        i, in_class = 0, False
+        while i < len(pattern):
+            char = pattern[i]
+            if char == '\\':
+                result.append(pattern[i:i + 2])
+                i += 2
+                continue
+            if in_class:
+                in_class = char != ']'
+            elif char == '[':
+                result.append('[')
+                i += 1
+                # A ']' directly after '[' or '[^' is a literal member of the class
+                for prefix in ('^', ']'):
+                    if pattern.startswith(prefix, i):
+                        result.append(prefix)
+                        i += 1
+                in_class = True
+                continue
+            elif char == '(':
+                if pattern.startswith('(?P<', i):
+                    result.append('(?:')
+                    i = pattern.index('>', i) + 1
+                    continue
+                if pattern.startswith('(?P=', i):
+                    raise ValueError(f"Backreferences are not supported in combined rules: {pattern}")
+                if not pattern.startswith('(?', i):
+                    result.append('(?:')
+                    i += 1
+                    continue
+            result.append(char)
+            i += 1
+        return ''.join(result)
+
+    def tokenize(self, text, start=0, end=None):
+        """
+        Yields every token of `text` in one linear scan.
+        Parameters:
+            text (str): The text to tokenize.
+            start (int): Offset to start scanning at.
+            end (int): Offset to stop scanning at, defaults to the end of the text.
+        Yields:
+            tuple: (start_offset, end_offset, tag) for every non-empty token, in buffer order.
+        """
+        end = len(text) if end is None else end
+        position = start
+        while position < end:
+            match = self.regex.search(text, position, end)
+            if match is None:
+                break
+            name = match.lastgroup
+            if name.startswith('_block'):
+                # A multi-line construct runs to its closing delimiter, or to the end of the scanned text
+                rule_index = int(name[6:])
+                closer = self._closers[rule_index].match(text, match.end(), end)
+                position = closer.end() if closer else end
+                yield match.start(), position, self.multiline_rules[rule_index][0]
+            elif match.end() > match.start():
+                yield match.start(), match.end(), name
+                position = match.end()
+            else:
+                position = match.end() + 1
+
+    def tokenize_line(self, line_text, state=None):
+        """
+        Tokenizes one line, resuming from the state the previous line ended in.
+        Parameters:
+            line_text (str): The line without its trailing newline.
+            state: None, or the index of the multi-line rule still open at the end of the previous line.
+        Returns:
+            tuple: ([(start_col, end_col, tag), ...], end_of_line_state)
+        """
+        spans = []
+        position = 0
+        if state is not None:
+            position, state = self._close_block(line_text, 0, 0, state, spans)
+            if state is not None:
+                return spans, state
+
+        length = len(line_text)
+        while position < length:
+            match = self.regex.search(line_text, position)
+            if match is None:
+                break
+            name = match.lastgroup
+            if name.startswith('_block'):
+                position, state = self._close_block(line_text, match.start(), match.end(), int(name[6:]), spans)
+                if state is not None:
+                    return spans, state
+                continue
+            if match.end() > match.start():
+                spans.append((match.start(), match.end(), name))
+                position = match.end()
+            else:
+                position = match.end() + 1
+        return spans, None
+
+    def _close_block(self, line_text, start, body_start, rule_index, spans):
+        # Look for the end of an open multi-line construct; returns (resume position, state still open or None)
+        tag = self.multiline_rules[rule_index][0]
+        closer = self._closers[rule_index].match(line_text, body_start)
+        if closer is None:
+            if len(line_text) > start:
+                spans.append((start, len(line_text), tag))
+            return len(line_text), rule_index
+        if closer.end() > start:
+            spans.append((start, closer.end(), tag))
+        return closer.end(), None
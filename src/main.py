@@ -1,6 +1,7 @@
 # Final synergy and execution of the HEAT UP advanced text editor with state-of-the-art advancements {1AZ_t 5/5}
 
 import tkinter as tk
+from editor.edit_tracker import EditTracker
 from editor.editor_configuration import EditorConfiguration
 from editor.editor_effects import EditorEffects
 from editor.editor_events import EditorEvents
@@ -10,6 +11,7 @@ from editor.main_editor import MainEditor
 from editor.syntax_highlighter import SyntaxHighlighter
 
 from managers.autocomplete_manager import AutocompleteManager
+from managers.buffer_vocabulary import shared_vocabulary
 from managers.cross_linking_manager import CrossLinkingManager
 from managers.inline_search_manager import InlineSearchManager
 from managers.palette_manager import PaletteManager
@@ -34,9 +36,9 @@ def main():
     palette_manager = PaletteManager(text_widget)
     palette_manager.apply_palette_to_widget()
 
-    # Auto-complete words (this list can be expanded or loaded from a file)
-    word_list = ['function', 'variable', 'class', 'editor', 'palette', 'widget']
-    autocomplete_manager = AutoCompleteManager(text_widget, word_list)
+    # Auto-complete words come from the buffer and the FLARE notes, kept current from the buffer's edits
+    shared_vocabulary.attach(EditTracker.for_widget(text_widget))
+    autocomplete_manager = AutoCompleteManager(text_widget, vocabulary=shared_vocabulary)
 
     # Theming
     theme_manager = ThemeManager(text_widget)
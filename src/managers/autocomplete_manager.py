@@ -1,25 +1,44 @@
+from src.managers.completion_index import CompletionIndex
+from src.managers.fuzzy_matcher import FuzzyMatcher
+from src.widgets.completion_popup import CompletionPopup
+
 
 class AutoCompleteManager:
-    def __init__(self, text_widget, word_list=None):
+    def __init__(self, text_widget, word_list=None, max_suggestions=10, vocabulary=None):
         self.text_widget = text_widget
-        self.word_list = word_list if word_list else []
+        self.index = CompletionIndex(word_list or [])  # Sorted vocabulary; lookups bisect instead of scanning
+        self.fuzzy = FuzzyMatcher(self.index.words)  # Subsequence matches such as "gun" for getUserName
+        self.vocabulary = vocabulary  # BufferVocabulary ranking words of the open documents, if given
+        self.max_suggestions = max_suggestions
         self.bind_auto_complete()
 
     def bind_auto_complete(self):
-        # Bind to key-release events to suggest autocomplete options
-        self.text_widget.bind('<KeyRelease>', self.on_key_release)
+        # Key releases drive a debounced completion popup; the buffer is only edited when a word is accepted
+        self.popup = CompletionPopup(self.text_widget, self, max_items=self.max_suggestions)
+
+    @property
+    def suspended(self):
+        return self.popup.suspended
+
+    @suspended.setter
+    def suspended(self, value):
+        # Held off during batch edits such as replace-all
+        self.popup.suspended = value
+        if value:
+            self.popup.hide()
 
-    def on_key_release(self, event):
-        # Show auto-complete suggestions if applicable
-        typed_word = event.widget.get("insert linestart", "insert")
-        last_word = typed_word.split()[-1]
-        if last_word:
-            self.show_suggestions(last_word, event.widget.index("insert"))
+    def load_words(self, file_path):
+        # Bulk-load a vocabulary file, one word per line; returns the vocabulary size
+        size = self.index.load(file_path)
+        self.fuzzy = FuzzyMatcher(self.index.words)
+        return size
 
-    def show_suggestions(self, typed_word, position):
-        # Displays the suggestions in the UI
-        suggestions = [w for w in self.word_list if w.startswith(typed_word)]
-        self.text_widget.delete("%s linestart" % position, position)
-        self.text_widget.insert("%s linestart" % position, ' '.join(typed_word.split()[:-1]) + ' ' + (suggestions[0] if suggestions else typed_word))
-        self.text_widget.mark_set("insert", position)
-        
+    def suggest(self, prefix, k=10):
+        # Ranked words of the open documents when a vocabulary is attached, the fixed word list otherwise;
+        # prefix matches first, then fuzzy matches
+        if self.vocabulary is not None:
+            return self.vocabulary.suggest(prefix, k)
+        suggestions = [word for word in self.index.suggest(prefix, k + 1) if word != prefix][:k]
+        if len(suggestions) < k:
+            suggestions.extend(word for _, word in self.fuzzy.match(prefix, k) if not word.startswith(prefix))
+        return suggestions[:k]
@@ -0,0 +1,178 @@
+# buffer_vocabulary.py builds the completion vocabulary from the open buffers and FLARE notes, ranked by use
+
+import heapq
+import re
+from bisect import bisect_left, insort
+from collections import Counter
+
+from src.managers.completion_index import CompletionIndex
+from src.managers.fuzzy_matcher import FuzzyMatcher
+
+# Words worth completing: start with a letter or underscore at a word boundary, at least three characters
+WORD = re.compile(r'\b[^\W\d]\w{2,}')
+
+
+def count_words(text):
+    """ Occurrences of every completable word in `text`. """
+    return Counter(WORD.findall(text))
+
+
+class BufferVocabulary:
+    """
+    Completion vocabulary of words occurring in attached buffers and FLARE notes. Buffers are followed through
+    their EditTracker: each delta re-counts only the lines it touched, against a shadow copy of those lines, so
+    keeping the vocabulary current costs the same per keystroke however large the documents are. Notes are
+    counted whenever their text is set. Suggestions rank by occurrence count plus a bonus for words typed
+    recently that halves every `half_life` edits; when fewer than requested start with the prefix, fuzzy
+    matches (e.g. "hndlr" for handler) fill the list.
+    Words are also bucketed by occurrence count. A prefix with more than `max_candidates` matches (one or two
+    typed letters) is ranked by walking the buckets from the most used down, stopping once no word left can
+    outscore the k found: the bonus never exceeds `recency_weight`, so a bucket's words score at most its
+    count plus that. The result is the same as ranking every match, at the cost of the frequent words only.
+    Parameters:
+        recency_weight (float): Bonus of a word typed in the latest edit, in occurrences.
+        half_life (int): Edits after which the recency bonus has halved.
+        max_candidates (int): Prefix matches ranked one by one; above this the count buckets are walked instead.
+    """
+    def __init__(self, recency_weight=8.0, half_life=200, max_candidates=1000):
+        self.recency_weight = recency_weight
+        self.half_life = half_life
+        self.max_candidates = max_candidates
+        self.counts = {}  # Word -> occurrences over every source
+        self.last_used = {}  # Word -> edit tick at which its count last grew through an edit
+        self.index = CompletionIndex()
+        self.fuzzy = FuzzyMatcher()
+        self.tick = 0
+        self._by_count = {}  # Occurrences -> words occurring that often
+        self._levels = []  # Keys of _by_count, ascending
+        self._documents = {}  # Note key -> Counter of its words
+        self._buffers = {}  # EditTracker -> (shadow lines, listener)
+
+    def attach(self, edit_tracker, content=None):
+        """
+        Counts the words of a buffer and follows its edits from now on.
+        Parameters:
+            edit_tracker (EditTracker): The buffer's tracker.
+            content (str): The buffer's current text; read from the widget if omitted.
+        """
+        if edit_tracker in self._buffers:
+            self.detach(edit_tracker)
+        if content is None:
+            content = edit_tracker.text_widget.get('1.0', 'end-1c')
+        lines = content.split('\n')
+        listener = lambda delta: self._on_edit(edit_tracker, lines, delta)
+        self._buffers[edit_tracker] = (lines, listener)
+        edit_tracker.add_listener(listener)
+        self._apply(count_words(content), Counter())
+
+    def detach(self, edit_tracker):
+        """ Stops following a buffer and forgets its words. """
+        lines, listener = self._buffers.pop(edit_tracker)
+        edit_tracker.remove_listener(listener)
+        self._apply(Counter(), count_words('\n'.join(lines)))
+
+    def update_document(self, key, text):
+        """ Sets the text of a FLARE note (or any other document not open in a buffer); None removes it. """
+        old = self._documents.pop(key, Counter())
+        new = count_words(text) if text is not None else Counter()
+        if new:
+            self._documents[key] = new
+        self._apply(new, old)
+
+    def suggest(self, prefix, k=10):
+        """
+        Returns up to `k` words starting with `prefix`, most used first, then the best fuzzy matches; the prefix
+        itself is left out, as it is what has been typed already.
+        """
+        if self.index.count_prefix(prefix) <= self.max_candidates:
+            candidates = self.index.suggest(prefix, self.max_candidates)
+            suggestions = heapq.nlargest(k, (word for word in candidates if word != prefix), key=self.score)
+        else:
+            suggestions = self._most_used(prefix, k)
+        if len(suggestions) < k:
+            suggestions.extend(word for _, word in self.fuzzy.match(prefix, k)
+                               if word != prefix and not word.startswith(prefix))
+        return suggestions[:k]
+
+    def score(self, word):
+        """ Ranking key of a word: its occurrences plus the decaying bonus for recent typing. """
+        age = self.tick - self.last_used.get(word, -10 * self.half_life)
+        return self.counts.get(word, 0) + self.recency_weight * 0.5 ** (age / self.half_life)
+
+    def _most_used(self, prefix, k):
+        # Top k words with the prefix, walking the count buckets down until none can beat the k-th best
+        best = []  # Min-heap of (score, word)
+        for level in reversed(self._levels):
+            if len(best) == k and best[0][0] >= level + self.recency_weight:
+                break
+            for word in self._by_count[level]:
+                if word != prefix and word.startswith(prefix):
+                    entry = (self.score(word), word)
+                    if len(best) < k:
+                        heapq.heappush(best, entry)
+                    elif entry > best[0]:
+                        heapq.heapreplace(best, entry)
+        return [word for _, word in sorted(best, reverse=True)]
+
+    def _bucket(self, word, old, new):
+        # Move a word between count buckets; 0 stands for no bucket
+        if old:
+            bucket = self._by_count[old]
+            bucket.discard(word)
+            if not bucket:
+                del self._by_count[old]
+                del self._levels[bisect_left(self._levels, old)]
+        if new:
+            if new not in self._by_count:
+                self._by_count[new] = set()
+                insort(self._levels, new)
+            self._by_count[new].add(word)
+
+    def _on_edit(self, edit_tracker, lines, delta):
+        # Re-count the touched lines before and after the edit, and mirror the edit in the shadow lines
+        self.tick += 1
+        first = delta.start[0] - 1
+        try:
+            if delta.op == 'insert':
+                old = lines[first]
+                column = delta.start[1]
+                new = (old[:column] + delta.text + old[column:]).split('\n')
+                removed, added = count_words(old), count_words('\n'.join(new))
+                lines[first:first + 1] = new
+            else:
+                last = delta.end[0] - 1
+                old = lines[first:last + 1]
+                merged = old[0][:delta.start[1]] + old[-1][delta.end[1]:]
+                removed, added = count_words('\n'.join(old)), count_words(merged)
+                lines[first:last + 1] = [merged]
+        except IndexError:
+            # The shadow lost track of the buffer (e.g. edits made before attaching); count it afresh
+            self.attach(edit_tracker)
+            return
+        self._apply(added, removed, typed=True)
+
+    def _apply(self, added, removed, typed=False):
+        # Net count changes only; with `typed`, words whose count grew are the ones just typed
+        counts, index, fuzzy = self.counts, self.index, self.fuzzy
+        for word in added.keys() | removed.keys():
+            change = added[word] - removed[word]
+            if not change:
+                continue
+            count = counts.get(word, 0) + change
+            self._bucket(word, counts.get(word, 0), max(count, 0))
+            if count > 0:
+                if word not in counts:
+                    index.add(word)
+                    fuzzy.add(word)
+                counts[word] = count
+                if typed and change > 0:
+                    self.last_used[word] = self.tick
+            elif word in counts:
+                del counts[word]
+                self.last_used.pop(word, None)
+                index.remove(word)
+                fuzzy.remove(word)
+
+
+# Shared by every buffer and FLARE note, so completion offers words from all open documents
+shared_vocabulary = BufferVocabulary()
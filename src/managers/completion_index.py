@@ -0,0 +1,78 @@
+# completion_index.py keeps completion words sorted so prefix lookups cost a bisection instead of a scan
+
+from bisect import bisect_left, insort
+
+
+class CompletionIndex:
+    """
+    Prefix index over a vocabulary, backed by one sorted list. Every word with a given prefix sits in one
+    contiguous run of the list, so a lookup is a bisection to the run's start plus the k words taken from it:
+    O(log n + k), however large the vocabulary grows.
+    Parameters:
+        words (iterable): Initial vocabulary.
+    """
+    def __init__(self, words=()):
+        self.words = sorted(set(words))
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        position = bisect_left(self.words, word)
+        return position < len(self.words) and self.words[position] == word
+
+    def add(self, word):
+        """ Adds one word; returns True if it was new. """
+        if not word or word in self:
+            return False
+        insort(self.words, word)
+        return True
+
+    def remove(self, word):
+        """ Removes one word; returns True if it was present. """
+        position = bisect_left(self.words, word)
+        if position < len(self.words) and self.words[position] == word:
+            del self.words[position]
+            return True
+        return False
+
+    def update(self, words):
+        """ Adds many words with one sort, instead of one insertion each. """
+        merged = set(self.words)
+        merged.update(word for word in words if word)
+        self.words = sorted(merged)
+
+    def load(self, file_path, encoding='utf-8'):
+        """
+        Bulk-loads a word list file: one word per line, blank lines and lines starting with '#' ignored.
+        Returns:
+            int: Size of the vocabulary after loading.
+        """
+        with open(file_path, 'r', encoding=encoding) as file:
+            self.update(line.strip() for line in file if not line.startswith('#'))
+        return len(self.words)
+
+    def suggest(self, prefix, k=10):
+        """
+        Returns up to `k` words starting with `prefix` (the prefix itself included if it is a word), in sorted order.
+        """
+        words = self.words
+        position = bisect_left(words, prefix)
+        suggestions = []
+        while position < len(words) and len(suggestions) < k:
+            word = words[position]
+            if not word.startswith(prefix):
+                break
+            suggestions.append(word)
+            position += 1
+        return suggestions
+
+    def count_prefix(self, prefix):
+        """ Number of words starting with `prefix`, also found by bisection. """
+        # Every word with the prefix sorts below the prefix with its last character incremented; trailing
+        # highest code points cannot be incremented, so they are dropped first
+        end = prefix.rstrip('\U0010ffff')
+        if not end:
+            return len(self.words) - bisect_left(self.words, prefix)
+        end = end[:-1] + chr(ord(end[-1]) + 1)
+        return bisect_left(self.words, end) - bisect_left(self.words, prefix)
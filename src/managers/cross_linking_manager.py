@@ -1,30 +1,58 @@
 # Advanced Cross-Linking for Flare Widgets (Document Widgets)
 
+from src.editors.edit_tracker import EditTracker
+from src.managers.link_graph import shared_link_graph
+from src.managers.link_registry import LinkRegistry
+from src.widgets.flare_window_pool import FlareWindowPool
+
 
 class CrossLinkingManager:
-    def __init__(self, text_widget, flare_widgets):
+    def __init__(self, text_widget, flare_widgets, edit_tracker=None, flare_pool=None, link_graph=None):
         """
         Manages cross-linking between various parts of documents and FLARE widgets
         Parameters:
             text_widget (tk.Text): The main text editor widget
             flare_widgets (dict): Dictionary mapping document keywords to FLARE widgets
+            edit_tracker (EditTracker): The widget's tracker, keeping link ranges in step with edits; the
+                widget's shared one if omitted
+            flare_pool (FlareWindowPool): Pool lending windows to the FLAREs; a small one of its own if omitted
+            link_graph (LinkGraph): Backlinks across documents; the shared graph if omitted
         """
         self.text_widget = text_widget
         self.flare_widgets = flare_widgets
+        self.flare_pool = flare_pool or FlareWindowPool(text_widget)
+        if edit_tracker is None:
+            edit_tracker = EditTracker.for_widget(text_widget)
+        # All links share one tag; the registry maps ranges to keywords, so clicks resolve with a bisection
+        self.links = LinkRegistry(text_widget, edit_tracker)
+        self.text_widget.tag_bind(self.links.tag, "<Button-1>", self.on_link_click)
+        # Which documents mention which FLARE keywords; the buffer's mentions follow its edits
+        self.link_graph = link_graph or shared_link_graph
+        self.link_graph.add_keywords(self.flare_widgets)
+        self.link_graph.attach(edit_tracker, text_widget._w)  # The Tcl path name: str() may be overridden
 
     def link_to_flare(self, keyword):
-        # Check if FLARE widget already exists for keyword, if not, create one
+        # FLAREs are window-less handles until opened; opening one borrows a window from the pool
         if keyword not in self.flare_widgets:
-            flare_widget = Toplevel(self.text_widget)
-            flare_widget.title(keyword)
-            flare_text = Text(flare_widget)
-            flare_text.pack(expand=True, fill='both')
-            self.flare_widgets[keyword] = flare_text
+            self.flare_widgets[keyword] = self.flare_pool.handle(keyword)
+            self.link_graph.add_keyword(keyword)
         # Bring the FLARE widget associated with the keyword to the front
-        self.flare_widgets[keyword].tkraise()
+        self.flare_widgets[keyword].open()
 
     def insert_link(self, start_idx, end_idx, keyword):
         # Insert a clickable link that will open the associated FLARE widget
-        self.text_widget.tag_add(keyword, start_idx, end_idx)
-        # Bind mouse click event to the link_to_flare method
-        self.text_widget.tag_bind(keyword, "<Button-1>", lambda e, kw=keyword: self.link_to_flare(kw))
\ No newline at end of file
+        self.links.add(start_idx, end_idx, keyword)
+
+    def what_links_here(self, keyword):
+        # Every (document, start_index, end_index) mentioning the keyword, across the buffer and the notes
+        return self.link_graph.what_links_here(keyword)
+
+    def orphaned_keywords(self):
+        # FLARE keywords no document mentions
+        return self.link_graph.orphans()
+
+    def on_link_click(self, event):
+        # Open the FLARE widget of the link under the mouse
+        keyword = self.links.keyword_at(f"@{event.x},{event.y}")
+        if keyword is not None:
+            self.link_to_flare(keyword)
\ No newline at end of file
@@ -0,0 +1,261 @@
+# flare_store.py persists FLARE notes and their formatting in SQLite, loading each note only when it is opened
+
+import json
+import os
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    keyword TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    spans TEXT
+);
+"""
+
+# Stand-in for a pending deletion among pending writes
+DELETED = object()
+
+
+class FlareStore:
+    """
+    SQLite store of FLARE notes: one row per keyword with its text and its formatting spans, a JSON list of
+    [tag, start_index, end_index]. Listing the keywords reads no note text, so opening a knowledge base of
+    tens of thousands of notes costs one narrow query; a note's text is read when it is opened.
+    Saves never wait for the disk: they are queued for one background writer thread, which collects them for
+    `flush_interval` seconds (or until `batch_size` are waiting) and commits them in one transaction, keeping
+    only the latest save of a note. Reads look at the queue first, so they always see the latest save.
+    A batch that fails to commit stays queued, and the writer leaves it alone until the next `flush` or
+    `close`, which try it once more and raise the error if it fails again.
+    Every thread reads through its own connection, and WAL mode lets reads run during a write.
+    Parameters:
+        db_path (str): Location of the database, defaults to ~/.heatup/flare_notes.sqlite3.
+        flush_interval (float): Seconds a save may wait for others to join its batch.
+        batch_size (int): Queued saves that start a write at once.
+    """
+    def __init__(self, db_path=None, flush_interval=0.5, batch_size=500):
+        self.db_path = db_path or os.path.join(os.path.expanduser('~'), '.heatup', 'flare_notes.sqlite3')
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.error = None  # Last error of the writer thread; its batch is retried by the next flush
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._local = threading.local()
+        self._condition = threading.Condition()
+        self._pending = {}  # Keyword -> (content, spans) or DELETED, waiting for the writer
+        self._writing = {}  # The batch the writer is committing
+        self._urgent = False  # Set by flush: write without waiting for the batch to fill
+        self._failed = False  # Set when a write fails: no retry until a flush or close asks for one
+        self._closed = False
+        self._connection().executescript(SCHEMA)
+        self._writer = threading.Thread(target=self._run, name='heatup-flare-store', daemon=True)
+        self._writer.start()
+
+    def _connection(self):
+        # One connection per thread, as sqlite3 connections must not be shared between threads
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def keywords(self):
+        """ Keywords of every stored note, sorted, without reading any note text. """
+        with self._condition:
+            queued = {**self._writing, **self._pending}
+        stored = {row[0] for row in self._connection().execute('SELECT keyword FROM notes')}
+        stored.update(keyword for keyword, value in queued.items() if value is not DELETED)
+        stored.difference_update(keyword for keyword, value in queued.items() if value is DELETED)
+        return sorted(stored)
+
+    def load(self, keyword):
+        """
+        Reads one note.
+        Returns:
+            tuple: (content, spans) with spans as (tag, start_index, end_index) tuples, or None if there is no note.
+        """
+        with self._condition:
+            value = self._pending.get(keyword, self._writing.get(keyword))
+        if value is DELETED:
+            return None
+        if value is not None:
+            return value
+        row = self._connection().execute('SELECT content, spans FROM notes WHERE keyword = ?', (keyword,)).fetchone()
+        if row is None:
+            return None
+        return row[0], [tuple(span) for span in json.loads(row[1] or '[]')]
+
+    def notes(self):
+        """
+        Yields (keyword, content) for every note, streaming rows rather than holding them all; for bulk readers
+        such as a backlink build. Queued saves take precedence over the rows they will replace, and notes only
+        queued so far come last.
+        """
+        with self._condition:
+            queued = {**self._writing, **self._pending}  # Taken before the read, so a note written meanwhile is in it
+        stored = set()
+        for keyword, content in self._connection().execute('SELECT keyword, content FROM notes'):
+            stored.add(keyword)
+            with self._condition:
+                value = self._pending.get(keyword, self._writing.get(keyword))
+            if value is DELETED:
+                continue
+            yield keyword, value[0] if value is not None else content
+        for keyword, value in queued.items():
+            if value is not DELETED and keyword not in stored:
+                yield keyword, value[0]
+
+    def save(self, keyword, content, spans=()):
+        """ Queues a note for the writer; returns at once. """
+        self._queue(keyword, (content, [tuple(span) for span in spans]))
+
+    def delete(self, keyword):
+        """ Queues the removal of a note. """
+        self._queue(keyword, DELETED)
+
+    def import_notes(self, notes, batch_size=1000, progress=None, timeout=30):
+        """
+        Bulk-loads notes on the calling thread, many rows per transaction, bypassing the writer queue.
+        Parameters:
+            notes (iterable): (keyword, content) or (keyword, content, spans) tuples.
+            batch_size (int): Notes committed per transaction.
+            progress (callable): Called with the number of notes imported so far after each transaction.
+            timeout (float): Seconds to wait for the queued saves to be written first.
+        Returns:
+            int: Number of notes imported.
+        """
+        # Queued saves of the same notes are older than the import, so they must not land after it
+        if not self.flush(timeout):
+            raise TimeoutError('queued FLARE notes were not written in time')
+        connection = self._connection()
+        imported, rows = 0, []
+        for note in notes:
+            keyword, content, spans = note if len(note) == 3 else (*note, ())
+            rows.append((keyword, content, json.dumps([list(span) for span in spans])))
+            if len(rows) >= batch_size:
+                imported += self._insert(connection, rows)
+                rows = []
+                if progress is not None:
+                    progress(imported)
+        if rows:
+            imported += self._insert(connection, rows)
+            if progress is not None:
+                progress(imported)
+        return imported
+
+    def import_files(self, paths, encoding='utf-8', **options):
+        """ Bulk-loads text files as notes, each keyed by its file name without extension. """
+        def notes():
+            for path in paths:
+                try:
+                    with open(path, 'r', encoding=encoding, errors='replace') as file:
+                        yield os.path.splitext(os.path.basename(path))[0], file.read()
+                except OSError:
+                    continue  # Unreadable files are skipped
+        return self.import_notes(notes(), **options)
+
+    def flush(self, timeout=None):
+        """
+        Writes every queued save now and waits for it.
+        Returns:
+            bool: False if `timeout` ran out first.
+        Raises:
+            sqlite3.Error: The writer failed to commit the queued saves, which stay queued.
+        """
+        with self._condition:
+            self._urgent = True
+            self._failed = False
+            self._condition.notify_all()
+            done = self._condition.wait_for(lambda: self._failed or (not self._pending and not self._writing), timeout)
+            if self._failed:
+                raise self.error
+            return done
+
+    def close(self, timeout=30):
+        """
+        Writes what is queued, stops the writer and closes this thread's connection.
+        Returns:
+            bool: False if the writer was still busy after `timeout` seconds.
+        Raises:
+            sqlite3.Error: The queued saves could not be written, and are lost.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._writer.join(timeout)
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+        with self._condition:
+            if self._failed and self._pending:
+                raise self.error
+        return not self._writer.is_alive()
+
+    def _queue(self, keyword, value):
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('FlareStore is closed')
+            self._pending[keyword] = value
+            # The first save starts the writer's flush_interval wait; a full batch ends it
+            if len(self._pending) == 1 or len(self._pending) >= self.batch_size:
+                self._condition.notify_all()
+
+    def _run(self):
+        # Writer thread: wait for saves, let a batch gather, commit it in one transaction
+        connection = self._connection()
+        while True:
+            with self._condition:
+                # After a failed write the batch waits for a flush or close, rather than failing over and over
+                self._condition.wait_for(lambda: self._closed or (self._pending and (self._urgent or not self._failed)))
+                if not (self._closed or self._urgent) and len(self._pending) < self.batch_size:
+                    self._condition.wait_for(lambda: self._closed or self._urgent
+                                             or len(self._pending) >= self.batch_size, self.flush_interval)
+                batch, self._pending, self._urgent = self._pending, {}, False
+                if not batch:
+                    return  # Closed with nothing left to write
+                self._writing = batch
+            try:
+                self._write(connection, batch)
+                error = None
+            except sqlite3.Error as failure:
+                error = failure
+            with self._condition:
+                self.error, self._failed = error, error is not None
+                if error is not None:
+                    # Keep the batch queued, unless the note was saved again meanwhile
+                    self._pending = {**batch, **self._pending}
+                self._writing = {}
+                self._condition.notify_all()
+                if error is not None and self._closed:
+                    return  # Close made its last attempt
+
+    @staticmethod
+    def _write(connection, batch):
+        # Upsert saved notes and drop deleted ones, in one transaction
+        saved = [(keyword, value[0], json.dumps([list(span) for span in value[1]]))
+                 for keyword, value in batch.items() if value is not DELETED]
+        with connection:
+            connection.executemany('INSERT OR REPLACE INTO notes (keyword, content, spans) VALUES (?, ?, ?)', saved)
+            connection.executemany('DELETE FROM notes WHERE keyword = ?',
+                                   ((keyword,) for keyword, value in batch.items() if value is DELETED))
+
+    @staticmethod
+    def _insert(connection, rows):
+        with connection:
+            connection.executemany('INSERT OR REPLACE INTO notes (keyword, content, spans) VALUES (?, ?, ?)', rows)
+        return len(rows)
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def default_store():
+    """ The shared store in the user's HEAT UP directory, opened on first use. """
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = FlareStore()
+        return _default_store
@@ -0,0 +1,250 @@
+# fuzzy_matcher.py ranks vocabulary words against a typed abbreviation such as "hndlr" or "getUN"
+
+import heapq
+import re
+
+from src.managers.completion_index import CompletionIndex
+
+# Score of one matched character, and the bonuses and penalties around it
+MATCH_SCORE = 16
+BOUNDARY_BONUS = 10  # Matched at the start of the word or of a sub-word (after _ - . or a camel hump)
+FIRST_CHAR_BONUS = 8  # The query's first character is the word's first character
+CONSECUTIVE_BONUS = 8  # Matched right after the previous query character
+GAP_PENALTY = 1  # Per word character skipped between two matched characters
+TAIL_PENALTY = 2  # Per word character left after the last matched one, so "handler" beats "handlerResult"
+LENGTH_PENALTY = 1  # Per word character, so shorter words win ties
+
+# Candidates kept by the cheap estimate for full scoring, per requested result
+PRUNE_FACTOR = 3
+
+# Words checked per step of a scan, between checks of its budget
+SCAN_CHUNK = 1000
+
+SEPARATORS = frozenset('_-./ ')
+
+
+def boundaries(word):
+    """ Positions in `word` that start a sub-word: the first character, after a separator, or a camel hump. """
+    positions = {0}
+    for i in range(1, len(word)):
+        previous, char = word[i - 1], word[i]
+        if previous in SEPARATORS or (char.isupper() and not previous.isupper()) \
+                or (char.isdigit() and not previous.isdigit()):
+            positions.add(i)
+    return positions
+
+
+def initials(word):
+    """ Lower-cased first characters of the sub-words of `word`, e.g. "gun" for getUserName. """
+    return ''.join(word[i] for i in sorted(boundaries(word))).lower()
+
+
+def score(query, word):
+    """
+    Best alignment score of `query` as a case-insensitive subsequence of `word`, or None if it is not one.
+    Dynamic programming over the positions where each query character occurs rewards contiguous runs and
+    sub-word starts; a gap of g skipped characters costs g * GAP_PENALTY, so the best earlier match is kept as
+    one running maximum of score + GAP_PENALTY * position instead of being searched for every position.
+    The characters after the last matched one cost TAIL_PENALTY each and every character LENGTH_PENALTY, so
+    an extra sub-word's boundary bonus does not outweigh the text it drags along.
+    """
+    lower = word.lower()
+    n, m = len(word), len(query)
+    if m == 0 or m > n:
+        return None
+    occurrences = {}
+    for i, char in enumerate(lower):
+        occurrences.setdefault(char, []).append(i)
+    starts = boundaries(word)
+    unreachable = float('-inf')
+    earlier, scores = (), ()  # Positions of the previous query character, and the best scores ending there
+    for j, char in enumerate(query):
+        positions = occurrences.get(char)
+        if not positions:
+            return None
+        current = []
+        carried, k = unreachable, 0  # Best previous score + GAP_PENALTY * position, at least two positions back
+        for i in positions:
+            value = MATCH_SCORE + (BOUNDARY_BONUS if i in starts else 0) + (FIRST_CHAR_BONUS if i == 0 else 0)
+            if j:
+                while k < len(earlier) and earlier[k] <= i - 2:
+                    carried = max(carried, scores[k] + GAP_PENALTY * earlier[k])
+                    k += 1
+                adjacent = scores[k] if k < len(earlier) and earlier[k] == i - 1 else unreachable
+                value += max(adjacent + CONSECUTIVE_BONUS, carried - GAP_PENALTY * (i - 1))
+            current.append(value)
+        earlier, scores = positions, current
+    best = max(value - TAIL_PENALTY * (n - 1 - i) for i, value in zip(earlier, scores))
+    return None if best == unreachable else best - LENGTH_PENALTY * n
+
+
+def subsequence_pattern(query):
+    """
+    Regex finding `query` as a subsequence, written "a[^b]*b[^c]*c" rather than "a.*?b.*?c": each gap stops at
+    the first occurrence of the next character, so the search is linear instead of backtracking.
+    """
+    parts = [re.escape(query[0])]
+    for char in query[1:]:
+        parts.append(f'[^{re.escape(char)}]*{re.escape(char)}')
+    return re.compile(''.join(parts))
+
+
+class FuzzyMatcher:
+    """
+    Subsequence ("fuzzy") matching over a vocabulary with bounded work per keystroke. A lookup pools:
+        - words starting with the query and words whose sub-word initials start with it, found by bisection
+          in two sorted indexes; these are the strongest matches and are never missed;
+        - the shortest subsequence matches, and the shortest matches containing the query as one run.
+    Subsequence matches come from a scan, shortest words first, of the words containing the query's rarest
+    character, each checked with one compiled regex. The scan goes in chunks: a lookup checks at most
+    `max_scan` words and stops early once `max_matches` matches are pending. It resumes where it stopped while
+    the query grows, since a longer query only narrows the matches found so far, so on a large vocabulary the
+    first keystrokes rank the shorter part of the matches and the result becomes exact a few keystrokes in.
+    Only the pooled words, a few times `k`, get the full alignment score. Once the scan is complete and at
+    most `max_scored` matches are left, all of them are scored instead, and the result is exact.
+    Parameters:
+        words (iterable): Initial vocabulary.
+        min_query (int): Shorter queries return no fuzzy matches; prefix completion covers them.
+        max_scan (int): Words checked at most per lookup.
+        max_matches (int): Pending matches at which a lookup stops scanning.
+        max_scored (int): Matches of a complete scan scored one by one rather than pooled.
+    """
+    def __init__(self, words=(), min_query=2, max_scan=8000, max_matches=2000, max_scored=200):
+        self.min_query = min_query
+        self.max_scan = max_scan
+        self.max_matches = max_matches
+        self.max_scored = max_scored
+        self._by_char = {}  # Lower-case character -> word length -> lower-case words, removed ones included
+        self._char_counts = {}  # Lower-case character -> number of current words containing it
+        self._originals = {}  # Lower-case word -> set of the words as added
+        self._removed = 0  # Removed words still listed in _by_char
+        self._prefixes = CompletionIndex()  # Lower-case words
+        self._initials = CompletionIndex()  # "initials\0word" entries
+        self._scan = None  # _Scan of the last lookup
+        self.update(words)
+
+    def __len__(self):
+        return sum(len(originals) for originals in self._originals.values())
+
+    def add(self, word):
+        """ Adds one word. """
+        lower = word.lower()
+        originals = self._originals.get(lower)
+        if originals is None:
+            originals = self._originals[lower] = set()
+            for char in set(lower):
+                self._by_char.setdefault(char, {}).setdefault(len(lower), []).append(lower)
+                self._char_counts[char] = self._char_counts.get(char, 0) + 1
+            self._prefixes.add(lower)
+            self._initials.add(f'{initials(word)}\0{lower}')
+            if self._scan is not None and self._scan.pattern.search(lower):
+                self._scan.matches.append(lower)  # Keep the last scan resumable while words are typed
+        originals.add(word)
+
+    def remove(self, word):
+        """ Removes one word, if present. """
+        lower = word.lower()
+        originals = self._originals.get(lower)
+        if originals is None or word not in originals:
+            return
+        originals.discard(word)
+        if not originals:
+            del self._originals[lower]  # Copies left in _by_char and the last scan are skipped when scoring
+            for char in set(lower):
+                self._char_counts[char] -= 1
+            self._prefixes.remove(lower)
+            self._initials.remove(f'{initials(word)}\0{lower}')
+            self._removed += 1
+            if self._removed > len(self._originals) // 4 + 1000:
+                self._compact()
+
+    def update(self, words):
+        """ Adds many words. """
+        for word in words:
+            self.add(word)
+
+    def match(self, query, k=10):
+        """
+        The `k` best words for a query, best first.
+        Returns:
+            list: (score, word) pairs.
+        """
+        lower_query = query.lower()
+        if len(lower_query) < self.min_query:
+            return []
+        size = k * PRUNE_FACTOR
+        matches = self._matches(lower_query)
+        if not self._scan.remaining() and len(matches) <= self.max_scored:
+            pool = set(matches)  # Every word matching the query
+        else:
+            pool = set(self._prefixes.suggest(lower_query, size))
+            pool.update(entry.split('\0', 1)[1] for entry in self._initials.suggest(lower_query, size))
+            pool.update(heapq.nsmallest(size, matches, key=len))
+            pool.update(heapq.nsmallest(size, filter(re.compile(re.escape(lower_query)).search, matches), key=len))
+        results = []
+        for lower in pool:
+            for word in self._originals.get(lower, ()):
+                value = score(lower_query, word)
+                if value is not None:
+                    results.append((value, word))
+        return heapq.nlargest(k, results)
+
+    def _matches(self, lower_query):
+        # Subsequence matches found so far: narrow the last scan's when the query extends it, else start one
+        # over the rarest character's words, then scan on within the budget
+        pattern = subsequence_pattern(lower_query)
+        rarest = min(set(lower_query), key=lambda char: self._char_counts.get(char, 0))
+        scan = self._scan
+        if scan is not None and lower_query.startswith(scan.query) \
+                and len(scan.matches) + scan.remaining() <= self._char_counts.get(rarest, 0):
+            scan.query, scan.pattern = lower_query, pattern
+            scan.matches = list(filter(pattern.search, scan.matches))
+        else:
+            lengths = self._by_char.get(rarest, {})
+            scan = self._scan = _Scan(lower_query, pattern, [lengths[length] for length in sorted(lengths)])
+        scan.advance(self.max_scan, self.max_matches)
+        return scan.matches
+
+    def _compact(self):
+        # Drop removed words from the per-character lists
+        self._by_char = {}
+        for lower in self._originals:
+            for char in set(lower):
+                self._by_char.setdefault(char, {}).setdefault(len(lower), []).append(lower)
+        self._removed = 0
+        self._scan = None
+
+
+class _Scan:
+    """
+    Resumable scan of word lists for one query and its extensions.
+    Parameters:
+        query (str): Lower-case query.
+        pattern (re.Pattern): Its subsequence pattern.
+        lists (list): Word lists to scan, in order; lists grow while scanned and the scan picks up their tails.
+    """
+    __slots__ = ('query', 'pattern', 'matches', 'lists', 'list_index', 'offset')
+
+    def __init__(self, query, pattern, lists):
+        self.query = query
+        self.pattern = pattern
+        self.matches = []
+        self.lists = lists
+        self.list_index = 0
+        self.offset = 0
+
+    def remaining(self):
+        """ Words not scanned yet. """
+        return sum(len(words) for words in self.lists[self.list_index:]) - self.offset
+
+    def advance(self, max_scan, max_matches):
+        """ Scans on, in chunks, until `max_scan` words are checked, `max_matches` are pending, or the end. """
+        scanned = 0
+        while scanned < max_scan and len(self.matches) < max_matches and self.list_index < len(self.lists):
+            words = self.lists[self.list_index]
+            chunk = words[self.offset:self.offset + SCAN_CHUNK]
+            self.matches.extend(filter(self.pattern.search, chunk))
+            scanned += len(chunk)
+            self.offset += len(chunk)
+            if self.offset >= len(words):
+                self.list_index, self.offset = self.list_index + 1, 0
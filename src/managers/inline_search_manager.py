@@ -1,30 +1,52 @@
 
+import tkinter as tk
+
+from src.editors.edit_tracker import EditTracker
+from src.editors.tag_batcher import TagBatcher
+from src.managers.replace_manager import ReplaceManager
+from src.managers.search_engine import SearchEngine
+from src.widgets.search_bar import SearchBar
+
+
 class InlineSearchManager:
     """
     Handles inline search within the document
     """
-    def init(self, text_widget):
+    def init(self, text_widget, autocomplete_manager=None):
         self.text_widget = text_widget
+        self.autocomplete_manager = autocomplete_manager  # Held off while replace-all edits the buffer
+        self.search_engine = SearchEngine(text_widget)
+        self.tag_batcher = TagBatcher(text_widget, ['search'])
+        self.last_result = None  # SearchResult of the latest search: match count and elapsed time
+        self._searched_content = None
+        self.search_bar = None  # Inline find bar, created on first Ctrl+F
 
     def search_for_text(self, search_query):
-        # Search for the query text and highlight all occurrences
-        start_index = '1.0'
-        while True:
-            start_index = self.text_widget.search(search_query, start_index, stopindex=tk.END)
-            if not start_index:
-                break
-            end_index = f"{start_index}+{len(search_query)}c"
-            self.text_widget.tag_add('search', start_index, end_index)
-            self.text_widget.tag_config('search', background='yellow')
-            start_index = end_index
+        # Search for the query text in one snapshot and highlight all occurrences
+        if not search_query:
+            return None
+        content = self.text_widget.get('1.0', 'end-1c')
+        if content != self._searched_content:
+            # Edits since the last search moved the old highlights, so they can't be diffed against
+            self.tag_batcher.reset()
+            self._searched_content = content
+        self.text_widget.tag_config('search', background='yellow')
+        self.last_result = self.search_engine.highlight(search_query, 'search', content=content,
+                                                        tag_batcher=self.tag_batcher)
         self.text_widget.tag_remove('sel', '1.0', tk.END) # Clear existing selections
+        return self.last_result
 
     def bind_search(self):
         # Bind key combination for inline search functionality
         self.text_widget.bind('<Control-f>', self.prompt_search_query)
 
-    def prompt_search_query(self, event):
-        # Prompt user for search query
-        search_query = simpledialog.askstring("Search", "Enter search text:")
-        if search_query:
-            self.search_for_text(search_query)
\ No newline at end of file
+    def prompt_search_query(self, event=None):
+        # Open the inline search bar; matches are refined as the query is typed
+        if self.search_bar is None:
+            tracker = EditTracker.for_widget(self.text_widget)
+            suspend = [self.autocomplete_manager] if self.autocomplete_manager is not None else []
+            replace_manager = ReplaceManager(self.text_widget, tracker, suspend=suspend)
+            self.search_bar = SearchBar(self.text_widget.master, self.text_widget, tracker,
+                                        replace_manager=replace_manager)
+        self.search_bar.show()
+        return 'break'
\ No newline at end of file
@@ -0,0 +1,209 @@
+# keyword_automaton.py finds every linked keyword in a text in one pass with an Aho-Corasick automaton
+
+import re
+import time
+
+from src.editors.line_offset_table import LineOffsetTable
+from src.editors.tag_batcher import TagBatcher
+
+# Keywords and text are both split into these tokens; a keyword only ever matches whole words
+WORD = re.compile(r'\w+')
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over word tokens. Keywords are sequences of words, so "heat up" matches
+    "heat up" and "heat-up" alike, and scanning takes one transition per word of the text instead of one
+    per character. Adding or removing a keyword only touches its own path in the trie; failure links are
+    recomputed in one breadth-first pass on the next scan, so loading thousands of keywords costs one rebuild.
+    Nodes pruned by a removal are reused by later additions, so linking and unlinking keywords all session
+    long never grows the trie past the most keywords held at once.
+    Parameters:
+        nocase (bool): Match keywords regardless of case.
+    """
+    def __init__(self, nocase=False):
+        self.nocase = nocase
+        self._goto = [{}]  # Node -> {word: child node}; node 0 is the root
+        self._depth = [0]  # Words on the path to each node
+        self._output = [None]  # Keyword ending at each node
+        self._fail = [0]
+        self._report = [0]  # Nearest node on the failure chain with an output, 0 for none
+        self._keywords = {}  # Normalized keyword -> keyword as added
+        self._free = []  # Pruned nodes, reused by add
+        self._dirty = False
+
+    def __len__(self):
+        return len(self._keywords)
+
+    def __contains__(self, keyword):
+        return self.normalize(keyword) in self._keywords
+
+    def normalize(self, keyword):
+        """ The key identifying a keyword: its words, lower-cased if matching ignores case. """
+        return ' '.join(self._words(keyword))
+
+    def _words(self, text):
+        return WORD.findall(text.lower() if self.nocase else text)
+
+    def add(self, keyword):
+        """ Adds a keyword; keywords without a word character are ignored. Returns True if it was new. """
+        words = self._words(keyword)
+        key = ' '.join(words)
+        if not words or key in self._keywords:
+            return False
+        node = 0
+        for word in words:
+            child = self._goto[node].get(word)
+            if child is None:
+                child = self._new_node(self._depth[node] + 1)
+                self._goto[node][word] = child
+            node = child
+        self._output[node] = keyword
+        self._keywords[key] = keyword
+        self._dirty = True
+        return True
+
+    def remove(self, keyword):
+        """ Removes a keyword and prunes the part of its path no other keyword uses. Returns True if it was present. """
+        words = self._words(keyword)
+        if self._keywords.pop(' '.join(words), None) is None:
+            return False
+        path = [0]
+        for word in words:
+            path.append(self._goto[path[-1]][word])
+        self._output[path[-1]] = None
+        for depth in range(len(words), 0, -1):
+            node = path[depth]
+            if self._goto[node] or self._output[node] is not None:
+                break
+            del self._goto[path[depth - 1]][words[depth - 1]]
+            self._free.append(node)
+        self._dirty = True
+        return True
+
+    def _new_node(self, depth):
+        # A pruned node if there is one, a new one otherwise
+        if self._free:
+            node = self._free.pop()
+            self._goto[node] = {}
+            self._depth[node] = depth
+            self._output[node] = None
+            return node
+        self._goto.append({})
+        self._depth.append(depth)
+        self._output.append(None)
+        return len(self._goto) - 1
+
+    def update(self, keywords):
+        """ Adds many keywords at once. """
+        for keyword in keywords:
+            self.add(keyword)
+
+    def _build_links(self):
+        # Breadth-first over the trie: a node's failure link extends its parent's failure link
+        fail = [0] * len(self._goto)
+        report = [0] * len(self._goto)
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for word, child in self._goto[node].items():
+                target = fail[node]
+                while target and word not in self._goto[target]:
+                    target = fail[target]
+                fail[child] = self._goto[target].get(word, 0) if node else 0
+                link = fail[child]
+                report[child] = link if self._output[link] is not None else report[link]
+                queue.append(child)
+        self._fail, self._report = fail, report
+        self._dirty = False
+
+    def finditer(self, text):
+        """
+        Yields (start, end, keyword) for every keyword occurrence in the text, overlapping ones included,
+        in order of their end offset.
+        """
+        if self._dirty:
+            self._build_links()
+        goto, fail, report, output, depth = self._goto, self._fail, self._report, self._output, self._depth
+        nocase = self.nocase
+        root = goto[0]
+        starts, ends = [], []
+        node = 0
+        for match in WORD.finditer(text):
+            word = match.group().lower() if nocase else match.group()
+            if not node and word not in root:
+                continue  # Starts no keyword and continues none, so no match can include it
+            starts.append(match.start())
+            ends.append(match.end())
+            while node and word not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(word, 0)
+            hit = node if output[node] is not None else report[node]
+            while hit:
+                yield starts[len(starts) - depth[hit]], ends[-1], output[hit]
+                hit = report[hit]
+
+
+class LinkedKeywords:
+    """
+    The keywords of every registered document widget, shared by all of them so one pass over a buffer tags
+    them all. Registrations are counted, so a keyword stays while any widget still links it; they are counted
+    per normalized keyword, like the automaton stores them, so "heat up" and "heat-up" share one count.
+    Parameters:
+        nocase (bool): Match keywords regardless of case.
+    """
+    def __init__(self, nocase=False):
+        self.automaton = KeywordAutomaton(nocase)
+        self.elapsed = None  # Seconds taken by the last highlight
+        self._counts = {}
+
+    def register(self, keyword):
+        """ Registers one more widget linking `keyword`. """
+        key = self.automaton.normalize(keyword)
+        if not key:
+            return  # No word to match
+        self._counts[key] = self._counts.get(key, 0) + 1
+        if self._counts[key] == 1:
+            self.automaton.add(keyword)
+
+    def unregister(self, keyword):
+        """ Drops one registration; the keyword leaves the automaton with its last widget. """
+        key = self.automaton.normalize(keyword)
+        count = self._counts.get(key, 0) - 1
+        if count > 0:
+            self._counts[key] = count
+        elif self._counts.pop(key, None) is not None:
+            self.automaton.remove(keyword)
+
+    def find(self, text_widget, start='1.0', end='end-1c'):
+        """
+        Finds every registered keyword in a range of a Text widget.
+        Returns:
+            tuple: ([(start_offset, end_offset, keyword), ...], LineOffsetTable of the range).
+        """
+        start = text_widget.index(start)
+        content = text_widget.get(start, end)
+        matches = list(self.automaton.finditer(content))
+        return matches, LineOffsetTable(content, origin=tuple(map(int, start.split('.'))))
+
+    def highlight(self, text_widget, tag, start='1.0', end='end-1c'):
+        """
+        Tags every registered keyword in the range with one shared tag, replacing the tag's previous ranges.
+        Returns:
+            list: The (start_offset, end_offset, keyword) matches, offsets relative to `start`.
+        """
+        started = time.perf_counter()
+        matches, table = self.find(text_widget, start, end)
+        offsets = []
+        for match_start, match_end, _ in sorted(matches):
+            if offsets and match_start <= offsets[-1]:
+                offsets[-1] = max(offsets[-1], match_end)  # Overlapping keywords become one range
+            else:
+                offsets.extend((match_start, match_end))
+        text_widget.tag_remove(tag, start, end)
+        TagBatcher.add_ranges(text_widget, tag, table.offsets_to_indices(offsets))
+        self.elapsed = time.perf_counter() - started
+        return matches
+
+
+# Shared by every DocumentWidget
+linked_keywords = LinkedKeywords()
@@ -0,0 +1,352 @@
+# link_graph.py records which documents mention which linked keywords, and where, for backlink queries
+
+import multiprocessing
+import os
+import threading
+from bisect import bisect_right
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+
+from src.editors.line_offset_table import LineOffsetTable
+from src.managers.keyword_automaton import KeywordAutomaton
+
+# Automaton of a build worker process, made once per worker by _start_worker
+_worker_automaton = None
+
+
+def line_references(automaton, text, key=None):
+    """
+    The keyword occurrences of a text, line by line.
+    Occurrences spanning lines are left out, since edits rescan single lines. So are mentions of `key`
+    itself: a note naming its own keyword does not link to itself.
+    Returns:
+        list: One entry per line, None or a tuple of (start_col, end_col, keyword).
+    """
+    line_starts = LineOffsetTable(text).line_starts
+    lines = [None] * len(line_starts)
+    for start, end, keyword in automaton.finditer(text):
+        row = bisect_right(line_starts, start) - 1
+        if keyword == key or (row + 1 < len(line_starts) and end >= line_starts[row + 1]):
+            continue
+        reference = (start - line_starts[row], end - line_starts[row], keyword)
+        lines[row] = lines[row] + (reference,) if lines[row] else (reference,)
+    return lines
+
+
+def _count(lines):
+    # Occurrences of every keyword in some line references
+    return Counter(reference[2] for line in lines if line for reference in line)
+
+
+def _start_worker(keywords, nocase):
+    global _worker_automaton
+    _worker_automaton = KeywordAutomaton(nocase)
+    _worker_automaton.update(keywords)
+
+
+def _scan(document):
+    # Build worker: (key, text) -> (key, line references); module level so worker processes can run it
+    key, text = document
+    return key, line_references(_worker_automaton, text, key) if text is not None else None
+
+
+def _scan_chunk(documents):
+    # Build worker: a list of documents per task, so inter-process traffic is per chunk rather than per note
+    return [_scan(document) for document in documents]
+
+
+class LinkGraph:
+    """
+    Which documents mention which linked keywords, and where. The forward map holds each document's
+    references line by line. The reverse map counts each keyword's mentions per document, so "what links
+    here" only visits the documents that do link, and the keywords nothing links to are kept as a set.
+    Buffers are followed through their EditTracker, like BufferVocabulary does: a delta rescans only the
+    lines it touched, against a shadow copy of them. Other documents (FLARE notes, files) are rescanned
+    whenever their text is set. `build` scans a whole corpus in parallel worker processes.
+    A corpus registered with `set_corpus` (e.g. every stored FLARE note) is only read once a query needs it,
+    so opening the editor reads no note text; that query starts a background build and, like every query
+    during a build, answers from what is indexed so far.
+    Keywords added later are found at once in attached buffers, and in other documents when they are next set.
+    Every method may be called from any thread; a lock serializes them.
+    Parameters:
+        nocase (bool): Match keywords regardless of case.
+        workers (int): Worker processes used by `build`; 1 scans on the calling thread.
+        chunk_size (int): Documents per worker task; at most two tasks per worker are in flight.
+    """
+    def __init__(self, nocase=False, workers=None, chunk_size=64):
+        self.nocase = nocase
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self._automaton = KeywordAutomaton(nocase)
+        self._keywords = set()
+        self._lock = threading.RLock()
+        self._documents = {}  # Document key -> line references, see line_references
+        self._forward = {}  # Document key -> Counter of the keywords it mentions
+        self._backlinks = {}  # Keyword -> {document key: mentions}
+        self._orphans = set()  # Keywords no document mentions
+        self._buffers = {}  # EditTracker -> (document key, shadow lines, listener)
+        self._writer = None  # Thread running build_async, started on first use
+        self._corpus = None  # Callable returning the (key, text) pairs scanned on first query, see set_corpus
+        self._fresh = None  # Keys set while the corpus is scanned, whose scanned text may be older
+
+    def keywords(self):
+        """ The linked keywords, sorted. """
+        with self._lock:
+            return sorted(self._keywords)
+
+    def add_keywords(self, keywords):
+        """ Adds linked keywords; attached buffers are rescanned once for all of them. """
+        with self._lock:
+            added = [keyword for keyword in keywords if self._automaton.add(keyword)]
+            self._keywords.update(added)
+            self._orphans.update(keyword for keyword in added if keyword not in self._backlinks)
+            if added:
+                for key, lines, _ in self._buffers.values():
+                    self._set(key, line_references(self._automaton, '\n'.join(lines), key), keep=True)
+
+    def add_keyword(self, keyword):
+        """ Adds one linked keyword. """
+        self.add_keywords([keyword])
+
+    def remove_keyword(self, keyword):
+        """ Removes a linked keyword and every reference to it. """
+        with self._lock:
+            if not self._automaton.remove(keyword):
+                return
+            self._keywords.discard(keyword)
+            self._orphans.discard(keyword)
+            for key in self._backlinks.pop(keyword, {}):
+                lines = self._documents[key]
+                for row, line in enumerate(lines):
+                    if line and any(reference[2] == keyword for reference in line):
+                        lines[row] = tuple(reference for reference in line if reference[2] != keyword) or None
+                del self._forward[key][keyword]
+
+    def attach(self, edit_tracker, key, content=None):
+        """
+        Scans a buffer and follows its edits from now on.
+        Parameters:
+            edit_tracker (EditTracker): The buffer's tracker.
+            key (str): Name of the buffer in query results, e.g. its file path.
+            content (str): The buffer's current text; read from the widget if omitted.
+        """
+        if edit_tracker in self._buffers:
+            self.detach(edit_tracker)
+        if content is None:
+            content = edit_tracker.text_widget.get('1.0', 'end-1c')
+        lines = content.split('\n')
+        listener = lambda delta: self._on_edit(edit_tracker, key, lines, delta)
+        with self._lock:
+            self._buffers[edit_tracker] = (key, lines, listener)
+            self._set(key, line_references(self._automaton, content, key), keep=True)
+        edit_tracker.add_listener(listener)
+
+    def detach(self, edit_tracker):
+        """ Stops following a buffer and forgets its references. """
+        key, _, listener = self._buffers.pop(edit_tracker)
+        edit_tracker.remove_listener(listener)
+        with self._lock:
+            self._set(key, None)
+
+    def update_document(self, key, text):
+        """ Sets the text of a FLARE note (or any other document not open in a buffer); None removes it. """
+        with self._lock:
+            self._set(key, line_references(self._automaton, text, key) if text is not None else None)
+            if self._fresh is not None:
+                self._fresh.add(key)
+
+    def set_corpus(self, documents):
+        """
+        Registers the documents not open in buffers, to be scanned in the background once a query needs them
+        (`what_links_here`, `linking_documents`, `links_from`, `orphans`) rather than now.
+        Parameters:
+            documents (callable): Returns an iterable of (key, text) pairs, e.g. FlareStore.notes.
+        """
+        with self._lock:
+            self._corpus = documents
+
+    def build(self, documents, batch_size=200, progress=None):
+        """
+        Scans many documents, replacing what was known of them. Documents are scanned in parallel worker
+        processes, each with its own copy of the keyword automaton; results are applied as they arrive, so
+        queries keep working (on partial results) during a build. Documents are read from `documents` only
+        as fast as the workers take them, a few chunks ahead, so a lazy source is never held in memory whole.
+        Parameters:
+            documents (iterable): (key, text) pairs; a text of None removes the document.
+            batch_size (int): Documents between progress reports.
+            progress (callable): Called with the number of documents scanned so far.
+        Returns:
+            int: Number of documents scanned.
+        """
+        if self.workers == 1:
+            return self._build(map(self._scan_here, documents), batch_size, progress)
+        workers = self.workers or os.cpu_count() or 1
+        # Spawned workers start clean, without a forked copy of Tk or of locks held by other threads
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_start_worker, initargs=(self.keywords(), self.nocase)) as pool:
+            return self._build(self._scan_chunks(pool, documents, 2 * workers), batch_size, progress)
+
+    def build_async(self, documents, **options):
+        """ `build` on a background thread; `documents` may be lazy (e.g. reading a FlareStore), it is consumed there. """
+        with self._lock:
+            if self._writer is None:
+                self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='heatup-link-graph')
+        return self._writer.submit(self.build, documents, **options)
+
+    def what_links_here(self, keyword):
+        """
+        Every mention of a keyword.
+        Returns:
+            list: (document key, start_index, end_index) tuples, sorted.
+        """
+        self._load_corpus()
+        with self._lock:
+            found = []
+            for key in self._backlinks.get(keyword, ()):
+                for row, line in enumerate(self._documents[key], 1):
+                    if line:
+                        found.extend((key, f'{row}.{start}', f'{row}.{end}')
+                                     for start, end, linked in line if linked == keyword)
+            return sorted(found, key=lambda link: (link[0], *map(int, link[1].split('.'))))
+
+    def linking_documents(self, keyword):
+        """ {document key: mentions} of the documents mentioning a keyword. """
+        self._load_corpus()
+        with self._lock:
+            return dict(self._backlinks.get(keyword, {}))
+
+    def links_from(self, key):
+        """
+        The mentions in one document.
+        Returns:
+            list: (start_index, end_index, keyword) tuples in document order.
+        """
+        self._load_corpus()
+        with self._lock:
+            return [(f'{row}.{start}', f'{row}.{end}', keyword)
+                    for row, line in enumerate(self._documents.get(key, ()), 1) if line
+                    for start, end, keyword in line]
+
+    def orphans(self):
+        """ Linked keywords no document mentions, sorted. """
+        self._load_corpus()
+        with self._lock:
+            return sorted(self._orphans)
+
+    def close(self):
+        """ Waits for a background build and stops its thread. """
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.shutdown(wait=True)
+
+    def _load_corpus(self):
+        # Start scanning the registered corpus, once, without keeping the querying (Tk) thread waiting
+        with self._lock:
+            documents, self._corpus = self._corpus, None
+            if documents is None:
+                return
+            self._fresh = set()
+        self.build_async(self._read_corpus(documents)).add_done_callback(self._corpus_built)
+
+    @staticmethod
+    def _read_corpus(documents):
+        # A generator, so even the first read of the corpus happens on the build thread
+        yield from documents()
+
+    def _corpus_built(self, future):
+        with self._lock:
+            self._fresh = None
+
+    def _scan_chunks(self, pool, documents, window):
+        # Results in document order, with at most `window` chunks submitted and not yet applied
+        documents = iter(documents)
+        pending = deque()
+        while True:
+            while len(pending) < window:
+                chunk = list(islice(documents, self.chunk_size))
+                if not chunk:
+                    break
+                pending.append(pool.submit(_scan_chunk, chunk))
+            if not pending:
+                return
+            yield from pending.popleft().result()
+
+    def _scan_here(self, document):
+        # _scan on the calling thread, with the shared automaton
+        key, text = document
+        with self._lock:
+            return key, line_references(self._automaton, text, key) if text is not None else None
+
+    def _build(self, results, batch_size, progress):
+        done = 0
+        for key, lines in results:
+            with self._lock:
+                if self._fresh is None or key not in self._fresh:  # Otherwise set since, with newer text
+                    self._set(key, lines)
+            done += 1
+            if progress is not None and done % batch_size == 0:
+                progress(done)
+        if progress is not None and done % batch_size:
+            progress(done)
+        return done
+
+    def _on_edit(self, edit_tracker, key, lines, delta):
+        # Rescan the touched lines after the edit, and mirror the edit in the shadow lines
+        first = delta.start[0] - 1
+        try:
+            if delta.op == 'insert':
+                old = lines[first]
+                column = delta.start[1]
+                new = (old[:column] + delta.text + old[column:]).split('\n')
+                last = first
+            else:
+                last = delta.end[0] - 1
+                new = [lines[first][:delta.start[1]] + lines[last][delta.end[1]:]]
+        except IndexError:
+            # The shadow lost track of the buffer (e.g. edits made before attaching); scan it afresh
+            self.attach(edit_tracker, key)
+            return
+        lines[first:last + 1] = new
+        with self._lock:
+            references = line_references(self._automaton, '\n'.join(new), key)
+            document = self._documents[key]
+            removed = _count(document[first:last + 1])
+            document[first:last + 1] = references
+            self._apply(key, _count(references), removed)
+
+    def _set(self, key, lines, keep=False):
+        # Replace a document's references; documents mentioning nothing are dropped unless `keep` (buffers)
+        old = self._documents.pop(key, None)
+        if lines is not None and (keep or any(lines)):
+            self._documents[key] = lines
+        self._apply(key, _count(lines or ()), _count(old or ()))
+
+    def _apply(self, key, added, removed):
+        # Net count changes only, in the forward map, the reverse map and the orphans
+        added.subtract(removed)
+        forward = self._forward.setdefault(key, Counter())
+        for keyword, change in added.items():
+            if not change:
+                continue
+            forward[keyword] += change
+            if forward[keyword] <= 0:
+                del forward[keyword]
+            backlinks = self._backlinks.setdefault(keyword, {})
+            mentions = backlinks.get(key, 0) + change
+            if mentions > 0:
+                backlinks[key] = mentions
+                self._orphans.discard(keyword)
+            else:
+                backlinks.pop(key, None)
+                if not backlinks:
+                    del self._backlinks[keyword]
+                    if keyword in self._keywords:
+                        self._orphans.add(keyword)
+        if not forward and key not in self._documents:
+            del self._forward[key]
+
+
+# Shared by the main buffer and the FLARE notes, so backlinks span every document
+shared_link_graph = LinkGraph()
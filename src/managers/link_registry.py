@@ -0,0 +1,207 @@
+# link_registry.py keeps every cross-link of a buffer under one shared tag and resolves clicks with a bisection
+
+from bisect import bisect_left, bisect_right
+
+from src.editors.line_offset_table import LineOffsetTable
+from src.editors.tag_batcher import TagBatcher
+
+
+class LinkRegistry:
+    """
+    The links of one Text widget: ranges mapped to the keyword they link to. Tk only sees a single shared tag
+    over all of them, so its per-character tag lookups stay cheap however many links a document holds; which
+    keyword a range links to lives here, as three parallel lists of non-overlapping links sorted by start
+    offset. A click resolves with one bisection, O(log n).
+    Tk moves the tag along with the text by itself; the offsets follow the tracker's deltas. Like the line
+    starts of a LineOffsetTable, the shift of all links after an edit is deferred and merged while edits stay
+    at the same place, so typing costs O(log n) instead of rewriting every following link.
+    Parameters:
+        text_widget (tk.Text): The widget holding the links.
+        edit_tracker (EditTracker): The widget's tracker; without one, links keep the offsets they were added at.
+        tag (str): The shared tag.
+    """
+    def __init__(self, text_widget, edit_tracker=None, tag='link'):
+        self.text_widget = text_widget
+        self.tag = tag
+        content = text_widget.get('1.0', 'end-1c')
+        if edit_tracker is not None:
+            self.table = LineOffsetTable.attach(edit_tracker, content)
+            edit_tracker.add_listener(self.on_edit)
+        else:
+            self.table = LineOffsetTable(content)
+        self._starts = []
+        self._ends = []
+        self._keywords = []
+        # A shift not yet applied to _starts[_pending_from:] and _ends[_pending_from:]
+        self._pending_from = None
+        self._pending_delta = 0
+
+    def __len__(self):
+        return len(self._starts)
+
+    def links(self):
+        """
+        Every link in buffer order.
+        Returns:
+            list: (start_index, end_index, keyword) tuples.
+        """
+        self._flush()
+        offsets = [offset for link in zip(self._starts, self._ends) for offset in link]
+        indices = self.table.offsets_to_indices(offsets)
+        return list(zip(indices[::2], indices[1::2], self._keywords))
+
+    def add(self, start, end, keyword):
+        """ Links a range to a keyword, replacing any link it overlaps. """
+        self.add_many([(start, end, keyword)])
+
+    def add_many(self, links):
+        """
+        Adds many (start_index, end_index, keyword) links, tagging them with one batched Tk call.
+        """
+        removed, added = [], set()
+        for start, end, keyword in links:
+            start_offset, end_offset = self._offset(start), self._offset(end)
+            if start_offset >= end_offset:
+                continue
+            for pair in self._cut(start_offset, end_offset):
+                if pair in added:
+                    added.discard(pair)  # Replaced within this batch, never tagged
+                else:
+                    removed.extend(pair)
+            position = self._search(self._starts, start_offset)
+            self._starts.insert(position, start_offset)
+            self._ends.insert(position, end_offset)
+            self._keywords.insert(position, keyword)
+            added.add((start_offset, end_offset))
+        self._tag('remove', removed)
+        self._tag('add', [offset for pair in added for offset in pair])
+
+    def remove(self, keyword):
+        """ Removes every link to a keyword; returns how many there were. """
+        self._flush()
+        kept, removed = [], []
+        for start, end, linked in zip(self._starts, self._ends, self._keywords):
+            if linked == keyword:
+                removed.extend((start, end))
+            else:
+                kept.append((start, end, linked))
+        self._starts = [link[0] for link in kept]
+        self._ends = [link[1] for link in kept]
+        self._keywords = [link[2] for link in kept]
+        self._tag('remove', removed)
+        return len(removed) // 2
+
+    def clear(self):
+        """ Removes every link. """
+        self.text_widget.tag_remove(self.tag, '1.0', 'end')
+        self._starts, self._ends, self._keywords = [], [], []
+        self._pending_from, self._pending_delta = None, 0
+
+    def keyword_at(self, index):
+        """ The keyword linked at a Tk index (e.g. '@x,y' or 'current'), or None. """
+        found = self.range_at(index)
+        return found[2] if found else None
+
+    def range_at(self, index):
+        """ The (start_index, end_index, keyword) link covering a Tk index, or None. """
+        offset = self._offset(index)
+        i = self._search(self._starts, offset) - 1
+        if i < 0 or offset >= self._value(self._ends, i):
+            return None
+        start, end = self.table.offsets_to_indices([self._value(self._starts, i), self._value(self._ends, i)])
+        return start, end, self._keywords[i]
+
+    def on_edit(self, delta):
+        """
+        Moves the links after an edit, as Tk moves the tag: text typed inside a link extends it, deleted text
+        shrinks the links it overlapped and drops the ones it covered.
+        Parameters:
+            delta (EditDelta): The edit reported by the EditTracker.
+        """
+        offset = self.table.index_to_offset(delta.start)  # Lines before the edit keep their offsets
+        length = len(delta.text)
+        first = self._search(self._ends, offset)  # First link ending after the edit's start
+        if delta.op == 'insert':
+            if first < len(self._starts) and self._value(self._starts, first) < offset:
+                self._ends[first] += length  # Raw value: the pending shift applies on top either way
+                first += 1
+            elif 0 < first < len(self._starts) and self._value(self._ends, first - 1) == offset \
+                    and self._value(self._starts, first) == offset:
+                self._ends[first - 1] += length  # Between two adjacent links Tk tags the text too; the first takes it
+            self._shift(first, length)
+            return
+        end = offset + length
+        last = self._search(self._starts, end - 1)  # First link starting at or after the edit's end
+        if first < last:
+            # Clip the links the deleted text overlapped
+            self._flush()
+            kept = []
+            for i in range(first, last):
+                start = min(self._starts[i], offset) if self._starts[i] <= end else self._starts[i] - length
+                stop = self._ends[i] - length if self._ends[i] > end else min(self._ends[i], offset)
+                if start < stop:
+                    kept.append((start, stop, self._keywords[i]))
+            self._starts[first:last] = [link[0] for link in kept]
+            self._ends[first:last] = [link[1] for link in kept]
+            self._keywords[first:last] = [link[2] for link in kept]
+            last = first + len(kept)
+        self._shift(last, -length)
+
+    def _offset(self, index):
+        # Character offset of any Tk index; 'end', the line after the last, stands for the end of the text
+        position = tuple(map(int, self.text_widget.index(index).split('.')))
+        if position[0] > self.table.line_count():
+            position = tuple(map(int, self.text_widget.index('end-1c').split('.')))
+        return self.table.index_to_offset(position)
+
+    def _cut(self, start, end):
+        # Drop the links overlapping start..end; returns their (start, end) offsets for untagging
+        self._flush()
+        first = bisect_right(self._ends, start)
+        last = bisect_left(self._starts, end)
+        removed = list(zip(self._starts[first:last], self._ends[first:last]))
+        del self._starts[first:last], self._ends[first:last], self._keywords[first:last]
+        return removed
+
+    def _tag(self, op, offsets):
+        # Add or remove the shared tag over offset pairs, in as few Tk calls as possible
+        if not offsets:
+            return
+        pairs = sorted(zip(offsets[::2], offsets[1::2]))
+        indices = self.table.offsets_to_indices([offset for pair in pairs for offset in pair])
+        if op == 'add':
+            TagBatcher.add_ranges(self.text_widget, self.tag, indices)
+        else:
+            TagBatcher.remove_ranges(self.text_widget, self.tag, indices)
+
+    def _value(self, values, i):
+        # values[i] with the pending shift applied
+        if self._pending_from is not None and i >= self._pending_from:
+            return values[i] + self._pending_delta
+        return values[i]
+
+    def _search(self, values, offset):
+        # bisect_right over values with the pending shift applied; the shifted lists stay sorted
+        pending = self._pending_from
+        if pending is None:
+            return bisect_right(values, offset)
+        position = bisect_right(values, offset, 0, pending)
+        return position if position < pending else bisect_right(values, offset - self._pending_delta, pending)
+
+    def _shift(self, first, delta):
+        # Defer shifting every link from `first` on, merging with a pending shift of the same links
+        if not delta or first >= len(self._starts):
+            return
+        if self._pending_from is not None and self._pending_from != first:
+            self._flush()
+        self._pending_from = first
+        self._pending_delta += delta
+
+    def _flush(self):
+        # Apply the deferred shift before the lists are changed in place
+        if self._pending_from is not None:
+            first, delta = self._pending_from, self._pending_delta
+            self._starts[first:] = [start + delta for start in self._starts[first:]]
+            self._ends[first:] = [end + delta for end in self._ends[first:]]
+            self._pending_from = None
+            self._pending_delta = 0
@@ -0,0 +1,236 @@
+# project_search_manager.py searches every text file under a directory in parallel and streams the hits back
+
+import mmap
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Directories that never hold anything worth searching
+DEFAULT_SKIP_DIRS = frozenset({'.git', '.hg', '.svn', '__pycache__', 'node_modules', '.venv', 'venv', '.tox'})
+
+# A file with a NUL byte in its first block is treated as binary
+BINARY_SNIFF_BYTES = 8192
+
+
+class SearchHit:
+    """
+    One match in a file.
+    Parameters:
+        path (str): The file's path.
+        line (int): 1-based line number.
+        column (int): 0-based character column of the match.
+        length (int): Length of the match in characters.
+        text (str): The matching line, without its line break.
+    """
+    __slots__ = ('path', 'line', 'column', 'length', 'text')
+
+    def __init__(self, path, line, column, length, text):
+        self.path = path
+        self.line = line
+        self.column = column
+        self.length = length
+        self.text = text
+
+    def __repr__(self):
+        return f'{self.path}:{self.line}:{self.column + 1}: {self.text}'
+
+
+def search_file(path, pattern, cancel_event, max_hits=None):
+    """
+    Finds the matches of a bytes pattern in one file through a read-only memory map, skipping binary files.
+    Parameters:
+        path (str): The file to search.
+        pattern (re.Pattern): A compiled bytes pattern.
+        cancel_event (threading.Event): Stops the scan early once set.
+        max_hits (int): Stop after this many hits in this file.
+    Returns:
+        list: SearchHit objects in file order.
+    """
+    hits = []
+    if cancel_event.is_set():
+        return hits
+    try:
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return hits
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if b'\0' in data[:BINARY_SNIFF_BYTES]:
+                    return hits
+                line, counted_to = 1, 0
+                for match in pattern.finditer(data):
+                    if cancel_event.is_set() or (max_hits is not None and len(hits) >= max_hits):
+                        break
+                    start, end = match.span()
+                    if end == start:
+                        continue
+                    line += data[counted_to:start].count(b'\n')
+                    counted_to = start
+                    line_start = data.rfind(b'\n', 0, start) + 1
+                    line_end = data.find(b'\n', start)
+                    line_end = len(data) if line_end == -1 else line_end
+                    column = len(data[line_start:start].decode('utf-8', 'replace'))
+                    length = len(data[start:min(end, line_end)].decode('utf-8', 'replace'))
+                    text = data[line_start:line_end].decode('utf-8', 'replace').rstrip('\r')
+                    hits.append(SearchHit(path, line, column, length, text))
+    except (OSError, ValueError):
+        pass  # Unreadable, vanished or unmappable files are skipped
+    return hits
+
+
+class ProjectSearch:
+    """
+    Handle of one running project search. Hits arrive on `results` as lists, one list per file with hits,
+    followed by a single None once the search has finished, hit the cap or was cancelled.
+    """
+    def __init__(self, query, max_hits):
+        self.query = query
+        self.max_hits = max_hits
+        self.results = queue.Queue()
+        self.hit_count = 0
+        self.file_count = 0  # Files searched so far
+        self.capped = False
+        self.started = time.perf_counter()
+        self.elapsed = None  # Seconds taken, once finished
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        """ Stops the search; files already being scanned stop at their next match. """
+        self._cancel_event.set()
+
+    def _report(self, hits):
+        # Called from worker threads: count the file, trim to the cap and queue the hits
+        with self._lock:
+            self.file_count += 1
+            if not hits or self.cancelled:
+                return
+            room = self.max_hits - self.hit_count
+            if len(hits) >= room:
+                hits = hits[:room]
+                self.capped = True
+                self._cancel_event.set()
+            self.hit_count += len(hits)
+        self.results.put(hits)
+
+
+class ProjectSearchManager:
+    """
+    Find-in-files rooted at a directory. A coordinator thread walks the tree and hands every file to a thread
+    pool; workers scan memory-mapped files with a compiled bytes pattern, so no file is ever decoded or copied
+    as a whole, and stream hits back through the search's queue. With a TrigramIndex, files the index knows
+    to be unchanged and without the query's trigrams are skipped before any of them is opened.
+    Parameters:
+        root_dir (str): Directory to search below.
+        max_workers (int): Size of the worker pool.
+        max_hits (int): Hit cap per search; the search stops once it is reached.
+        skip_dirs (iterable): Directory names that are never entered.
+        max_file_size (int): Files larger than this many bytes are skipped.
+        index (TrigramIndex): Optional index used to narrow the candidate files.
+    """
+    def __init__(self, root_dir, max_workers=8, max_hits=5000, skip_dirs=DEFAULT_SKIP_DIRS,
+                 max_file_size=256 * 1024 * 1024, index=None):
+        self.root_dir = root_dir
+        self.index = index
+        self.max_hits = max_hits
+        self.skip_dirs = frozenset(skip_dirs)
+        self.max_file_size = max_file_size
+        self.current = None  # The latest ProjectSearch
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='heatup-find')
+        self._coordinator = ThreadPoolExecutor(max_workers=1, thread_name_prefix='heatup-find-walk')
+
+    def search(self, query, regexp=False, nocase=False):
+        """
+        Starts a search, cancelling the previous one. Raises re.error for an invalid regular expression.
+        Parameters:
+            query (str): Literal text, or a regular expression when `regexp` is set.
+            regexp (bool): Treat the query as a regular expression.
+            nocase (bool): Match case-insensitively (ASCII letters only, as the files are searched as bytes).
+        Returns:
+            ProjectSearch: The handle to read results from and to cancel with.
+        """
+        source = query.encode('utf-8') if regexp else re.escape(query.encode('utf-8'))
+        pattern = re.compile(source, re.MULTILINE | (re.IGNORECASE if nocase else 0))
+        if self.current is not None:
+            self.current.cancel()
+        self.current = ProjectSearch(query, self.max_hits)
+        self._coordinator.submit(self._run, self.current, pattern, regexp)
+        return self.current
+
+    def update_index(self):
+        """
+        Brings the trigram index up to date with the tree in the background: new and changed files are
+        indexed in parallel, unchanged ones skipped, so an interrupted update continues where it stopped.
+        """
+        if self.index is not None:
+            return self.index.build_async(self.iter_files())
+
+    def iter_files(self):
+        """ Yields the path of every regular file below the root, skipping ignored directories. """
+        pending = [self.root_dir]
+        while pending:
+            directory = pending.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in sorted(entries, key=lambda entry: entry.name):
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in self.skip_dirs:
+                            pending.append(entry.path)
+                    elif entry.is_file() and entry.stat().st_size <= self.max_file_size:
+                        yield entry.path
+                except OSError:
+                    continue
+
+    def shutdown(self):
+        """ Cancels the running search and stops the worker threads. """
+        if self.current is not None:
+            self.current.cancel()
+        # Queued files are not dropped but return at once, so the coordinator's wait() still completes
+        self._coordinator.shutdown(wait=False)
+        self._executor.shutdown(wait=False)
+
+    def _skip(self, path, candidates, states):
+        # A file can be skipped only if the index holds its current version and rules it out
+        path = os.path.abspath(path)
+        if path in candidates or path not in states:
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return True
+        return states[path] == (stat.st_mtime, stat.st_size)
+
+    def _run(self, search, pattern, regexp=False):
+        # Coordinator thread: walk the tree while the pool is already searching the first files
+        futures = []
+        try:
+            candidates = states = None
+            if self.index is not None:
+                candidates = self.index.candidates(search.query, regexp)
+                if candidates is not None:
+                    states = self.index.file_states()
+            for path in self.iter_files():
+                if search.cancelled:
+                    break
+                if candidates is not None and self._skip(path, candidates, states):
+                    continue
+                try:
+                    future = self._executor.submit(search_file, path, pattern, search._cancel_event, search.max_hits)
+                except RuntimeError:
+                    break  # The manager was shut down
+                future.add_done_callback(lambda done: search._report(done.result()))
+                futures.append(future)
+        finally:
+            # Readers wait for the None, whatever went wrong above
+            wait(futures)  # Files still queued after a cancel return without opening anything
+            search.elapsed = time.perf_counter() - search.started
+            search.results.put(None)
@@ -0,0 +1,207 @@
+# replace_manager.py replaces every match of a query in one undo step, with as few widget edits as possible
+
+import re
+import time
+
+from src.editors.edit_tracker import EditDelta
+from src.editors.line_offset_table import LineOffsetTable
+from src.managers.search_engine import SearchEngine
+
+# Template escapes, in the order re.sub resolves them
+TEMPLATE_ESCAPE = re.compile(r'\\(?:g<([^>]*)>|([1-9][0-9]?)|(.))', re.DOTALL)
+OCTAL_ESCAPE = re.compile(r'\\(?:0|[0-7]{3})')
+CHARACTER_ESCAPES = {'a': '\a', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v', '\\': '\\'}
+
+
+def compile_template(pattern, template):
+    """
+    Turns a replacement template into a `str.format` string over the match's groups ({0} for the whole
+    match), so each match is expanded in C instead of re-parsing the template the way `Match.expand` does.
+    Raises the error `re.sub` would for an invalid template (re.error, or IndexError for an unknown group name).
+    Returns:
+        str: The format string, or None if the template uses octal escapes and must go through `Match.expand`.
+    """
+    pattern.sub(template, '')  # Let re validate group references and escapes
+    if OCTAL_ESCAPE.search(template):
+        return None  # Rare enough to leave to re
+    pieces, position = [], 0
+    for escape in TEMPLATE_ESCAPE.finditer(template):
+        pieces.append(template[position:escape.start()].replace('{', '{{').replace('}', '}}'))
+        position = escape.end()
+        name, number, char = escape.groups()
+        if char is not None:
+            # Like re, an unknown escape of a non-letter stands for both characters (letters were rejected above)
+            pieces.append(CHARACTER_ESCAPES.get(char, '\\' + char).replace('{', '{{').replace('}', '}}'))
+        elif number is not None:
+            pieces.append(f'{{{number}}}')
+        else:
+            pieces.append(f'{{{name if name.isdigit() else pattern.groupindex[name]}}}')
+    pieces.append(template[position:].replace('{', '{{').replace('}', '}}'))
+    return ''.join(pieces)
+
+
+def plan_replacements(pattern, content, template, literal=False):
+    """
+    Computes the replacement of every non-empty match in a snapshot, without touching any widget.
+    Parameters:
+        pattern (re.Pattern): The compiled query.
+        content (str): The snapshot to search.
+        template (str): Replacement text; a re.sub template with group references unless `literal` is set.
+        literal (bool): Insert the replacement text as it is.
+    Returns:
+        list: (start_offset, end_offset, new_text) per match, in buffer order.
+    """
+    if literal or '\\' not in template:
+        return [(match.start(), match.end(), template) for match in pattern.finditer(content)
+                if match.end() > match.start()]
+    form = compile_template(pattern, template)
+    if form is None:
+        return [(match.start(), match.end(), match.expand(template)) for match in pattern.finditer(content)
+                if match.end() > match.start()]
+    # Groups that did not take part in the match expand to '', as with re.sub
+    return [(match.start(), match.end(), form.format(match[0], *match.groups(''))) for match in pattern.finditer(content)
+            if match.end() > match.start()]
+
+
+def coalesce(replacements, content, merge_gap=64):
+    """
+    Merges replacements separated by at most `merge_gap` characters into one edit that also rewrites the
+    unchanged text between them, trading a little re-inserted text for far fewer widget calls.
+    Returns:
+        list: (start_offset, end_offset, new_text) edits in buffer order.
+    """
+    edits = []
+    start = end = None
+    pieces = []
+    for match_start, match_end, text in replacements:
+        if start is not None and match_start - end <= merge_gap:
+            pieces.append(content[end:match_start])
+        else:
+            if start is not None:
+                edits.append((start, end, ''.join(pieces)))
+            start, pieces = match_start, []
+        pieces.append(text)
+        end = match_end
+    if start is not None:
+        edits.append((start, end, ''.join(pieces)))
+    return edits
+
+
+class ReplaceResult:
+    """
+    The outcome of one replace-all.
+    Parameters:
+        count (int): Number of matches replaced.
+        edits (int): Number of widget edits they were applied with.
+        elapsed (float): Seconds spent planning and applying.
+    """
+    __slots__ = ('count', 'edits', 'elapsed')
+
+    def __init__(self, count, edits, elapsed):
+        self.count = count
+        self.edits = edits
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return f'<ReplaceResult {self.count} replacements in {self.edits} edits, {self.elapsed * 1000:.1f} ms>'
+
+
+class ReplaceManager:
+    """
+    Find/replace for a Text widget. Replace-all plans every replacement on one snapshot, merges nearby ones
+    and applies the edits bottom-up, so the snapshot's indices stay valid without re-reading the buffer. The
+    batch is a single undo step, and while it runs the EditTracker's listeners (highlighting, tag batchers,
+    offset tables) and any `suspend` targets are silenced; afterwards the listeners get one delete/insert
+    pair covering the whole changed region.
+    Parameters:
+        text_widget (tk.Text): The widget to edit.
+        edit_tracker (EditTracker): The widget's tracker, if it has one.
+        suspend (iterable): Objects with a `suspended` flag, e.g. the AutoCompleteManager, held off during a batch.
+        merge_gap (int): Matches closer than this many characters are applied as one edit.
+    """
+    def __init__(self, text_widget, edit_tracker=None, suspend=(), merge_gap=64):
+        self.text_widget = text_widget
+        self.edit_tracker = edit_tracker
+        self.suspend = list(suspend)
+        self.merge_gap = merge_gap
+        self.search_engine = SearchEngine(text_widget)
+        self.last_result = None
+
+    def replace_all(self, query, replacement, start='1.0', end='end-1c', **options):
+        """
+        Replaces every match in the range. Raises re.error for an invalid pattern or template.
+        Parameters:
+            query (str): The text or pattern to replace; see `SearchEngine.compile` for the options.
+            replacement (str): The new text; may refer to groups (\\1, \\g<name>) when `regexp` is set.
+            start (str): Tk index where replacing starts.
+            end (str): Tk index where replacing stops.
+        Returns:
+            ReplaceResult: Counts and time taken.
+        """
+        started = time.perf_counter()
+        pattern = self.search_engine.compile(query, **options)
+        start = self.text_widget.index(start)
+        content = self.text_widget.get(start, end)
+        replacements = plan_replacements(pattern, content, replacement, literal=not options.get('regexp'))
+        edits = coalesce(replacements, content, self.merge_gap)
+        if edits:
+            self._apply(edits, content, LineOffsetTable(content, origin=tuple(map(int, start.split('.')))))
+        self.last_result = ReplaceResult(len(replacements), len(edits), time.perf_counter() - started)
+        return self.last_result
+
+    def replace_span(self, span_start, span_end, query, replacement, **options):
+        """
+        Replaces a single match, e.g. the one selected in the search bar, as its own undo step.
+        Parameters:
+            span_start (str): Tk index of the match's start.
+            span_end (str): Tk index of the match's end.
+        Returns:
+            str: The inserted text, or None if the span no longer matches the query.
+        """
+        pattern = self.search_engine.compile(query, **options)
+        match = pattern.fullmatch(self.text_widget.get(span_start, span_end))
+        if match is None:
+            return None
+        text = match.expand(replacement) if options.get('regexp') else replacement
+        self.text_widget.edit_separator()
+        self.text_widget.replace(span_start, span_end, text)
+        self.text_widget.edit_separator()
+        return text
+
+    def _apply(self, edits, content, table):
+        # Bottom-up, so every edit lands on text the previous ones have not moved
+        widget = self.text_widget
+        offsets = []
+        for edit_start, edit_end, _ in edits:
+            offsets.extend((edit_start, edit_end))
+        indices = table.offsets_to_indices(offsets)
+        autoseparators = widget.cget('autoseparators')
+        widget.config(autoseparators=False)
+        widget.edit_separator()
+        if self.edit_tracker is not None:
+            self.edit_tracker.pause()
+        for target in self.suspend:
+            target.suspended = True
+        try:
+            for i in range(len(edits) - 1, -1, -1):
+                widget.replace(indices[2 * i], indices[2 * i + 1], edits[i][2])
+        finally:
+            widget.edit_separator()
+            widget.config(autoseparators=autoseparators)
+            if self.edit_tracker is not None:
+                self.edit_tracker.resume()
+                self._publish(edits, content, table)
+            for target in self.suspend:
+                target.suspended = False
+
+    def _publish(self, edits, content, table):
+        # Listeners see the batch as one replace of the region between the first and the last edit
+        first, last = edits[0][0], edits[-1][1]
+        pieces, position = [], first
+        for edit_start, edit_end, text in edits:
+            pieces.append(content[position:edit_start])
+            pieces.append(text)
+            position = edit_end
+        start, end = table.offset_to_position(first), table.offset_to_position(last)
+        self.edit_tracker.publish(EditDelta('delete', start, end, content[first:last]))
+        self.edit_tracker.publish(EditDelta('insert', start, start, ''.join(pieces)))
@@ -0,0 +1,122 @@
+# search_engine.py finds every match of a query in one buffer snapshot and tags them in a few batched calls
+
+import re
+import time
+
+from src.editors.line_offset_table import LineOffsetTable
+from src.editors.tag_batcher import TagBatcher
+
+
+class SearchResult:
+    """
+    The outcome of one search.
+    Parameters:
+        spans (list): (start_offset, end_offset) of every match, relative to the searched snapshot.
+        indices (list): Flat list of Tk start/end index pairs, one pair per match.
+        elapsed (float): Seconds spent searching and tagging.
+        line_table (LineOffsetTable): Table of the searched snapshot, for further offset conversions.
+    """
+    __slots__ = ('spans', 'indices', 'elapsed', 'line_table')
+
+    def __init__(self, spans, indices, elapsed, line_table):
+        self.spans = spans
+        self.indices = indices
+        self.elapsed = elapsed
+        self.line_table = line_table
+
+    @property
+    def count(self):
+        """ Number of matches. """
+        return len(self.spans)
+
+    def positions(self):
+        """ Matches as (line, start_col, end_line, end_col) tuples, the span format of TagBatcher. """
+        to_position = self.line_table.offset_to_position
+        return [to_position(start) + to_position(end) for start, end in self.spans]
+
+    def __repr__(self):
+        return f'<SearchResult {self.count} matches in {self.elapsed * 1000:.1f} ms>'
+
+
+class SearchEngine:
+    """
+    Searches a Text widget without a Tcl round-trip per hit: the range is read once, the query runs as a
+    compiled `re.finditer` over that snapshot, offsets become indices through a LineOffsetTable, and the hits
+    are tagged with one multi-range call per few thousand matches.
+    Parameters:
+        text_widget (tk.Text): The widget to search.
+        max_ranges_per_call (int): Upper bound on the ranges packed into one Tcl call.
+    """
+    def __init__(self, text_widget, max_ranges_per_call=5000):
+        self.text_widget = text_widget
+        self.max_ranges_per_call = max_ranges_per_call
+        self._patterns = {}  # (query, regexp, nocase, whole_word) -> compiled pattern
+
+    def compile(self, query, regexp=False, nocase=False, whole_word=False):
+        """
+        Compiles (and remembers) the pattern for a query. Raises re.error for an invalid regular expression.
+        Parameters:
+            query (str): Literal text, or a regular expression when `regexp` is set.
+            regexp (bool): Treat the query as a regular expression.
+            nocase (bool): Match case-insensitively.
+            whole_word (bool): Only match the query as a whole word.
+        """
+        key = (query, regexp, nocase, whole_word)
+        pattern = self._patterns.get(key)
+        if pattern is None:
+            source = query if regexp else re.escape(query)
+            if whole_word:
+                source = rf'\b(?:{source})\b'
+            pattern = re.compile(source, re.MULTILINE | (re.IGNORECASE if nocase else 0))
+            self._patterns[key] = pattern
+        return pattern
+
+    def find_all(self, query, start='1.0', end='end-1c', content=None, **options):
+        """
+        Finds every non-empty match in the range `start`..`end`.
+        Parameters:
+            query (str): The text or pattern to look for; see `compile` for the options.
+            start (str): Tk index where the search starts.
+            end (str): Tk index where the search stops.
+            content (str): The text of the range if the caller already read it.
+        Returns:
+            SearchResult: The matches, their indices and the time taken.
+        """
+        started = time.perf_counter()
+        start = self.text_widget.index(start)
+        if content is None:
+            content = self.text_widget.get(start, end)
+        pattern = self.compile(query, **options)
+        spans, offsets = [], []
+        for match in pattern.finditer(content):
+            if match.end() > match.start():
+                spans.append(match.span())
+                offsets.extend(match.span())
+        line_table = LineOffsetTable(content, origin=tuple(map(int, start.split('.'))))
+        indices = line_table.offsets_to_indices(offsets)
+        return SearchResult(spans, indices, time.perf_counter() - started, line_table)
+
+    def highlight(self, query, tag, start='1.0', end='end-1c', replace=True, tag_batcher=None, **options):
+        """
+        Finds every match and tags it in one batched step.
+        Parameters:
+            query (str): The text or pattern to look for; see `compile` for the options.
+            tag (str): The tag applied to the matches.
+            start (str): Tk index where the search starts.
+            end (str): Tk index where the search stops.
+            replace (bool): Remove the tag from the range first, so only the new matches stay tagged.
+            tag_batcher (TagBatcher): Optional batcher owning `tag`; only the difference to its last
+                search is then sent to Tk. The batcher's spans outside the range are dropped too.
+        Returns:
+            SearchResult: The matches, their indices and the time taken, tagging included.
+        """
+        started = time.perf_counter()
+        result = self.find_all(query, start, end, **options)
+        if tag_batcher is not None:
+            tag_batcher.set_tag(tag, result.positions())
+        else:
+            if replace:
+                self.text_widget.tag_remove(tag, start, end)
+            TagBatcher.add_ranges(self.text_widget, tag, result.indices, self.max_ranges_per_call)
+        result.elapsed = time.perf_counter() - started
+        return result
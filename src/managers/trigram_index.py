@@ -0,0 +1,329 @@
+# trigram_index.py keeps an on-disk trigram index of saved documents and FLARE notes to narrow searches
+
+import multiprocessing
+import os
+import re
+import sqlite3
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Posting lists intersected per query; a handful of the rarest trigrams narrows as well as all of them
+MAX_QUERY_TRIGRAMS = 12
+
+# Trigrams of a long query whose posting lists are counted to find the rarest
+MAX_COUNTED_TRIGRAMS = 64
+
+# Prefix of index keys that name FLARE notes rather than files
+NOTE_PREFIX = 'flare:'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE NOT NULL,
+    mtime REAL,
+    size INTEGER,
+    content TEXT,
+    trigrams BLOB
+);
+CREATE TABLE IF NOT EXISTS postings (
+    trigram INTEGER NOT NULL,
+    doc_id INTEGER NOT NULL,
+    PRIMARY KEY (trigram, doc_id)
+) WITHOUT ROWID;
+"""
+
+
+def text_trigrams(text):
+    """
+    The distinct trigrams of a text, lower-cased so one index serves case-sensitive and insensitive searches.
+    Each trigram is packed into one integer (21 bits per code point) to keep the postings table compact.
+    """
+    text = text.lower()
+    # Deduplicate the character triples first; packing only the distinct ones is about three times faster
+    return {(ord(a) << 42) | (ord(b) << 21) | ord(c) for a, b, c in set(zip(text, text[1:], text[2:]))}
+
+
+def file_trigrams(path):
+    """
+    Reads a file and returns (path, mtime, size, trigrams). Binary files get no trigrams, so they are
+    recorded but never a candidate; unreadable files return None for everything but the path.
+    Module level so the parallel build can run it in worker processes.
+    """
+    try:
+        stat = os.stat(path)
+        with open(path, 'rb') as file:
+            data = file.read()
+    except OSError:
+        return path, None, None, None
+    if b'\0' in data[:8192]:
+        return path, stat.st_mtime, stat.st_size, []
+    return path, stat.st_mtime, stat.st_size, list(text_trigrams(data.decode('utf-8', 'replace')))
+
+
+def required_literals(pattern):
+    """
+    Literal strings every match of a regular expression must contain, found in the top-level sequence of
+    the parsed pattern. Returns an empty list when nothing is certain (alternation at the top, classes only).
+    """
+    try:
+        from re import _parser as parser
+    except ImportError:  # Python < 3.11
+        import sre_parse as parser
+    try:
+        parsed = parser.parse(pattern)
+    except re.error:
+        return []
+    literals, run = [], []
+    for op, argument in parsed:
+        if str(op) == 'LITERAL':
+            run.append(chr(argument))
+            continue
+        if run:
+            literals.append(''.join(run))
+            run = []
+        if str(op) == 'SUBPATTERN':
+            # A group that is always present contributes its own certain literals
+            literals.extend(required_literals_of(argument[-1]))
+    if run:
+        literals.append(''.join(run))
+    return [literal for literal in literals if len(literal) >= 3]
+
+
+def required_literals_of(parsed):
+    # Literal runs of an already parsed sub-pattern
+    literals, run = [], []
+    for op, argument in parsed:
+        if str(op) == 'LITERAL':
+            run.append(chr(argument))
+        elif run:
+            literals.append(''.join(run))
+            run = []
+    if run:
+        literals.append(''.join(run))
+    return literals
+
+
+class TrigramIndex:
+    """
+    SQLite-backed trigram index of files and FLARE notes. Files are keyed by absolute path, notes by
+    'flare:<keyword>' with their text stored in the index. Searches first intersect the posting lists of the
+    query's trigrams, rarest first, and only the remaining candidates are verified with the real pattern.
+    Writes are serialized on one background thread; every thread reads through its own connection, and WAL
+    mode lets reads run while a write is in progress.
+    Parameters:
+        db_path (str): Location of the index database, defaults to ~/.heatup/trigram_index.sqlite3.
+        workers (int): Worker processes used to extract trigrams during a build.
+    """
+    def __init__(self, db_path=None, workers=None):
+        self.db_path = db_path or os.path.join(os.path.expanduser('~'), '.heatup', 'trigram_index.sqlite3')
+        self.workers = workers
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._local = threading.local()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='heatup-trigram-index')
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        # One connection per thread, as sqlite3 connections must not be shared between threads
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def index_document(self, key, text, mtime=None, size=None, store_content=False):
+        """
+        Replaces the postings of one document.
+        Parameters:
+            key (str): Absolute file path, or 'flare:<keyword>' for a note.
+            text (str): The document's text.
+            mtime (float): Modification time of the file, used to skip it when unchanged.
+            size (int): Size of the file in bytes.
+            store_content (bool): Keep the text in the index, for documents that do not live in a file.
+        """
+        with self._connection() as connection:
+            self._write(connection, key, mtime, size, text_trigrams(text), text if store_content else None)
+
+    def index_document_async(self, key, text, **options):
+        """ `index_document` on the writer thread, so saving never waits for the index. """
+        return self._writer.submit(self.index_document, key, text, **options)
+
+    def index_file(self, path):
+        """ Indexes (or re-indexes) one file from disk; unreadable files are dropped. """
+        path, mtime, size, trigrams = file_trigrams(os.path.abspath(path))
+        with self._connection() as connection:
+            if trigrams is None:
+                self._delete(connection, path)
+            else:
+                self._write(connection, path, mtime, size, trigrams, None)
+
+    def index_file_async(self, path):
+        """ `index_file` on the writer thread. """
+        return self._writer.submit(self.index_file, path)
+
+    def index_note(self, keyword, text):
+        """ Indexes the text of a FLARE note in the background. """
+        return self.index_document_async(NOTE_PREFIX + keyword, text, store_content=True)
+
+    def remove(self, key):
+        """ Drops a document from the index. """
+        with self._connection() as connection:
+            self._delete(connection, key)
+
+    def build(self, paths, batch_size=200, progress=None):
+        """
+        Indexes every file in `paths` that is new or changed since it was last indexed. Trigrams are extracted
+        in parallel worker processes and committed in batches, so an interrupted build resumes where it
+        stopped: files committed earlier are unchanged and skipped the next time.
+        Parameters:
+            paths (iterable): Absolute paths of the files that should be in the index.
+            batch_size (int): Files per transaction.
+            progress (callable): Called as progress(done, total) after each batch.
+        Returns:
+            int: Number of files (re)indexed.
+        """
+        known = self.file_states()
+        stale = []
+        for path in map(os.path.abspath, paths):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if known.get(path) != (stat.st_mtime, stat.st_size):
+                stale.append(path)
+        done = 0
+        # Spawned workers start clean, without a forked copy of Tk or of locks held by other threads
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            results = pool.map(file_trigrams, stale, chunksize=16)
+            connection = self._connection()
+            while done < len(stale):
+                with connection:
+                    for _ in range(min(batch_size, len(stale) - done)):
+                        path, mtime, size, trigrams = next(results)
+                        if trigrams is None:
+                            self._delete(connection, path)
+                        else:
+                            self._write(connection, path, mtime, size, trigrams, None)
+                        done += 1
+                if progress is not None:
+                    progress(done, len(stale))
+        return done
+
+    def build_async(self, paths, **options):
+        """ `build` on the writer thread; `paths` may be a lazy directory walk, it is consumed there too. """
+        return self._writer.submit(self.build, paths, **options)
+
+    def file_states(self):
+        """ {path: (mtime, size)} of every indexed file. """
+        rows = self._connection().execute('SELECT key, mtime, size FROM documents WHERE key NOT LIKE ?',
+                                          (NOTE_PREFIX + '%',))
+        return {key: (mtime, size) for key, mtime, size in rows}
+
+    def candidates(self, query, regexp=False):
+        """
+        Keys of the documents that can contain a match of the query.
+        Returns:
+            set: Candidate keys, or None when the query has no trigram to narrow by and everything must be searched.
+        """
+        literals = required_literals(query) if regexp else [query]
+        trigrams = set()
+        for literal in literals:
+            trigrams |= text_trigrams(literal)
+        if not trigrams:
+            return None
+        connection = self._connection()
+        counted = sorted((connection.execute('SELECT COUNT(*) FROM postings WHERE trigram = ?', (trigram,)).fetchone()[0],
+                          trigram) for trigram in sorted(trigrams)[:MAX_COUNTED_TRIGRAMS])
+        documents = None
+        for _, trigram in counted[:MAX_QUERY_TRIGRAMS]:
+            rows = connection.execute('SELECT doc_id FROM postings WHERE trigram = ?', (trigram,))
+            found = {row[0] for row in rows}
+            documents = found if documents is None else documents & found
+            if not documents:
+                return set()
+        keys = set()
+        ids = list(documents)
+        for i in range(0, len(ids), 900):  # Stay below SQLite's bound-parameter limit
+            chunk = ids[i:i + 900]
+            rows = connection.execute(f'SELECT key FROM documents WHERE id IN ({",".join("?" * len(chunk))})', chunk)
+            keys.update(row[0] for row in rows)
+        return keys
+
+    def search_notes(self, query, regexp=False, nocase=False):
+        """
+        Finds the FLARE notes matching a query, verifying trigram candidates against their stored text; only
+        the candidates' text is read, unless the query has no trigram to narrow by.
+        Returns:
+            list: Keywords of the matching notes, sorted.
+        """
+        pattern = re.compile(query if regexp else re.escape(query), re.MULTILINE | (re.IGNORECASE if nocase else 0))
+        candidates = self.candidates(query, regexp)
+        connection = self._connection()
+        if candidates is None:
+            rows = connection.execute('SELECT key, content FROM documents WHERE key LIKE ?', (NOTE_PREFIX + '%',))
+        else:
+            keys = sorted(key for key in candidates if key.startswith(NOTE_PREFIX))
+            rows = []
+            for i in range(0, len(keys), 900):  # Stay below SQLite's bound-parameter limit
+                chunk = keys[i:i + 900]
+                rows.extend(connection.execute(
+                    f'SELECT key, content FROM documents WHERE key IN ({",".join("?" * len(chunk))})', chunk))
+        return sorted(key[len(NOTE_PREFIX):] for key, content in rows if content is not None and pattern.search(content))
+
+    def close(self):
+        """ Waits for pending writes and closes this thread's connection. """
+        self._writer.shutdown(wait=True)
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    @staticmethod
+    def _write(connection, key, mtime, size, trigrams, content):
+        # Upsert the document row and change only the postings that differ from its previous version
+        trigrams = set(trigrams)
+        packed = array('q', sorted(trigrams)).tobytes()
+        row = connection.execute('SELECT id, trigrams FROM documents WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            doc_id = connection.execute('INSERT INTO documents (key, mtime, size, content, trigrams) '
+                                        'VALUES (?, ?, ?, ?, ?)', (key, mtime, size, content, packed)).lastrowid
+            old = set()
+        else:
+            doc_id, old = row[0], TrigramIndex._unpack(row[1])
+            connection.execute('UPDATE documents SET mtime = ?, size = ?, content = ?, trigrams = ? WHERE id = ?',
+                               (mtime, size, content, packed, doc_id))
+        connection.executemany('DELETE FROM postings WHERE trigram = ? AND doc_id = ?',
+                               ((trigram, doc_id) for trigram in old - trigrams))
+        connection.executemany('INSERT INTO postings (trigram, doc_id) VALUES (?, ?)',
+                               ((trigram, doc_id) for trigram in trigrams - old))
+
+    @staticmethod
+    def _delete(connection, key):
+        row = connection.execute('SELECT id, trigrams FROM documents WHERE key = ?', (key,)).fetchone()
+        if row is not None:
+            connection.executemany('DELETE FROM postings WHERE trigram = ? AND doc_id = ?',
+                                   ((trigram, row[0]) for trigram in TrigramIndex._unpack(row[1])))
+            connection.execute('DELETE FROM documents WHERE id = ?', (row[0],))
+
+    @staticmethod
+    def _unpack(blob):
+        # A document's trigrams are kept with it, so its postings can be removed by primary key
+        trigrams = array('q')
+        if blob:
+            trigrams.frombytes(blob)
+        return set(trigrams)
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def default_index():
+    """ The shared index in the user's HEAT UP directory, opened on first use. """
+    global _default_index
+    with _default_lock:
+        if _default_index is None:
+            _default_index = TrigramIndex()
+        return _default_index
@@ -0,0 +1,144 @@
+# completion_popup.py offers completions in a small list under the cursor, touching the buffer only on accept
+
+import re
+import tkinter as tk
+
+# The word being typed: the run of word characters just before the cursor
+PREFIX = re.compile(r'\w+$')
+
+# Keys that never start a lookup on release
+IGNORED_KEYS = frozenset({'Up', 'Down', 'Left', 'Right', 'Return', 'Tab', 'Escape', 'Home', 'End', 'Prior', 'Next',
+                          'Shift_L', 'Shift_R', 'Control_L', 'Control_R', 'Alt_L', 'Alt_R', 'Caps_Lock'})
+
+
+class CompletionPopup:
+    """
+    Completion list shown under the insertion cursor. Key releases only (re)start a debounce timer; the
+    lookup runs once typing pauses for `delay_ms`, and a generation counter drops any lookup overtaken by a
+    newer keystroke, so typing speed never depends on the vocabulary. The buffer is edited only when a
+    suggestion is accepted, with one replace of the typed prefix in its own undo step.
+    Up / Down choose, Tab or Return accept, Escape closes.
+    Parameters:
+        text_widget (tk.Text): The widget completions are offered for.
+        source (object): Anything with a `suggest(prefix, k)` method returning words.
+        delay_ms (int): Typing pause before a lookup runs.
+        max_items (int): Suggestions shown at most.
+        min_prefix (int): Characters typed before completions are offered.
+    """
+    def __init__(self, text_widget, source, delay_ms=80, max_items=10, min_prefix=2):
+        self.text_widget = text_widget
+        self.source = source
+        self.delay_ms = delay_ms
+        self.max_items = max_items
+        self.min_prefix = min_prefix
+        self.suspended = False  # Set while a batch edit such as replace-all runs
+        self.generation = 0
+        self.prefix = None  # Prefix the shown suggestions were looked up for
+        self._lookup_id = None
+        self.window = tk.Toplevel(text_widget)
+        self.window.withdraw()
+        self.window.overrideredirect(True)
+        # The list never takes focus: the text widget hides it on <FocusOut>, which would eat every click
+        self.listbox = tk.Listbox(self.window, height=max_items, activestyle='none', exportselection=False,
+                                  takefocus=0, font=('Consolas', 10))
+        self.listbox.pack(fill=tk.BOTH, expand=True)
+        self.listbox.bind('<Button-1>', self._click)
+        self.listbox.bind('<Double-Button-1>', lambda event: self.accept())
+        text_widget.bind('<KeyRelease>', self.on_key_release, add='+')
+        text_widget.bind('<Down>', lambda event: self._move(1), add='+')
+        text_widget.bind('<Up>', lambda event: self._move(-1), add='+')
+        text_widget.bind('<Tab>', lambda event: self.accept(), add='+')
+        text_widget.bind('<Return>', lambda event: self.accept(), add='+')
+        text_widget.bind('<Escape>', lambda event: self.hide(), add='+')
+        text_widget.bind('<FocusOut>', lambda event: self.hide(), add='+')
+        text_widget.bind('<Button-1>', lambda event: self.hide(), add='+')
+
+    @property
+    def visible(self):
+        return self.prefix is not None
+
+    def on_key_release(self, event):
+        """ Restarts the debounce timer; the lookup itself runs once typing pauses. """
+        if self.suspended or event.keysym in IGNORED_KEYS:
+            return
+        self._cancel()
+        self._lookup_id = self.text_widget.after(self.delay_ms, self._lookup, self.generation)
+
+    def hide(self):
+        """ Closes the list and drops any pending lookup. """
+        self._cancel()
+        if self.visible:
+            self.prefix = None
+            self.window.withdraw()
+
+    def accept(self):
+        """ Replaces the typed prefix with the selected suggestion. Returns 'break' if one was inserted. """
+        if not self.visible:
+            return None
+        selection = self.listbox.curselection()
+        word, prefix = self.listbox.get(selection[0] if selection else 0), self.prefix
+        self.hide()
+        if self._typed_prefix() != prefix:
+            return None  # The text changed under the list; leave the key to its normal binding
+        start = f'insert-{len(prefix)}c'
+        self.text_widget.edit_separator()
+        self.text_widget.replace(start, 'insert', word)
+        self.text_widget.edit_separator()
+        return 'break'
+
+    def _typed_prefix(self):
+        # Word characters right before the cursor, '' on an empty line or after a space
+        match = PREFIX.search(self.text_widget.get('insert linestart', 'insert'))
+        return match.group() if match else ''
+
+    def _cancel(self):
+        self.generation += 1
+        if self._lookup_id is not None:
+            self.text_widget.after_cancel(self._lookup_id)
+            self._lookup_id = None
+
+    def _lookup(self, generation):
+        # Runs after the typing pause; a newer keystroke has bumped the generation if this one is stale
+        self._lookup_id = None
+        if generation != self.generation:
+            return
+        prefix = self._typed_prefix()
+        suggestions = self.source.suggest(prefix, self.max_items) if len(prefix) >= self.min_prefix else []
+        if generation != self.generation or not suggestions:
+            self.hide()
+            return
+        self._show(prefix, suggestions)
+
+    def _show(self, prefix, suggestions):
+        # Fill the list and place it just below the cursor
+        bbox = self.text_widget.bbox('insert')
+        if bbox is None:
+            self.hide()
+            return
+        x, y, _, height = bbox
+        self.prefix = prefix
+        self.listbox.delete(0, tk.END)
+        self.listbox.insert(tk.END, *suggestions)
+        self.listbox.config(height=len(suggestions))
+        self.listbox.selection_set(0)
+        self.window.geometry(f'+{self.text_widget.winfo_rootx() + x}+{self.text_widget.winfo_rooty() + y + height}')
+        self.window.deiconify()
+        self.window.lift()
+
+    def _click(self, event):
+        # Select the clicked row ourselves; 'break' keeps the Listbox class binding from focusing the list
+        position = self.listbox.nearest(event.y)
+        self.listbox.selection_clear(0, tk.END)
+        self.listbox.selection_set(position)
+        return 'break'
+
+    def _move(self, step):
+        # Arrow keys move through the list while it is shown, and the cursor otherwise
+        if not self.visible:
+            return None
+        selection = self.listbox.curselection()
+        position = max(0, min(self.listbox.size() - 1, (selection[0] if selection else -1) + step))
+        self.listbox.selection_clear(0, tk.END)
+        self.listbox.selection_set(position)
+        self.listbox.see(position)
+        return 'break'
@@ -0,0 +1,95 @@
+# document_model.py holds a linked keyword's document as plain data, creating its Tk view only while it is shown
+
+from itertools import count
+
+from src.managers.buffer_vocabulary import shared_vocabulary
+from src.managers.flare_store import default_store
+from src.managers.keyword_automaton import linked_keywords
+from src.managers.link_graph import shared_link_graph
+from src.managers.trigram_index import default_index
+from src.widgets.document_widget import DocumentWidget
+
+# Document ids, unique within the session
+_ids = count(1)
+
+
+class DocumentModel:
+    """
+    A linked keyword's document without any widget: keyword, id, content and highlight colour. `__slots__`
+    keeps one at roughly a hundred bytes plus its strings, so 100k linked keywords fit in tens of MB; the Tk
+    text widget (a DocumentWidget) exists only between `show` and `hide`. The ranges linking to the document
+    are not copied here: they move with every edit, and the shared LinkGraph already follows them.
+    The keyword is registered with the shared keyword automaton for as long as the model lives (until
+    `close`), whether or not it is shown, so the main buffer highlights every linked keyword.
+    Parameters:
+        keyword (str): The linked keyword.
+        content (str): The document text; the string is referenced, not copied.
+        color (str): HEX colour of the keyword's highlight.
+    """
+    __slots__ = ('id', 'keyword', 'content', 'color', 'view')
+
+    def __init__(self, keyword, content='', color=None):
+        self.id = next(_ids)
+        self.keyword = keyword
+        self.content = content
+        self.color = color
+        self.view = None  # DocumentWidget while shown
+        linked_keywords.register(keyword)
+
+    @property
+    def linked_word(self):
+        return self.keyword
+
+    @property
+    def visible(self):
+        return self.view is not None
+
+    def backlinks(self):
+        """
+        Every mention of the keyword, in the buffers and FLARE notes followed by the shared LinkGraph.
+        Returns:
+            list: (document key, start_index, end_index) tuples, sorted.
+        """
+        return shared_link_graph.what_links_here(self.keyword)
+
+    def set_content(self, content):
+        """
+        Sets the document text, saves it as the keyword's note and refreshes the search index, completion
+        words and backlinks built from it.
+        """
+        self.content = content
+        default_store().save(self.keyword, content)  # Queued for the store's writer thread
+        default_index().index_note(self.keyword, content)  # Indexed in the background
+        shared_vocabulary.update_document(self.keyword, content)  # Note words become completions
+        shared_link_graph.update_document(self.keyword, content)
+
+    def show(self, master, palette=None, **options):
+        """
+        Creates the view on first call (later calls return the same one). A document without text reads
+        the keyword's stored note first, so a note saved in an earlier session opens with its text.
+        Returns:
+            DocumentWidget: The view showing this document.
+        """
+        if self.view is None:
+            if not self.content:
+                note = default_store().load(self.keyword)
+                if note is not None:
+                    self.content = note[0]
+            self.view = DocumentWidget(master, self, palette, **options)
+        return self.view
+
+    def hide(self):
+        """ Saves edits made in the view, then destroys it; the model stays. """
+        if self.view is not None:
+            if self.view.edit_modified():
+                self.view.save_changes()
+            self.view.destroy()
+            self.view = None
+
+    def close(self):
+        """ Hides the document and unlinks its keyword. """
+        self.hide()
+        linked_keywords.unregister(self.keyword)
+
+    def __repr__(self):
+        return f"DocumentModel(id={self.id}, keyword='{self.keyword}', content='{self.content[:30]}...')"
@@ -1,51 +1,60 @@
 # {1AZ_t #step/#total} [COMMENTS ]
 # document_widget.py manages keyword-to-flare interactions within the HEAT UP editor
 import tkinter as tk
-import tkinter as tk
 from tkinter import Toplevel, Text, simpledialog, Menu, messagebox
 from tkinter.font import Font
 
+from src.managers.keyword_automaton import linked_keywords
+from src.managers.search_engine import SearchEngine
+
 
 class DocumentWidget(tk.Text):
     """
-    Initialize a document widget with in-depth features.
+    The Tk view of a DocumentModel: a text widget editing the document, created when the document is shown
+    and destroyed when it is hidden. Everything that must outlive the view lives on the model.
     Parameters:
         master (tk.Widget): The parent widget.
-        linked_word (str): Keyword triggering the document widget.
-        content (str): Content inside the document.
-        color (str): HEX color for the keyword highlight.
+        model (DocumentModel): The document shown.
+        palette (dict): Colour palette; a default one if omitted.
     """
-    def __init__(self, master, linked_word, parent, keyword, palette, *args, **kwargs):
-        super().__init__(parent, *args, **kwargs)
-        self.keyword = keyword
-        self.palette = palette
-        self.configure(bg=palette['raisin_black'][500], fg=palette['white'][100])
-        self.bind("<Control-Button-1>", self.on_ctrl_click)
-        parent.add_with_tag(self, keyword)
-        self.linked_word = linked_word
-        self.content = content
-        self.color = color
-        self.is_flare_visible = False
-        self.id = str(uuid.uuid4())  # Unique identifier for the widget
-        self.linked_word = linked_word
-        self.content = content
-        self.color = color
+    def __init__(self, master, model, palette=None, *args, **kwargs):
+        super().__init__(master, *args, **kwargs)
+        self.model = model
         self.master = master
-        self.flare_widget = None  # Initialize without a Flare widget
-        self._create_flare_widget()        
-        # Bind the Ctrl+Click event to open the FLARE window
-        self.master.bind('<Control-Button-1>', self.ctrl_click_event)
-        self.parent = parent
-        self.content = content
+        self.title = model.keyword
+        self.text_area = self  # The view edits the document text itself
         self.palette = palette if palette else self._generate_default_palette()
-        self.title = title
-        self.text_widget = self._create_text_widget()
-        self._style_widget_with_palette()
-        self.keyword = keyword
-        self.palette = palette
-        self.configure(bg=palette['raisin_black'][500], fg=palette['white'][100])
+        self.is_flare_visible = False
+        self.flare_widget = None  # Initialize without a Flare widget
+        if palette:
+            self.configure(bg=palette['raisin_black'][500], fg=palette['white'][100])
+        else:
+            self.configure(bg=self.palette['background'], fg=self.palette['foreground'],
+                           insertbackground=self.palette['insert'])
+        self.insert('1.0', model.content)
+        self.edit_reset()
+        self.edit_modified(False)
         self.bind("<Control-Button-1>", self.on_ctrl_click)
-        parent.add_with_tag(self, keyword)
+
+    @property
+    def keyword(self):
+        return self.model.keyword
+
+    @property
+    def linked_word(self):
+        return self.model.keyword
+
+    @property
+    def content(self):
+        return self.model.content
+
+    @property
+    def color(self):
+        return self.model.color
+
+    @property
+    def id(self):
+        return self.model.id
 
     def on_ctrl_click(self, event):
         """ Handles 'ctrl+click' to create or view the corresponding FLARE window. """
@@ -53,16 +62,11 @@ class DocumentWidget(tk.Text):
         pass  # Logic for handling ctrl+click will be implemented here
 
     def highlight_keyword(self):
-        """ Applies the predefined color to the keyword within the editor. """
-        start_index = f'1.0'
-        while True:
-            start_index = self.search(self.keyword, start_index, tk.END)
-            if not start_index:
-                break
-            end_index = f"{start_index}+{len(self.keyword)}c"
-            self.tag_add('highlight', start_index, end_index)
-            self.tag_config('highlight', background=self.palette['dark_purple'][300])
-            start_index = end_index
+        """ Applies the predefined color to every linked keyword within the editor in one pass. """
+        # A given palette holds shades per colour; the default one a flat highlight colour
+        background = self.palette['dark_purple'][300] if 'dark_purple' in self.palette else self.palette['highlight']
+        self.tag_config('highlight', background=background)
+        return linked_keywords.highlight(self, 'highlight')
 
     def _create_text_widget(self):
         # Create a Tkinter Text widget for content editing
@@ -78,38 +82,25 @@ class DocumentWidget(tk.Text):
     def _style_widget_with_palette(self):
         # Apply the color palette to the text widget for an engaging user experience
         title_font = font.Font(size=14, weight="bold", family='Consolas')
-        self.text_widget.tag_configure("title", background=self.palette['title_bg'],
-                                       foreground=self.palette['foreground'], font=title_font)
-        self.text_widget.tag_configure("highlight", background=self.palette['highlight'])
-        self.text_widget.tag_configure("accent", foreground=self.palette['accent'])
+        self.tag_configure("title", background=self.palette['title_bg'],
+                           foreground=self.palette['foreground'], font=title_font)
+        self.tag_configure("highlight", background=self.palette['highlight'])
+        self.tag_configure("accent", foreground=self.palette['accent'])
 
         # Insert the title at the top of the widget
-        self.text_widget.insert(tk.END, f"{self.title}\n", "title")
+        self.insert(tk.END, f"{self.title}\n", "title")
 
         # Insert initial content with highlighted keywords as an example
-        self.text_widget.insert(tk.END, self.content)
-        self.text_widget.highlight_pattern(self.title, "highlight")
+        self.insert(tk.END, self.content)
+        self.highlight_pattern(self.title, "highlight")
 
         # Configure the widget aesthetics such as cursor and selection colors
-        self.text_widget.config(bg=self.palette['background'], fg=self.palette['foreground'],
-                                insertbackground=self.palette['insert'], selectbackground=self.palette['accent'])
+        self.config(bg=self.palette['background'], fg=self.palette['foreground'],
+                    insertbackground=self.palette['insert'], selectbackground=self.palette['accent'])
 
     def highlight_pattern(self, pattern, tag, start="1.0", end="end", regexp=False):
-        # Function to highlight all occurrences of a given pattern
-        start = self.text_widget.index(start)
-        end = self.text_widget.index(end)
-        self.text_widget.mark_set("matchStart", start)
-        self.text_widget.mark_set("matchEnd", start)
-        self.text_widget.mark_set("searchLimit", end)
-
-        count = tk.StringVar()
-        while True:
-            index = self.text_widget.search(pattern, "matchEnd","searchLimit", count=count, regexp=regexp)
-            if index == "": break
-            if count.get() == '0': break  # no match was found
-            self.text_widget.mark_set("matchStart", index)
-            self.text_widget.mark_set("matchEnd", f"{index}+{count.get()}c")
-            self.text_widget.tag_add(tag, "matchStart", "matchEnd")
+        # Function to highlight all occurrences of a given pattern within one snapshot of the range
+        return SearchEngine(self).highlight(pattern, tag, start, end, replace=False, regexp=regexp)
     
     def ctrl_click_event(self, event):
         # Check if the click is within a HEAT UP word and open/hide the related FLARE window
@@ -158,7 +149,7 @@ class DocumentWidget(tk.Text):
             new_content (str): The new content to update in the flare.
         """
         # You might have additional logic to handle content changes
-        self.content = new_content
+        self.model.content = new_content
         self.text_area.delete('1.0', 'end')
         self.text_area.insert('1.0', new_content)
 
@@ -167,8 +158,8 @@ class DocumentWidget(tk.Text):
         Saves any modifications made in the FLARE text area to the main content.
         """
         updated_content = self.text_area.get('1.0', 'end-1c')  # Fetches text from Text widget
-        self.update_content(updated_content)
-        # Here you can add logic to persist changes to a file or database
+        self.model.set_content(updated_content)  # Also stores the note and refreshes what is built from it
+        self.edit_modified(False)
 
     def get_content(self):
         """
@@ -176,28 +167,10 @@ class DocumentWidget(tk.Text):
         Returns:
             str: The current document content.
         """
-        return self.content
+        return self.text_area.get('1.0', 'end-1c')
 
     def __str__(self):
         """
         Returns a string representation of the document widget, useful for debugging.
         """
-        return f"DocumentWidget(id='{self.id}', linked_word='{self.linked_word}', content='{self.content[:30]}...')"
-
-    def on_ctrl_click(self, event):
-        """ Handles 'ctrl+click' to create or view the corresponding FLARE window. """
-        # The implementation should create a FlareWidget or bring it to view if already created
-        pass  # Logic for handling ctrl+click will be implemented here
-
-    def highlight_keyword(self):
-        """ Applies the predefined color to the keyword within the editor. """
-        start_index = f'1.0'
-        while True:
-            start_index = self.search(self.keyword, start_index, tk.END)
-            if not start_index:
-                break
-            end_index = f"{start_index}+{len(self.keyword)}c"
-            self.tag_add('highlight', start_index, end_index)
-            self.tag_config('highlight', background=self.palette['dark_purple'][300])
-            start_index = end_index
-        # Additional logic could be implemented for removing highlights or changing the keyword
+        return f"DocumentWidget(id={self.id}, linked_word='{self.linked_word}', content='{self.content[:30]}...')"
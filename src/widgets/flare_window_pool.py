@@ -0,0 +1,254 @@
+# flare_window_pool.py opens FLARE windows on demand and recycles a few Toplevels instead of keeping one per keyword
+
+from collections import OrderedDict, deque
+import tkinter as tk
+from tkinter import Toplevel, Text, Scrollbar
+
+from src.editors.tag_batcher import TagBatcher
+from src.widgets.flare_widget import FlareWidget
+
+# Formatting tags saved with a note, as (tag, start_index, end_index) spans
+FORMAT_TAGS = ('bold', 'italic', 'underline')
+
+
+class FlareHandle:
+    """
+    A linked keyword's FLARE note, without any window: just the keyword and its saved content. Creating one
+    costs nothing on the Tk side, so every linked term can have a handle; the pool lends it a window while
+    it is shown. A handle made without content reads its note from the pool's store when first needed.
+    Parameters:
+        pool (FlareWindowPool): The pool lending windows to this handle.
+        keyword (str): The linked keyword.
+        content (str): The note's text; None to read it from the store on first use.
+        spans (list): The note's formatting, (tag, start_index, end_index) tuples.
+    """
+    __slots__ = ('pool', 'keyword', 'content', 'spans', 'window')
+
+    def __init__(self, pool, keyword, content=None, spans=()):
+        self.pool = pool
+        self.keyword = keyword
+        self.content = content
+        self.spans = list(spans)
+        self.window = None  # _FlareWindow while shown
+
+    @property
+    def visible(self):
+        return self.window is not None
+
+    def open(self):
+        """ Shows the note, borrowing a window from the pool. """
+        self.pool.open(self)
+
+    def hide(self):
+        """ Saves the note and returns its window to the pool. """
+        self.pool.hide(self)
+
+    def toggle_visibility(self):
+        """ Shows the note if hidden, hides it otherwise. """
+        if self.visible:
+            self.hide()
+        else:
+            self.open()
+
+    def get_content(self):
+        """ The note's text, live from its window while shown. """
+        if self.window is not None:
+            return self.window.text.get('1.0', 'end-1c')
+        self.pool.read(self)
+        return self.content
+
+    def set_content(self, content, spans=()):
+        """ Replaces the note's text and formatting. """
+        self.content = content
+        self.spans = list(spans)
+        if self.window is not None:
+            self.window.load(self)
+
+
+class _FlareWindow:
+    """
+    One reusable FLARE Toplevel with its text area; `load` points it at another handle.
+    """
+    __slots__ = ('toplevel', 'text', 'handle', 'on_close')
+
+    def __init__(self, master, palette, on_close):
+        self.handle = None
+        self.on_close = on_close
+        self.toplevel = Toplevel(master)
+        self.toplevel.geometry('600x400')
+        self.toplevel.protocol('WM_DELETE_WINDOW', self.close)
+        self.text = Text(self.toplevel, wrap='word', undo=True, font=('Consolas', 12),
+                         bg=palette['secondary'], fg=palette['primary'], insertbackground=palette['primary'])
+        scrollbar = Scrollbar(self.toplevel, command=self.text.yview)
+        scrollbar.pack(side='right', fill='y')
+        self.text.pack(expand=True, fill='both')
+        self.text.config(yscrollcommand=scrollbar.set)
+        self.text.tag_configure('bold', font=('Consolas', 12, 'bold'))
+        self.text.tag_configure('italic', font=('Consolas', 12, 'italic'))
+        self.text.tag_configure('underline', underline=True)
+        self.text.bind('<Control-b>', lambda event: self.toggle_format('bold'))
+        self.text.bind('<Control-i>', lambda event: self.toggle_format('italic'))
+        self.text.bind('<Control-u>', lambda event: self.toggle_format('underline'))
+
+    def close(self):
+        # The window manager's close button hides the note instead of destroying a reusable window
+        if self.handle is not None:
+            self.on_close(self.handle)
+
+    def load(self, handle):
+        # Show the handle's note, with an undo history of its own
+        self.handle = handle
+        self.toplevel.title(f'FLARE: {handle.keyword}')
+        self.text.delete('1.0', tk.END)
+        self.text.insert('1.0', handle.content)
+        for tag in FORMAT_TAGS:
+            self.text.tag_remove(tag, '1.0', tk.END)
+            indices = [index for span in handle.spans if span[0] == tag for index in span[1:]]
+            TagBatcher.add_ranges(self.text, tag, indices)
+        self.text.edit_reset()
+        self.text.edit_modified(False)
+
+    def spans(self):
+        # The formatting as (tag, start_index, end_index) tuples
+        spans = []
+        for tag in FORMAT_TAGS:
+            ranges = [str(index) for index in self.text.tag_ranges(tag)]
+            spans.extend((tag, start, end) for start, end in zip(ranges[::2], ranges[1::2]))
+        return spans
+
+    def toggle_format(self, tag):
+        # Format the selection, or clear the format if the selection starts formatted
+        try:
+            start, end = self.text.index('sel.first'), self.text.index('sel.last')
+        except tk.TclError:
+            return 'break'  # No selection
+        if tag in self.text.tag_names(start):
+            self.text.tag_remove(tag, start, end)
+        else:
+            self.text.tag_add(tag, start, end)
+        self.text.edit_modified(True)  # Tag changes alone do not mark the text as modified
+        return 'break'
+
+
+class FlareWindowPool:
+    """
+    Lends a bounded number of Toplevels to FLARE handles. A handle gets a window only when first opened; a
+    hidden one saves its note and gives the window back, to be reused by the next note opened. At most
+    `max_idle` windows wait withdrawn for reuse, the oldest being destroyed beyond that. At most
+    `max_windows` exist at all: opening one more note takes the window of the least recently opened note the
+    user has minimized, after saving it. A note still on screen is never taken away; when every window is,
+    the pool goes over the limit, and shrinks back to it as notes are hidden.
+    Notes are saved, and reported through `on_save`, only when their text was edited.
+    Hundreds of linked terms thus cost a handful of Tk windows.
+    With a FlareStore, handles read their note from it when first opened and saves are queued to it, so a
+    knowledge base of any size opens without reading a single note.
+    Parameters:
+        master (tk.Widget): Parent of the Toplevels.
+        max_windows (int): Windows alive at most, shown or idle.
+        max_idle (int): Withdrawn windows kept for reuse.
+        palette (dict): 'primary' / 'secondary' colours; FlareWidget's default palette if omitted.
+        on_save (callable): Called as on_save(keyword, content) whenever a note is saved.
+        store (FlareStore): Where notes are read from and saved to, if anywhere.
+    """
+    def __init__(self, master, max_windows=8, max_idle=2, palette=None, on_save=None, store=None):
+        self.master = master
+        self.max_windows = max_windows
+        self.max_idle = max_idle
+        self.palette = palette or FlareWidget.default_palette()
+        self.on_save = on_save
+        self.store = store
+        self.handles = {}  # Keyword -> FlareHandle
+        self._shown = OrderedDict()  # FlareHandle -> _FlareWindow, least recently opened first
+        self._idle = deque()  # Withdrawn windows, oldest first
+
+    def handle(self, keyword, content=None):
+        """ The keyword's handle, created (without a window nor reading its note) on first request. """
+        handle = self.handles.get(keyword)
+        if handle is None:
+            handle = self.handles[keyword] = FlareHandle(self, keyword, content)
+        return handle
+
+    def handles_from_store(self):
+        """ Creates a handle for every note in the store, reading only their keywords. """
+        if self.store is None:
+            return []
+        return [self.handle(keyword) for keyword in self.store.keywords()]
+
+    def read(self, handle):
+        """ Reads a handle's note from the store unless it already has its content. """
+        if handle.content is not None:
+            return
+        note = self.store.load(handle.keyword) if self.store is not None else None
+        handle.content, handle.spans = note if note is not None else ('', [])
+
+    def open(self, handle):
+        """ Shows a handle's note, raising it if it is already shown. """
+        if isinstance(handle, str):
+            handle = self.handle(handle)
+        window = self._shown.get(handle)
+        if window is None:
+            self.read(handle)  # The note's text is first read when it is opened
+            window = self._acquire()
+            window.load(handle)
+            handle.window = window
+            self._shown[handle] = window
+        else:
+            self._shown.move_to_end(handle)
+        window.toplevel.deiconify()
+        window.toplevel.lift()
+        window.text.focus_set()
+        return handle
+
+    def hide(self, handle):
+        """ Saves a shown note and returns its window to the idle pool. """
+        window = self._shown.pop(handle, None)
+        if window is None:
+            return
+        self._detach(handle, window)
+        window.toplevel.withdraw()
+        self._idle.append(window)
+        while self._idle and (len(self._idle) > self.max_idle or self.window_count() > self.max_windows):
+            self._idle.popleft().toplevel.destroy()
+
+    def save(self, handle):
+        """ Copies a shown note's text into its handle, queues it to the store and reports it through `on_save`. """
+        if handle.window is not None:
+            handle.content = handle.window.text.get('1.0', 'end-1c')
+            handle.spans = handle.window.spans()
+        self.read(handle)
+        if self.store is not None:
+            self.store.save(handle.keyword, handle.content, handle.spans)
+        if self.on_save is not None:
+            self.on_save(handle.keyword, handle.content)
+
+    def close_all(self):
+        """ Saves every shown note and destroys every window; the handles stay usable. """
+        for handle, window in list(self._shown.items()):
+            self._detach(handle, window)
+            window.toplevel.destroy()
+        self._shown.clear()
+        while self._idle:
+            self._idle.popleft().toplevel.destroy()
+
+    def window_count(self):
+        """ Toplevels currently alive, shown or idle. """
+        return len(self._shown) + len(self._idle)
+
+    def _acquire(self):
+        # An idle window, a new one while under the limit, the least recently opened minimized one, or a new one
+        if self._idle:
+            return self._idle.pop()
+        if self.window_count() >= self.max_windows:
+            for handle, window in self._shown.items():
+                if window.toplevel.state() in ('iconic', 'withdrawn'):
+                    del self._shown[handle]
+                    self._detach(handle, window)
+                    return window
+        return _FlareWindow(self.master, self.palette, self.hide)
+
+    def _detach(self, handle, window):
+        # Save an edited note before its window goes elsewhere
+        if window.text.edit_modified():
+            self.save(handle)
+        handle.window = None
+        window.handle = None
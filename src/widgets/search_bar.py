@@ -0,0 +1,356 @@
+# search_bar.py is an inline find bar that refines its matches as the query is typed, without blocking the editor
+
+import re
+import time
+import tkinter as tk
+from bisect import bisect_left, bisect_right
+
+from src.editors.line_offset_table import LineOffsetTable
+from src.editors.tag_batcher import TagBatcher
+from src.managers.replace_manager import ReplaceManager
+
+
+def self_overlapping(query, flags=0):
+    """
+    Whether two matches of a literal query can overlap: some proper suffix of the query matches its prefix of
+    the same length, under the same flags (so case-insensitive overlaps such as "aA" count too).
+    """
+    return any(re.fullmatch(re.escape(query[:len(query) - shift]), query[shift:], flags)
+               for shift in range(1, len(query)))
+
+
+class LazyMatchList:
+    """
+    The matches of one query over one buffer snapshot, discovered a window at a time. Navigation never waits
+    for the whole scan: looking past the scanned part searches on directly from the requested offset.
+    Windows end on line breaks, so only matches spanning a window boundary's newline can be missed.
+    Parameters:
+        pattern (re.Pattern): The compiled query.
+        content (str): The buffer snapshot.
+        query (str): The literal query text, if the pattern is a plain literal; enables refinement.
+        nocase (bool): Whether the pattern ignores case.
+    """
+    def __init__(self, pattern, content, query=None, nocase=False):
+        self.pattern = pattern
+        self.content = content
+        self.query = query
+        self.nocase = nocase
+        self.starts, self.ends = [], []
+        self.scanned = 0  # Offset up to which every match is known
+        self._refined = None  # Candidate starts, when refining a previous literal query
+
+    @property
+    def complete(self):
+        return self.scanned >= len(self.content)
+
+    def refine(self, previous):
+        """
+        Reuses a finished scan of a shorter literal query: every match of the longer query starts where the
+        shorter one matched, so only those positions need checking. That only holds when the shorter query
+        can't overlap itself, as the scan skipped overlapping matches ("aa" in "aaab" is found at 0 only,
+        while "aab" is at 1); otherwise the query is scanned afresh.
+        """
+        if not (previous is not None and previous.complete and previous.content is self.content
+                and self.query is not None and previous.query is not None
+                and previous.nocase == self.nocase and self.query.startswith(previous.query)
+                and not self_overlapping(previous.query, previous.pattern.flags)):
+            return False
+        self._refined = (previous.starts, 0)
+        return True
+
+    def scan(self, max_chars):
+        """
+        Extends the known matches by about `max_chars` characters of the snapshot.
+        Returns:
+            tuple: (first, last) positions in `starts` of the matches found by this call.
+        """
+        first = len(self.starts)
+        if self._refined is not None:
+            self._scan_candidates(max_chars)
+            return first, len(self.starts)
+        content = self.content
+        end = min(len(content), self.scanned + max_chars)
+        if end < len(content):
+            newline = content.find('\n', end)
+            end = len(content) if newline == -1 else newline + 1
+        for match in self.pattern.finditer(content, self.scanned, end):
+            if match.end() > match.start():
+                self.starts.append(match.start())
+                self.ends.append(match.end())
+        self.scanned = end
+        return first, len(self.starts)
+
+    def _scan_candidates(self, max_chars):
+        # Check previous match starts against the longer query, about max_chars / 64 candidates per call
+        candidates, position = self._refined
+        stop = min(len(candidates), position + max(64, max_chars // 64))
+        match_at = self.pattern.match  # Same matching rules as a scan, case folding included
+        content = self.content
+        for start in candidates[position:stop]:
+            if self.ends and start < self.ends[-1]:
+                continue  # Overlaps the previous match, which a scan would skip as well
+            match = match_at(content, start)
+            if match is not None and match.end() > start:
+                self.starts.append(start)
+                self.ends.append(match.end())
+        if stop == len(candidates):
+            self._refined = None
+            self.scanned = len(content)
+        else:
+            self._refined = (candidates, stop)
+            self.scanned = candidates[stop]
+
+    def next_after(self, offset):
+        """ (start, end) of the first match starting after `offset`, wrapping around; None if there is none. """
+        position = bisect_right(self.starts, offset)
+        if position < len(self.starts):
+            return self.starts[position], self.ends[position]
+        if not self.complete:
+            found = self._search(max(offset + 1, self.scanned), len(self.content))
+            if found:
+                return found
+        if self.starts and self.starts[0] <= offset:
+            return self.starts[0], self.ends[0]
+        return self._search(0, offset + 1) if not self.complete else None
+
+    def previous_before(self, offset):
+        """ (start, end) of the last match starting before `offset`, wrapping around; None if there is none. """
+        while not self.complete and self.scanned <= offset:
+            self.scan(1 << 20)
+        position = bisect_left(self.starts, offset)
+        if position > 0:
+            return self.starts[position - 1], self.ends[position - 1]
+        while not self.complete:
+            self.scan(1 << 20)
+        return (self.starts[-1], self.ends[-1]) if self.starts else None
+
+    def _search(self, start, end):
+        # Direct lookup past the scanned part, without recording anything
+        for match in self.pattern.finditer(self.content, start, end):
+            if match.end() > match.start():
+                return match.span()
+        return None
+
+
+class SearchBar(tk.Frame):
+    """
+    Inline find bar shown under a Text widget. Every keystroke cancels the scan in flight (through a
+    generation counter), tags the matches on screen right away and leaves the rest of the buffer to budgeted
+    idle steps. Enter / Shift+Enter move to the next / previous match, Escape closes the bar. The replace
+    entry replaces the selected match (Enter) or, through a ReplaceManager, all of them in one undo step.
+    Parameters:
+        master (tk.Widget): The parent of both the bar and the Text widget.
+        text_widget (tk.Text): The widget being searched.
+        edit_tracker (EditTracker): Optional tracker; edits then refresh the snapshot. Without one the
+            snapshot is taken each time the bar is shown.
+        budget_ms (float): Time spent per idle scan step.
+        replace_manager (ReplaceManager): Performs the replacements; one without suspend targets is made if omitted.
+    """
+    def __init__(self, master, text_widget, edit_tracker=None, budget_ms=8.0, replace_manager=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.text_widget = text_widget
+        self.replace_manager = replace_manager or ReplaceManager(text_widget, edit_tracker)
+        self.budget = budget_ms / 1000.0
+        self.generation = 0
+        self.matches = None  # LazyMatchList of the current query
+        self._current = None  # (start, end) offsets of the selected match
+        self._content = None
+        self._line_table = None
+        self._step_id = None
+        self.query = tk.StringVar(self)
+        self.replacement = tk.StringVar(self)
+        self.regexp = tk.BooleanVar(self, value=False)
+        self.nocase = tk.BooleanVar(self, value=True)
+        self._build()
+        text_widget.tag_config('search', background='yellow')
+        text_widget.tag_config('search_current', background='orange')
+        text_widget.tag_raise('search_current', 'search')
+        if edit_tracker is not None:
+            edit_tracker.add_listener(self._on_edit)
+
+    def _build(self):
+        # Entry, options, match count and navigation buttons in one row
+        self.entry = tk.Entry(self, textvariable=self.query)
+        self.entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=2, pady=2)
+        tk.Checkbutton(self, text='Regex', variable=self.regexp, command=self.refresh).pack(side=tk.LEFT)
+        tk.Checkbutton(self, text='Ignore case', variable=self.nocase, command=self.refresh).pack(side=tk.LEFT)
+        self.status = tk.Label(self, width=18, anchor=tk.W)
+        self.status.pack(side=tk.LEFT, padx=4)
+        tk.Button(self, text='▲', command=self.previous_match).pack(side=tk.LEFT)
+        tk.Button(self, text='▼', command=self.next_match).pack(side=tk.LEFT)
+        self.replace_entry = tk.Entry(self, textvariable=self.replacement, width=20)
+        self.replace_entry.pack(side=tk.LEFT, padx=2, pady=2)
+        tk.Button(self, text='Replace', command=self.replace_current).pack(side=tk.LEFT)
+        tk.Button(self, text='All', command=self.replace_all).pack(side=tk.LEFT)
+        tk.Button(self, text='✕', command=self.hide).pack(side=tk.LEFT)
+        self.query.trace_add('write', lambda *args: self.refresh())
+        self.entry.bind('<Return>', lambda event: self.next_match())
+        self.entry.bind('<Shift-Return>', lambda event: self.previous_match())
+        self.entry.bind('<Escape>', lambda event: self.hide())
+        self.replace_entry.bind('<Return>', lambda event: self.replace_current())
+        self.replace_entry.bind('<Escape>', lambda event: self.hide())
+
+    def show(self):
+        """ Shows the bar below the text widget and focuses the query entry. """
+        if not self.winfo_ismapped():
+            self.pack(side=tk.BOTTOM, fill=tk.X, before=self.text_widget)
+        self._content = None  # Take a fresh snapshot
+        self.entry.focus_set()
+        self.entry.select_range(0, tk.END)
+        self.refresh()
+
+    def hide(self):
+        """ Cancels the scan, removes the match tags and hands focus back to the text widget. """
+        self._cancel()
+        self.text_widget.tag_remove('search', '1.0', tk.END)
+        self.text_widget.tag_remove('search_current', '1.0', tk.END)
+        self.pack_forget()
+        self.text_widget.focus_set()
+
+    def refresh(self):
+        """ Restarts the search for the current query: the viewport synchronously, the rest in idle steps. """
+        previous = self.matches
+        self._cancel()
+        self._current = None
+        self.text_widget.tag_remove('search', '1.0', tk.END)
+        self.text_widget.tag_remove('search_current', '1.0', tk.END)
+        query = self.query.get()
+        if not query:
+            self.matches = None
+            self.status.config(text='')
+            return
+        regexp, nocase = self.regexp.get(), self.nocase.get()
+        try:
+            pattern = re.compile(query if regexp else re.escape(query), re.MULTILINE | (re.IGNORECASE if nocase else 0))
+        except re.error as error:
+            self.matches = None
+            self.status.config(text=f'Invalid: {error.msg}')
+            return
+        content = self._snapshot()
+        self.matches = LazyMatchList(pattern, content, None if regexp else query, nocase)
+        self.matches.refine(previous)
+        self._tag_viewport(pattern)
+        self.status.config(text='Searching…')
+        self._step_id = self.text_widget.after_idle(self._step, self.generation)
+
+    def next_match(self):
+        """ Selects the next match after the insertion cursor, wrapping at the end of the buffer. """
+        if self.matches is not None:
+            self._select(self.matches.next_after(self._anchor_offset()))
+
+    def previous_match(self):
+        """ Selects the match before the insertion cursor, wrapping at the start of the buffer. """
+        if self.matches is not None:
+            self._select(self.matches.previous_before(self._anchor_offset()))
+
+    def replace_current(self):
+        """ Replaces the selected match and selects the next one; selects the first match if none is selected. """
+        if self.matches is None:
+            return
+        if self._current is None:
+            self.next_match()
+            return
+        start, end = self._table().offsets_to_indices(self._current)
+        try:
+            self.replace_manager.replace_span(start, end, self.query.get(), self.replacement.get(), **self._options())
+        except re.error as error:
+            self.status.config(text=f'Invalid: {error.msg}')
+            return
+        self._content = None  # The cursor now sits after the replacement, where the next match is looked up
+        self.refresh()
+        self.next_match()
+
+    def replace_all(self):
+        """ Replaces every match in the buffer as a single undo step. """
+        query = self.query.get()
+        if not query:
+            return
+        try:
+            result = self.replace_manager.replace_all(query, self.replacement.get(), **self._options())
+        except re.error as error:
+            self.status.config(text=f'Invalid: {error.msg}')
+            return
+        self._content = None
+        self.refresh()
+        self.status.config(text=f'{result.count} replaced')
+
+    def _options(self):
+        return {'regexp': self.regexp.get(), 'nocase': self.nocase.get()}
+
+    def _snapshot(self):
+        # One copy of the buffer serves every keystroke until the text changes
+        if self._content is None:
+            self._content = self.text_widget.get('1.0', 'end-1c')
+            self._line_table = None
+        return self._content
+
+    def _table(self):
+        # Built on first use, then reused for every conversion on this snapshot
+        if self._line_table is None:
+            self._line_table = LineOffsetTable(self._content)
+        return self._line_table
+
+    def _on_edit(self, delta):
+        self._cancel()
+        self._content = None
+        self._current = None
+        if self.winfo_ismapped() and self.matches is not None:
+            self._step_id = self.text_widget.after_idle(self.refresh)
+
+    def _cancel(self):
+        self.generation += 1
+        if self._step_id is not None:
+            self.text_widget.after_cancel(self._step_id)
+            self._step_id = None
+
+    def _tag_viewport(self, pattern):
+        # The lines on screen are searched directly, without waiting for the buffer scan to reach them
+        first = self.text_widget.index('@0,0').split('.')[0]
+        last = self.text_widget.index(f'@0,{self.text_widget.winfo_height()}').split('.')[0]
+        visible = self.text_widget.get(f'{first}.0', f'{last}.end')
+        table = LineOffsetTable(visible, origin=(int(first), 0))
+        offsets = []
+        for match in pattern.finditer(visible):
+            if match.end() > match.start():
+                offsets.extend(match.span())
+        TagBatcher.add_ranges(self.text_widget, 'search', table.offsets_to_indices(offsets))
+
+    def _step(self, generation):
+        """ Scans and tags the next part of the buffer within the time budget. """
+        self._step_id = None
+        if generation != self.generation or self.matches is None:
+            return  # The query changed since this step was queued
+        matches = self.matches
+        deadline = time.perf_counter() + self.budget
+        first = len(matches.starts)
+        while not matches.complete and time.perf_counter() < deadline:
+            matches.scan(1 << 18)
+        offsets = []
+        for start, end in zip(matches.starts[first:], matches.ends[first:]):
+            offsets.extend((start, end))
+        TagBatcher.add_ranges(self.text_widget, 'search', self._table().offsets_to_indices(offsets))
+        count = len(matches.starts)
+        if matches.complete:
+            self.status.config(text=f'{count} match{"es" if count != 1 else ""}')
+        else:
+            self.status.config(text=f'{count}+ matches…')
+            self._step_id = self.text_widget.after_idle(self._step, generation)
+
+    def _anchor_offset(self):
+        # Navigation continues from the selected match, or from the insertion cursor if there is none
+        if self._current is not None:
+            return self._current[0]
+        self._snapshot()
+        return self._table().index_to_offset(self.text_widget.index(tk.INSERT))
+
+    def _select(self, span):
+        # Move the cursor to a match, mark it as current and scroll it into view
+        if span is None:
+            self.status.config(text='No matches')
+            return
+        self._current = span
+        start, end = self._table().offsets_to_indices(span)
+        self.text_widget.tag_remove('search_current', '1.0', tk.END)
+        self.text_widget.tag_add('search_current', start, end)
+        self.text_widget.mark_set(tk.INSERT, end)
+        self.text_widget.see(start)
@@ -0,0 +1,116 @@
+# search_results_panel.py lists find-in-files hits as they stream in and opens the file at a chosen hit
+
+import queue
+import re
+import tkinter as tk
+
+
+class SearchResultsPanel(tk.Frame):
+    """
+    Panel with a query row and a list of hits from a ProjectSearchManager. Hits are pulled off the search's
+    queue by an `after()` poll and appended in one listbox call per poll, so a flood of results never blocks
+    the editor. Starting a new query or pressing Stop cancels the running search.
+    Parameters:
+        master (tk.Widget): Parent widget.
+        manager (ProjectSearchManager): The search backend.
+        on_open (callable): Called as on_open(path, line, column) when a hit is activated.
+        poll_ms (int): Delay between polls of the result queue.
+    """
+    def __init__(self, master, manager, on_open=None, poll_ms=30, **kwargs):
+        super().__init__(master, **kwargs)
+        self.manager = manager
+        self.on_open = on_open
+        self.poll_ms = poll_ms
+        self.search = None  # The ProjectSearch being displayed
+        self.hits = []  # SearchHit per listbox row
+        self._poll_id = None
+        self.query = tk.StringVar(self)
+        self.regexp = tk.BooleanVar(self, value=False)
+        self.nocase = tk.BooleanVar(self, value=False)
+        self._build()
+
+    def _build(self):
+        # Query row on top, hit list with scrollbar below, status line at the bottom
+        row = tk.Frame(self)
+        row.pack(side=tk.TOP, fill=tk.X)
+        self.entry = tk.Entry(row, textvariable=self.query)
+        self.entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=2, pady=2)
+        self.entry.bind('<Return>', lambda event: self.start())
+        self.entry.bind('<Escape>', lambda event: self.stop())
+        tk.Checkbutton(row, text='Regex', variable=self.regexp).pack(side=tk.LEFT)
+        tk.Checkbutton(row, text='Ignore case', variable=self.nocase).pack(side=tk.LEFT)
+        tk.Button(row, text='Find', command=self.start).pack(side=tk.LEFT)
+        tk.Button(row, text='Stop', command=self.stop).pack(side=tk.LEFT)
+        self.status = tk.Label(self, anchor=tk.W)
+        self.status.pack(side=tk.BOTTOM, fill=tk.X)
+        scrollbar = tk.Scrollbar(self)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox = tk.Listbox(self, yscrollcommand=scrollbar.set, activestyle='none', font=('Consolas', 10))
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.config(command=self.listbox.yview)
+        self.listbox.bind('<Double-Button-1>', lambda event: self.open_selected())
+        self.listbox.bind('<Return>', lambda event: self.open_selected())
+
+    def start(self):
+        """ Runs the query in the entry, replacing the current results. """
+        query = self.query.get()
+        self.stop()
+        self.listbox.delete(0, tk.END)
+        self.hits = []
+        if not query:
+            self.status.config(text='')
+            return
+        try:
+            self.search = self.manager.search(query, regexp=self.regexp.get(), nocase=self.nocase.get())
+        except re.error as error:
+            self.status.config(text=f'Invalid pattern: {error.msg}')
+            return
+        self.status.config(text='Searching…')
+        self._poll_id = self.after(self.poll_ms, self._poll)
+
+    def stop(self):
+        """ Cancels the running search; hits already listed stay. """
+        if self.search is not None:
+            self.search.cancel()
+        if self._poll_id is not None:
+            self.after_cancel(self._poll_id)
+            self._poll_id = None
+            self._show_status(finished=False)
+
+    def open_selected(self):
+        """ Opens the file of the selected hit at the hit's position. """
+        selection = self.listbox.curselection()
+        if selection and self.on_open is not None:
+            hit = self.hits[selection[0]]
+            self.on_open(hit.path, hit.line, hit.column)
+
+    def _poll(self):
+        """ Moves newly arrived hits into the list. """
+        self._poll_id = None
+        rows, finished = [], False
+        while True:
+            try:
+                hits = self.search.results.get_nowait()
+            except queue.Empty:
+                break
+            if hits is None:
+                finished = True
+                break
+            self.hits.extend(hits)
+            rows.extend(f'{hit.path}:{hit.line}: {hit.text.strip()}' for hit in hits)
+        if rows:
+            self.listbox.insert(tk.END, *rows)
+        self._show_status(finished)
+        if not finished:
+            self._poll_id = self.after(self.poll_ms, self._poll)
+
+    def _show_status(self, finished):
+        search = self.search
+        text = f'{search.hit_count} hits, {search.file_count} files searched'
+        if search.capped:
+            text += f' (stopped at {search.max_hits} hits)'
+        elif search.cancelled:
+            text += ' (stopped)'
+        if finished and search.elapsed is not None:
+            text += f' in {search.elapsed * 1000:.0f} ms'
+        self.status.config(text=text)
@@ -0,0 +1,6 @@
+# conftest.py puts the repository root on the import path, so tests import the editor as `src.…` like the app does
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
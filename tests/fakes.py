@@ -0,0 +1,441 @@
+# fakes.py stands in for a Tcl interpreter and Tk widgets, so editor components can be tested without a display
+
+import re
+from collections import defaultdict
+from itertools import count
+from types import SimpleNamespace
+from tkinter import TclError
+
+# Index modifiers understood by FakeText: "+5c", "-1 chars", " lineend", " linestart", " wordend", " wordstart"
+MODIFIER = re.compile(r'\s*(?:([+-])\s*(\d+)\s*c(?:hars)?|(lineend|linestart|wordend|wordstart))')
+
+
+class FakeTk:
+    """
+    A Tcl interpreter reduced to its command table, with `rename` and `createcommand` as EditTracker uses them.
+    """
+    def __init__(self):
+        self.commands = {}
+
+    def createcommand(self, name, function):
+        self.commands[name] = function
+
+    def call(self, *args):
+        if len(args) == 1 and isinstance(args[0], tuple):
+            args = args[0]
+        if args[0] == 'rename':
+            if args[2] in self.commands:
+                raise TclError(f'can\'t rename to "{args[2]}": command already exists')
+            self.commands[args[2]] = self.commands.pop(args[1])
+            return ''
+        return self.commands[args[0]](*args[1:])
+
+
+class FakeText:
+    """
+    In-memory Text widget. Like Tk, every widget method goes through the interpreter's widget command, so an
+    EditTracker installed on it sees every edit; tags and marks move along with the text.
+    Parameters:
+        text (str): Initial content, without Tk's implicit trailing newline.
+    """
+    _names = count(1)
+
+    def __init__(self, text=''):
+        self.tk = FakeTk()
+        self._w = f'.text{next(self._names)}'
+        self.content = text
+        self.tags = defaultdict(set)  # Tag -> offsets of the tagged characters
+        self.marks = {'insert': 0}
+        self.options = {'autoseparators': True, 'state': 'normal'}
+        self.separators = 0
+        self.modified = False  # Tk's modified flag, set by every edit
+        self.tag_calls = 0
+        self.idle = []  # (identifier, callback, args) queued through after / after_idle
+        self.bindings = defaultdict(list)  # Event sequence -> callbacks
+        self.tk.createcommand(self._w, self._command)
+
+    def __str__(self):
+        return self._w
+
+    # Widget methods, routed through the interpreter as tkinter does
+
+    def index(self, index):
+        return self.tk.call(self._w, 'index', index)
+
+    def get(self, start, end=None):
+        return self.tk.call(self._w, 'get', start, *(() if end is None else (end,)))
+
+    def insert(self, index, chars, *args):
+        return self.tk.call(self._w, 'insert', index, chars, *args)
+
+    def delete(self, start, end=None, *more):
+        return self.tk.call(self._w, 'delete', start, *(() if end is None else (end,)), *more)
+
+    def replace(self, start, end, chars, *args):
+        return self.tk.call(self._w, 'replace', start, end, chars, *args)
+
+    def compare(self, first, op, second):
+        return self.tk.call(self._w, 'compare', first, op, second)
+
+    def tag_add(self, tag, *indices):
+        return self.tk.call(self._w, 'tag', 'add', tag, *indices)
+
+    def tag_remove(self, tag, *indices):
+        return self.tk.call(self._w, 'tag', 'remove', tag, *indices)
+
+    def tag_ranges(self, tag):
+        return self.tk.call(self._w, 'tag', 'ranges', tag)
+
+    def tag_names(self, index=None):
+        return self.tk.call(self._w, 'tag', 'names', *(() if index is None else (index,)))
+
+    def mark_set(self, name, index):
+        self.marks[name] = self._offset(index)
+
+    def tag_configure(self, tag, **options):
+        pass
+
+    tag_config = tag_configure
+
+    def tag_bind(self, tag, sequence, function):
+        pass
+
+    def tag_raise(self, tag, above=None):
+        pass
+
+    def see(self, index):
+        pass
+
+    def focus_set(self):
+        pass
+
+    def bind(self, sequence, function, add=None):
+        if not add:
+            self.bindings[sequence] = []
+        self.bindings[sequence].append(function)
+
+    def bbox(self, index):
+        return (0, 0, 7, 14)
+
+    def winfo_rootx(self):
+        return 0
+
+    def winfo_rooty(self):
+        return 0
+
+    def edit_separator(self):
+        self.separators += 1
+
+    def edit_reset(self):
+        pass
+
+    def edit_modified(self, flag=None):
+        if flag is None:
+            return self.modified
+        self.modified = bool(flag)
+
+    def cget(self, option):
+        return self.tk.call(self._w, 'cget', f'-{option}')
+
+    def config(self, **options):
+        self.options.update(options)
+
+    configure = config
+
+    def after(self, ms, function=None, *args):
+        identifier = f'after#{next(self._names)}'
+        self.idle.append((identifier, function, args))
+        return identifier
+
+    def after_idle(self, function, *args):
+        return self.after(0, function, *args)
+
+    def after_cancel(self, identifier):
+        self.idle = [queued for queued in self.idle if queued[0] != identifier]
+
+    def run_idle(self, limit=10000):
+        """ Runs queued callbacks, including the ones they queue, up to `limit` of them. """
+        while self.idle and limit:
+            _, function, args = self.idle.pop(0)
+            function(*args)
+            limit -= 1
+
+    # Test helpers
+
+    def fire(self, sequence, **fields):
+        """ Runs the callbacks bound to an event, as Tk would; returns 'break' if one did. """
+        return fire(self.bindings, sequence, **fields)
+
+    def tagged(self, tag):
+        """ The runs of tagged text, in buffer order. """
+        runs, previous = [], None
+        for offset in sorted(self.tags[tag]):
+            if previous is not None and offset == previous + 1:
+                runs[-1] += self.content[offset]
+            else:
+                runs.append(self.content[offset])
+            previous = offset
+        return runs
+
+    # The widget command
+
+    def _command(self, command, *args):
+        if command == 'cget':
+            return self.options[args[0].lstrip('-')]
+        if command in ('insert', 'delete', 'replace') and self.options['state'] == 'disabled':
+            return ''  # Like Tk, a disabled widget ignores edits
+        if command in ('insert', 'delete', 'replace'):
+            self.modified = True
+        if command == 'index':
+            return self._format(self._offset(args[0]))
+        if command == 'compare':
+            first, op, second = self._offset(args[0]), args[1], self._offset(args[2])
+            return {'<': first < second, '<=': first <= second, '==': first == second,
+                    '>=': first >= second, '>': first > second, '!=': first != second}[op]
+        if command == 'get':
+            start = self._offset(args[0])
+            end = self._offset(args[1]) if len(args) > 1 else start + 1
+            return (self.content + '\n')[start:end]
+        if command == 'insert':
+            self._insert(self._offset(args[0]), args[1:])
+            return ''
+        if command == 'delete':
+            # Several ranges are resolved first, merged where they overlap and removed last to first
+            spans = []
+            for i in range(0, len(args), 2):
+                start = self._offset(args[i])
+                spans.append([start, self._offset(args[i + 1]) if i + 1 < len(args) else start + 1])
+            merged = []
+            for span in sorted(spans):
+                if merged and span[0] <= merged[-1][1]:
+                    merged[-1][1] = max(merged[-1][1], span[1])
+                else:
+                    merged.append(span)
+            for start, end in reversed(merged):
+                self._delete(start, end)
+            return ''
+        if command == 'replace':
+            start, end = self._offset(args[0]), self._offset(args[1])
+            self._delete(start, end)
+            self._insert(start, args[2:])
+            return ''
+        if command == 'tag':
+            return self._tag(*args)
+        raise TclError(f'bad option "{command}"')
+
+    def _tag(self, op, *args):
+        if op in ('add', 'remove'):
+            self.tag_calls += 1
+            tag, indices = args[0], args[1:]
+            if op == 'remove' and len(indices) == 1:
+                indices = (indices[0], f'{indices[0]}+1c')
+            for start, end in zip(indices[::2], indices[1::2]):
+                characters = range(self._offset(start), min(self._offset(end), len(self.content)))
+                if op == 'add':
+                    self.tags[tag].update(characters)
+                else:
+                    self.tags[tag].difference_update(characters)
+            return ''
+        if op == 'ranges':
+            ranges = []
+            for offset in sorted(self.tags[args[0]]):
+                if ranges and ranges[-1][1] == offset:
+                    ranges[-1][1] = offset + 1
+                else:
+                    ranges.append([offset, offset + 1])
+            return tuple(self._format(offset) for pair in ranges for offset in pair)
+        if op == 'names':
+            if not args:
+                return tuple(tag for tag, offsets in self.tags.items() if offsets)
+            offset = self._offset(args[0])
+            return tuple(tag for tag, offsets in self.tags.items() if offset in offsets)
+        raise TclError(f'bad tag option "{op}"')
+
+    def _insert(self, offset, chunks):
+        # Text and optional tag lists alternate: chars ?tagList chars tagList ...?
+        offset = min(offset, len(self.content))
+        for i in range(0, len(chunks), 2):
+            text = str(chunks[i])
+            tags = chunks[i + 1] if i + 1 < len(chunks) else None
+            if isinstance(tags, str):
+                tags = tags.split()
+            if tags is None:
+                # Like Tk, new text takes the tags present on both sides of the insertion point
+                tags = [tag for tag, offsets in self.tags.items() if offset - 1 in offsets and offset in offsets]
+            length = len(text)
+            self.content = self.content[:offset] + text + self.content[offset:]
+            for tag, offsets in self.tags.items():
+                self.tags[tag] = {o + length if o >= offset else o for o in offsets}
+            for tag in tags:
+                self.tags[tag].update(range(offset, offset + length))
+            for name, position in self.marks.items():
+                if position >= offset:
+                    self.marks[name] = position + length
+            offset += length
+
+    def _delete(self, start, end):
+        end = min(end, len(self.content))
+        if end <= start:
+            return
+        length = end - start
+        self.content = self.content[:start] + self.content[end:]
+        for tag, offsets in self.tags.items():
+            self.tags[tag] = {o - length if o >= end else o for o in offsets if not start <= o < end}
+        for name, position in self.marks.items():
+            self.marks[name] = position - length if position >= end else min(position, start)
+
+    def _offset(self, index):
+        # Character offset of a Tk index; len(content) + 1 stands for 'end', after the implicit newline
+        index = str(index)
+        base = re.match(r'\d+\.(?:\d+|end)|end|[\w.]+', index)
+        if base is None:
+            raise TclError(f'bad text index "{index}"')
+        offset = self._base_offset(base.group())
+        rest = index[base.end():]
+        while rest.strip():
+            modifier = MODIFIER.match(rest)
+            if modifier is None:
+                raise TclError(f'bad text index "{index}"')
+            sign, amount, word = modifier.groups()
+            if sign:
+                offset += int(amount) if sign == '+' else -int(amount)
+            else:
+                offset = self._move(offset, word)
+            rest = rest[modifier.end():]
+        return max(0, min(offset, len(self.content) + 1))
+
+    def _base_offset(self, base):
+        if base == 'end':
+            return len(self.content) + 1
+        if base in self.marks:
+            return self.marks[base]
+        if re.fullmatch(r'\d+\.(?:\d+|end)', base):
+            line, col = base.split('.')
+            lines = self.content.split('\n')
+            line = int(line)
+            if line > len(lines):
+                return len(self.content) + 1
+            line = max(line, 1)
+            start = sum(len(text) + 1 for text in lines[:line - 1])
+            length = len(lines[line - 1])
+            return start + (length if col == 'end' else min(int(col), length))
+        raise TclError(f'bad text index "{base}"')
+
+    def _move(self, offset, word):
+        content = self.content
+        if word == 'linestart':
+            return content.rfind('\n', 0, offset) + 1
+        if word == 'lineend':
+            newline = content.find('\n', offset)
+            return len(content) if newline == -1 else newline
+        if word == 'wordend':
+            match = re.compile(r'\w+|.', re.DOTALL).match(content, offset)
+            return match.end() if match else offset
+        start = offset
+        while start > 0 and (content[start - 1:start].isalnum() or content[start - 1:start] == '_'):
+            start -= 1
+        return start
+
+    def _format(self, offset):
+        if offset > len(self.content):
+            return f'{self.content.count(chr(10)) + 2}.0'
+        line = self.content.count('\n', 0, offset) + 1
+        return f'{line}.{offset - (self.content.rfind(chr(10), 0, offset) + 1)}'
+
+
+def fire(bindings, sequence, **fields):
+    # Call every callback bound to a sequence until one returns 'break'
+    event = SimpleNamespace(**{'keysym': '', 'x': 0, 'y': 0, **fields})
+    for function in bindings.get(sequence, ()):
+        if function(event) == 'break':
+            return 'break'
+    return None
+
+
+class FakeToplevel:
+    """ A Toplevel reduced to its window-manager state: 'normal', 'iconic' or 'withdrawn'. """
+    def __init__(self, master=None, **options):
+        self.wm_state = 'normal'
+        self.destroyed = False
+
+    @property
+    def shown(self):
+        return self.wm_state == 'normal'
+
+    def state(self):
+        return self.wm_state
+
+    def withdraw(self):
+        self.wm_state = 'withdrawn'
+
+    def iconify(self):
+        self.wm_state = 'iconic'
+
+    def deiconify(self):
+        self.wm_state = 'normal'
+
+    def destroy(self):
+        self.destroyed = True
+
+    def overrideredirect(self, flag):
+        pass
+
+    def geometry(self, spec):
+        pass
+
+    def title(self, text):
+        pass
+
+    def protocol(self, name, function):
+        pass
+
+    def lift(self):
+        pass
+
+
+class FakeListbox:
+    """ A Listbox holding its items and selection, with rows ten pixels high. """
+    def __init__(self, master=None, **options):
+        self.options = options
+        self.items = []
+        self.selection = set()
+        self.bindings = defaultdict(list)
+
+    def pack(self, **options):
+        pass
+
+    def bind(self, sequence, function, add=None):
+        self.bindings[sequence].append(function)
+
+    def config(self, **options):
+        self.options.update(options)
+
+    def insert(self, index, *items):
+        self.items.extend(items)
+
+    def delete(self, first, last=None):
+        self.items, self.selection = [], set()
+
+    def get(self, index):
+        return self.items[index]
+
+    def size(self):
+        return len(self.items)
+
+    def nearest(self, y):
+        return max(0, min(len(self.items) - 1, y // 10))
+
+    def see(self, index):
+        pass
+
+    def selection_set(self, index):
+        self.selection.add(index)
+
+    def selection_clear(self, first, last=None):
+        self.selection = set()
+
+    def curselection(self):
+        return tuple(sorted(self.selection))
+
+    def fire(self, sequence, **fields):
+        return fire(self.bindings, sequence, **fields)
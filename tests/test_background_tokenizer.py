@@ -0,0 +1,65 @@
+import threading
+
+from fakes import FakeText
+from src.editors.background_tokenizer import BackgroundTokenizer, iter_line_chunks
+
+
+class LineCounter:
+    # A tokenizer whose state is the number of lines lexed so far; `gate` holds it before its first line
+    def __init__(self, gate=None):
+        self.gate = gate
+        self.started = threading.Event()
+
+    def tokenize_line(self, line_text, state):
+        self.started.set()
+        if self.gate is not None:
+            self.gate.wait(5)
+        return [(0, len(line_text), line_text)], (state or 0) + 1
+
+
+def drain(tokenizer):
+    # Let the worker finish, then run the Tk polls until the results are applied
+    tokenizer._thread_pool.submit(lambda: None).result(timeout=5)
+    while tokenizer.text_widget.idle:
+        tokenizer.text_widget.run_idle(limit=1)
+
+
+def test_line_chunks_cover_the_text_without_splitting_it_at_once():
+    assert list(iter_line_chunks('a\nb\nc\nd\ne', 2)) == [['a', 'b'], ['c', 'd'], ['e']]
+    assert list(iter_line_chunks('a\nb\n', 2)) == [['a', 'b'], ['']]
+    assert list(iter_line_chunks('', 3)) == [['']]
+
+
+def test_chunks_arrive_in_order_with_their_start_states():
+    chunks = []
+    tokenizer = BackgroundTokenizer(FakeText(), LineCounter(), lambda *chunk: chunks.append(chunk), chunk_lines=2)
+    try:
+        tokenizer.submit('a\nb\nc\nd\ne', first_line=10, start_state=5)
+        drain(tokenizer)
+        assert [(first, [spans[0][2] for spans in line_spans], end_states, start)
+                for first, line_spans, end_states, start in chunks] == [
+            (10, ['a', 'b'], [6, 7], 5), (12, ['c', 'd'], [8, 9], 7), (14, ['e'], [10], 9)]
+        assert not tokenizer.active
+    finally:
+        tokenizer.shutdown()
+
+
+def test_results_of_a_superseded_snapshot_are_dropped():
+    gate = threading.Event()
+    lexer = LineCounter(gate)
+    chunks = []
+    tokenizer = BackgroundTokenizer(FakeText(), lexer, lambda *chunk: chunks.append(chunk), chunk_lines=1)
+    try:
+        first = tokenizer.submit('old\nold\nold')
+        lexer.started.wait(5)  # The old snapshot is being lexed
+        second = tokenizer.submit('new\nnew')
+        gate.set()
+        drain(tokenizer)
+        assert second == first + 1
+        assert [line_spans[0][0][2] for _, line_spans, _, _ in chunks] == ['new', 'new']
+        tokenizer.submit('cancelled')
+        tokenizer.cancel()
+        drain(tokenizer)
+        assert len(chunks) == 2 and not tokenizer.active
+    finally:
+        tokenizer.shutdown()
@@ -0,0 +1,51 @@
+import random
+
+from fakes import FakeText
+from src.editors.edit_tracker import EditTracker
+from src.managers.buffer_vocabulary import BufferVocabulary
+
+
+def ranked(vocabulary, prefix, k):
+    # Every prefix match ranked one by one
+    words = [word for word in vocabulary.counts if word.startswith(prefix) and word != prefix]
+    return sorted((vocabulary.score(word) for word in words), reverse=True)[:k]
+
+
+def test_frequent_words_win_beyond_max_candidates():
+    vocabulary = BufferVocabulary(max_candidates=5)
+    # 'aaa...' words sort first but occur once; 'azz' occurs most
+    vocabulary.update_document('note', ' '.join(['aaa', 'aab', 'aac', 'aad', 'aae', 'aaf'] + ['azz'] * 9 + ['ayy'] * 4))
+    assert vocabulary.suggest('a', 2) == ['azz', 'ayy']
+
+
+def test_bucket_walk_agrees_with_full_ranking():
+    rng = random.Random(18)
+    vocabulary = BufferVocabulary(max_candidates=3, half_life=5)
+    widget = FakeText()
+    vocabulary.attach(EditTracker.for_widget(widget))
+    words = [''.join(rng.choices('abc', k=rng.randint(3, 5))) for _ in range(80)]
+    for _ in range(300):
+        if widget.content and rng.random() < 0.3:
+            start = rng.randint(0, len(widget.content) - 1)
+            widget.delete(f'1.0+{start}c', f'1.0+{start + rng.randint(1, 12)}c')
+        else:
+            widget.insert('end', ' ' + ' '.join(rng.choices(words, k=rng.randint(1, 4))))
+        prefix = rng.choice(['a', 'b', 'ab', 'abc', 'c'])
+        k = rng.randint(1, 6)
+        assert [vocabulary.score(word) for word in vocabulary.suggest(prefix, k)][:len(ranked(vocabulary, prefix, k))] \
+            == ranked(vocabulary, prefix, k)
+    # Buckets hold exactly the counted words
+    assert {word: level for level, bucket in vocabulary._by_count.items() for word in bucket} == vocabulary.counts
+    assert vocabulary._levels == sorted(vocabulary._by_count)
+
+
+def test_recent_words_rank_above_equally_used_ones():
+    vocabulary = BufferVocabulary()
+    widget = FakeText('alpha alpine')
+    vocabulary.attach(EditTracker.for_widget(widget))
+    widget.insert('end', ' alpine')
+    vocabulary.update_document('note', 'alpha')
+    assert vocabulary.suggest('al', 2) == ['alpine', 'alpha']
+    widget.delete('1.0', 'end')
+    vocabulary.update_document('note', None)
+    assert vocabulary.counts == {} and vocabulary.suggest('al') == []
@@ -0,0 +1,35 @@
+from src.managers.completion_index import CompletionIndex
+
+TOP = '\U0010ffff'  # The highest code point
+
+
+def test_suggest_takes_the_sorted_run_of_the_prefix():
+    index = CompletionIndex(['heat', 'heap', 'he', 'help', 'hello', 'hz', 'apple'])
+    assert index.suggest('he') == ['he', 'heap', 'heat', 'hello', 'help']  # The prefix itself included
+    assert index.suggest('he', 2) == ['he', 'heap'] and index.suggest('he', 0) == []
+    assert index.suggest('') == sorted(index.words) and index.suggest('', 1) == ['apple']
+    assert index.suggest('hf') == [] and index.suggest('zzz') == [] and index.suggest('Heat') == []
+
+
+def test_count_prefix_agrees_with_a_scan():
+    words = ['a', 'ab', 'a' + TOP, 'a' + TOP + 'b', TOP, TOP + TOP, 'b', '']
+    index = CompletionIndex(words)
+    for prefix in ['', 'a', 'ab', 'a' + TOP, TOP, TOP + TOP, 'b', 'c', 'z' + TOP]:
+        assert index.count_prefix(prefix) == sum(word.startswith(prefix) for word in index.words), prefix
+
+
+def test_add_remove_and_update_keep_one_sorted_copy():
+    index = CompletionIndex(['b', 'b'])
+    assert len(index) == 1
+    assert index.add('a') and not index.add('a') and not index.add('')
+    assert index.remove('b') and not index.remove('b') and not index.remove('zz')
+    index.update(['c', '', 'a', 'd'])
+    assert index.words == ['a', 'c', 'd'] and 'c' in index and '' not in index
+
+
+def test_load_skips_comments_and_blank_lines(tmp_path):
+    path = tmp_path / 'words.txt'
+    path.write_text('# a comment\nheat\n\n  doc  \nheat\nwindow#1\r\n', encoding='utf-8')
+    index = CompletionIndex(['apple'])
+    assert index.load(str(path)) == 4
+    assert index.words == ['apple', 'doc', 'heat', 'window#1']
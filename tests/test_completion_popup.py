@@ -0,0 +1,69 @@
+import pytest
+
+from fakes import FakeListbox, FakeText, FakeToplevel
+from src.widgets import completion_popup
+from src.widgets.completion_popup import CompletionPopup
+
+
+class Words:
+    def __init__(self, *words):
+        self.words = words
+        self.lookups = []
+
+    def suggest(self, prefix, k):
+        self.lookups.append(prefix)
+        return [word for word in self.words if word.startswith(prefix) and word != prefix][:k]
+
+
+@pytest.fixture
+def popup(monkeypatch):
+    monkeypatch.setattr(completion_popup.tk, 'Toplevel', FakeToplevel)
+    monkeypatch.setattr(completion_popup.tk, 'Listbox', FakeListbox)
+    widget = FakeText('say ')
+    widget.mark_set('insert', 'end-1c')
+    return CompletionPopup(widget, Words('heat', 'heap', 'help'))
+
+
+def type_text(popup, text):
+    for character in text:
+        popup.text_widget.insert('insert', character)
+        popup.text_widget.fire('<KeyRelease>', keysym=character)
+
+
+def test_lookup_runs_once_typing_pauses(popup):
+    type_text(popup, 'hea')
+    assert len(popup.text_widget.idle) == 1  # Each key release replaced the pending lookup
+    popup.text_widget.run_idle()
+    assert popup.source.lookups == ['hea'] and popup.prefix == 'hea'
+    assert popup.listbox.items == ['heat', 'heap'] and popup.window.shown
+
+
+def test_lookup_overtaken_by_a_keystroke_is_dropped(popup):
+    type_text(popup, 'he')
+    _, lookup, args = popup.text_widget.idle[0]
+    type_text(popup, 'a')
+    lookup(*args)  # Ran although cancelled, as a callback already dispatched by Tk would
+    assert popup.source.lookups == [] and not popup.visible
+    popup.text_widget.fire('<KeyRelease>', keysym='Shift_L')  # Ignored keys leave the pending lookup alone
+    popup.text_widget.run_idle()
+    assert popup.source.lookups == ['hea']
+
+
+def test_click_selects_without_closing_and_accept_replaces_the_prefix(popup):
+    type_text(popup, 'hea')
+    popup.text_widget.run_idle()
+    assert popup.listbox.options['takefocus'] == 0
+    assert popup.listbox.fire('<Button-1>', y=15) == 'break'
+    assert popup.listbox.curselection() == (1,) and popup.visible
+    separators = popup.text_widget.separators
+    assert popup.accept() == 'break'
+    assert popup.text_widget.content == 'say heap' and not popup.visible
+    assert popup.text_widget.separators == separators + 2  # The completion is one undo step
+
+
+def test_accept_leaves_text_changed_under_the_list_alone(popup):
+    type_text(popup, 'hea')
+    popup.text_widget.run_idle()
+    popup.text_widget.insert('insert', ' ')
+    assert popup.accept() is None
+    assert popup.text_widget.content == 'say hea ' and not popup.visible
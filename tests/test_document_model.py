@@ -0,0 +1,60 @@
+from fakes import FakeText
+from src.managers.keyword_automaton import linked_keywords
+from src.managers.link_graph import shared_link_graph
+from src.widgets.document_model import DocumentModel
+from src.widgets.document_widget import DocumentWidget
+
+
+def test_model_links_its_keyword_while_open():
+    model = DocumentModel('heat up', 'notes on heating')
+    assert 'heat up' in linked_keywords.automaton and not model.visible
+    model.close()
+    assert 'heat up' not in linked_keywords.automaton
+
+
+def test_backlinks_come_from_the_shared_graph():
+    model = DocumentModel('doc window')
+    shared_link_graph.add_keyword('doc window')
+    shared_link_graph.update_document('other note', 'the doc window\nand a doc-window')
+    try:
+        assert model.backlinks() == [('other note', '1.4', '1.14'), ('other note', '2.6', '2.16')]
+    finally:
+        shared_link_graph.update_document('other note', None)
+        shared_link_graph.remove_keyword('doc window')
+        model.close()
+
+
+class View(FakeText):
+    # A fake Text carrying DocumentWidget's own methods, __str__ included, in place of a Tk widget
+    __str__ = DocumentWidget.__str__
+    id = DocumentWidget.id
+    linked_word = DocumentWidget.linked_word
+    highlight_keyword = DocumentWidget.highlight_keyword
+    highlight_pattern = DocumentWidget.highlight_pattern
+
+    def __init__(self, model, palette=None):
+        super().__init__(model.content)
+        self.model = model
+        self.palette = palette if palette else DocumentWidget._generate_default_palette(self)
+
+
+def test_view_highlights_linked_keywords():
+    model = DocumentModel('heat up', 'heat up, then heat up again')
+    try:
+        view = View(model)
+        assert str(view).startswith('DocumentWidget(')
+        view.highlight_keyword()
+        assert view.tagged('highlight') == ['heat up', 'heat up']
+    finally:
+        model.close()
+
+
+def test_view_highlights_patterns_in_itself():
+    # The view is the Text widget: highlight_pattern searches and tags its own content
+    model = DocumentModel('alpha', 'alpha beta alpha')
+    try:
+        view = View(model)
+        result = view.highlight_pattern('alpha', 'highlight')
+        assert len(result.indices) // 2 == 2 and view.tagged('highlight') == ['alpha', 'alpha']
+    finally:
+        model.close()
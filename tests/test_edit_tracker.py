@@ -0,0 +1,85 @@
+import pytest
+
+from fakes import FakeText
+from src.editors.edit_tracker import EditTracker
+
+
+def track(widget):
+    deltas = []
+    tracker = EditTracker.for_widget(widget)
+    tracker.add_listener(lambda delta: deltas.append((delta.op, delta.start, delta.end, delta.text)))
+    return tracker, deltas
+
+
+def test_for_widget_shares_one_tracker():
+    widget = FakeText('hello')
+    first, first_deltas = track(widget)
+    second, second_deltas = track(widget)
+    assert first is second
+    widget.insert('1.5', '!')
+    assert first_deltas == second_deltas == [('insert', (1, 5), (1, 5), '!')]
+
+
+def test_second_tracker_is_refused():
+    widget = FakeText('hello')
+    EditTracker.for_widget(widget)
+    with pytest.raises(ValueError):
+        EditTracker(widget)
+
+
+def test_deltas_of_insert_delete_and_replace():
+    widget = FakeText('one\ntwo')
+    tracker, deltas = track(widget)
+    widget.insert('end', '\nthree')
+    widget.delete('1.1', '2.1')
+    widget.replace('1.0', '1.2', 'X')
+    widget.delete('1.0', '1.0')  # Empty deletes publish nothing
+    assert widget.content == 'Xo\nthree'
+    assert deltas == [
+        ('insert', (2, 3), (2, 3), '\nthree'),
+        ('delete', (1, 1), (2, 1), 'ne\nt'),
+        ('delete', (1, 0), (1, 2), 'ow'),
+        ('insert', (1, 0), (1, 0), 'X'),
+    ]
+
+
+def test_paused_tracker_publishes_nothing():
+    widget = FakeText('abc')
+    tracker, deltas = track(widget)
+    tracker.pause()
+    widget.insert('1.0', 'x')
+    tracker.resume()
+    assert widget.content == 'xabc' and deltas == []
+
+
+def test_multi_range_delete_publishes_one_delta_per_range():
+    widget = FakeText('abcdef\nghij')
+    tracker, deltas = track(widget)
+    widget.delete('2.1', '2.3', '1.0', '1.2', '1.1', '1.3')  # The last two ranges overlap
+    assert widget.content == 'def\ngj'
+    assert deltas == [('delete', (2, 1), (2, 3), 'hi'), ('delete', (1, 0), (1, 3), 'abc')]
+
+
+def test_disabled_widget_publishes_nothing():
+    widget = FakeText('abc')
+    tracker, deltas = track(widget)
+    widget.config(state='disabled')
+    widget.insert('1.0', 'x')
+    widget.delete('1.0', '1.2')
+    assert widget.content == 'abc' and deltas == []
+    widget.config(state='normal')
+    widget.insert('1.0', 'x')
+    assert deltas == [('insert', (1, 0), (1, 0), 'x')]
+
+
+class Named(FakeText):
+    # Like DocumentWidget: a __str__ that is not the Tcl path name
+    def __str__(self):
+        return 'Named(view)'
+
+
+def test_tracker_renames_the_tcl_command_not_str():
+    widget = Named('abc')
+    tracker, deltas = track(widget)
+    widget.insert('1.0', 'x')
+    assert deltas == [('insert', (1, 0), (1, 0), 'x')]
@@ -0,0 +1,97 @@
+import sqlite3
+import time
+
+import pytest
+
+from src.managers import flare_store, trigram_index
+from src.managers.buffer_vocabulary import shared_vocabulary
+from src.managers.flare_store import FlareStore
+from src.managers.link_graph import shared_link_graph
+from src.managers.trigram_index import TrigramIndex
+from src.widgets.document_model import DocumentModel
+
+
+@pytest.fixture
+def store(tmp_path):
+    # A writer that only writes when flushed or closed, so queued saves stay queued
+    store = FlareStore(str(tmp_path / 'notes.sqlite3'), flush_interval=60, batch_size=10000)
+    yield store
+    store.close()
+
+
+def test_reads_see_queued_saves_and_deletes(store):
+    store.import_notes([('alpha', 'first'), ('beta', 'second', [('bold', '1.0', '1.5')])])
+    store.save('alpha', 'changed')
+    store.save('gamma', 'queued only')
+    store.delete('beta')
+    assert store.load('alpha') == ('changed', [])
+    assert store.load('beta') is None
+    assert store.keywords() == ['alpha', 'gamma']
+    assert sorted(store.notes()) == [('alpha', 'changed'), ('gamma', 'queued only')]
+    assert store.flush(timeout=10)
+    assert sorted(store.notes()) == [('alpha', 'changed'), ('gamma', 'queued only')]
+
+
+def test_spans_round_trip_through_the_database(store):
+    store.save('alpha', 'bold text', [('bold', '1.0', '1.4')])
+    store.flush(timeout=10)
+    reopened = FlareStore(store.db_path)
+    try:
+        assert reopened.load('alpha') == ('bold text', [('bold', '1.0', '1.4')])
+        assert reopened.load('missing') is None
+    finally:
+        reopened.close()
+
+
+def test_document_model_saves_through_the_default_store(store, tmp_path, monkeypatch):
+    index = TrigramIndex(str(tmp_path / 'index.sqlite3'))
+    monkeypatch.setattr(flare_store, '_default_store', store)
+    monkeypatch.setattr(trigram_index, '_default_index', index)
+    model = DocumentModel('heat up')
+    try:
+        model.set_content('the heat up note')
+        assert store.load('heat up') == ('the heat up note', [])
+        reopened = DocumentModel('heat up')
+        assert reopened.content == ''  # Read only when shown
+        reopened.close()
+    finally:
+        model.close()
+        shared_vocabulary.update_document('heat up', None)
+        shared_link_graph.update_document('heat up', None)
+        index.close()
+
+
+def test_failed_write_waits_for_flush_which_raises(tmp_path):
+    store = FlareStore(str(tmp_path / 'notes.sqlite3'), flush_interval=0.01)
+    attempts = []
+
+    def failing(connection, batch):
+        attempts.append(dict(batch))
+        raise sqlite3.OperationalError('database is locked')
+
+    store._write = failing
+    store.save('alpha', 'kept')
+    time.sleep(0.3)
+    assert len(attempts) == 1  # No retry on the writer's own timer
+    with pytest.raises(sqlite3.OperationalError):
+        store.flush(timeout=10)
+    assert len(attempts) == 2 and store.load('alpha') == ('kept', [])
+    with pytest.raises(sqlite3.OperationalError):
+        store.import_notes([('beta', 'imported')])
+    del store._write
+    assert store.flush(timeout=10) and store.error is None
+    assert store.close(timeout=10)
+    reopened = FlareStore(store.db_path)
+    try:
+        assert reopened.load('alpha') == ('kept', [])
+    finally:
+        reopened.close()
+
+
+def test_close_gives_up_on_a_failing_database(tmp_path):
+    store = FlareStore(str(tmp_path / 'notes.sqlite3'), flush_interval=60, batch_size=10000)
+    store._write = lambda connection, batch: (_ for _ in ()).throw(sqlite3.OperationalError('disk I/O error'))
+    store.save('alpha', 'lost')
+    with pytest.raises(sqlite3.OperationalError):
+        store.close(timeout=10)
+    assert not store._writer.is_alive()
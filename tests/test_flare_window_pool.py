@@ -0,0 +1,78 @@
+import pytest
+
+from fakes import FakeText, FakeToplevel
+from src.widgets import flare_window_pool
+from src.widgets.flare_window_pool import FlareWindowPool
+
+
+class WindowText(FakeText):
+    # The text area of a pooled window: a FakeText that accepts Text's constructor and geometry calls
+    def __init__(self, master=None, **options):
+        super().__init__()
+
+    def pack(self, **options):
+        pass
+
+    def yview(self, *args):
+        pass
+
+
+class Scrollbar:
+    def __init__(self, master=None, **options):
+        pass
+
+    def pack(self, **options):
+        pass
+
+    def set(self, *args):
+        pass
+
+
+class Store:
+    def __init__(self, **notes):
+        self.notes = {keyword: (content, []) for keyword, content in notes.items()}
+
+    def load(self, keyword):
+        return self.notes.get(keyword)
+
+    def save(self, keyword, content, spans=()):
+        self.notes[keyword] = (content, list(spans))
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(flare_window_pool, 'Toplevel', FakeToplevel)
+    monkeypatch.setattr(flare_window_pool, 'Text', WindowText)
+    monkeypatch.setattr(flare_window_pool, 'Scrollbar', Scrollbar)
+    return FlareWindowPool(None, max_windows=2, max_idle=1, store=Store(a='note a', b='note b', c='note c'))
+
+
+def test_hidden_window_is_reused_for_the_next_note(pool):
+    a = pool.open('a')
+    window = a.window
+    a.hide()
+    assert not a.visible and not window.toplevel.shown
+    b = pool.open('b')
+    assert b.window is window and window.text.content == 'note b' and pool.window_count() == 1
+    assert pool.store.notes['a'] == ('note a', [])  # Unedited: nothing saved
+
+
+def test_minimized_note_gives_up_its_window_after_saving(pool):
+    a, b = pool.open('a'), pool.open('b')
+    window = a.window
+    window.text.insert('end', ', edited')
+    window.toplevel.iconify()
+    c = pool.open('c')
+    assert c.window is window and not a.visible and b.visible
+    assert pool.store.notes['a'] == ('note a, edited', []) and a.get_content() == 'note a, edited'
+    assert pool.window_count() == 2
+
+
+def test_notes_on_screen_are_never_taken_and_the_pool_shrinks_back(pool):
+    a, b = pool.open('a'), pool.open('b')
+    c = pool.open('c')  # Both windows are on screen: one over the limit
+    assert a.visible and b.visible and c.visible and pool.window_count() == 3
+    c.hide()
+    assert pool.window_count() == 2
+    b.hide()
+    assert pool.window_count() == 2 and len(pool._idle) == 1
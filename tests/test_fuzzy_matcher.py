@@ -0,0 +1,41 @@
+import random
+
+from src.managers.fuzzy_matcher import FuzzyMatcher, initials, score
+
+SUBWORDS = ['get', 'user', 'name', 'handler', 'result', 'line', 'offset', 'load', 'node', 'id']
+
+
+def brute_force(words, query, k):
+    scores = (score(query.lower(), word) for word in words)
+    return sorted((value for value in scores if value is not None), reverse=True)[:k]
+
+
+def test_exact_words_outrank_longer_ones():
+    assert score('hndlr', 'handler') > score('hndlr', 'handlerResult')
+    assert score('gun', 'getUserName') > score('gun', 'getUserNameResult')
+    assert score('xyz', 'handler') is None
+    assert initials('get_user-Name2') == 'gun2'
+
+
+def test_matches_agree_with_brute_force_when_scored_in_full():
+    rng = random.Random(20)
+    words = set()
+    while len(words) < 150:
+        parts = rng.choices(SUBWORDS, k=rng.randint(1, 3))
+        words.add(parts[0] + ''.join(part.capitalize() for part in parts[1:]) if rng.random() < 0.5 else '_'.join(parts))
+    matcher = FuzzyMatcher(sorted(words))
+    for _ in range(200):
+        word = rng.choice(sorted(words))
+        query = ''.join(char for char in word if rng.random() < 0.4)[:6] or word[:2]
+        if len(query) < matcher.min_query:
+            continue  # Left to prefix completion
+        k = rng.randint(1, 8)
+        assert [value for value, _ in matcher.match(query, k)] == brute_force(words, query, k)
+
+
+def test_removed_words_are_not_suggested():
+    matcher = FuzzyMatcher(['handler', 'handlerResult'])
+    matcher.remove('handler')
+    assert [word for _, word in matcher.match('hndlr')] == ['handlerResult']
+    matcher.add('handler')
+    assert [word for _, word in matcher.match('hndlr')] == ['handler', 'handlerResult']
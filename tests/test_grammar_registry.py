@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from src.editors.grammar_registry import Grammar, GrammarRegistry, grammar_registry
+
+
+@pytest.fixture
+def grammar_dir(tmp_path):
+    (tmp_path / 'index.json').write_text(json.dumps({
+        'toy': {'file': 'toy.json', 'extensions': ['.toy', '.TY']},
+        'absent': {'file': 'absent.json', 'extensions': ['.abs']},  # Never loaded, so never missed
+    }))
+    (tmp_path / 'toy.json').write_text(json.dumps({
+        'name': 'toy',
+        'flags': ['IGNORECASE'],
+        'rules': [{'tag': 'keyword', 'regex': r'\bdef\b', 'style': {'foreground': 'accent'}}],
+        'multiline_rules': [{'tag': 'comment', 'open': '/\\*', 'close': '\\*/', 'style': {'font_style': 'italic'}}],
+    }))
+    return tmp_path
+
+
+def test_grammars_are_read_only_when_first_needed(grammar_dir):
+    registry = GrammarRegistry(str(grammar_dir))
+    assert registry.names() == ['absent', 'toy']
+    assert registry.name_for_path('src/thing.TOY') == 'toy' and registry.name_for_path('a.ty') == 'toy'
+    assert registry._grammars == {}
+    tokenizer = registry.tokenizer('toy')
+    assert registry.tokenizer('toy') is tokenizer  # Compiled once
+    assert tokenizer.tokenize_line('DEF f /* open') == ([(0, 3, 'keyword'), (6, 13, 'comment')], 0)
+    assert list(registry._grammars) == ['toy']
+
+
+def test_unknown_languages(grammar_dir):
+    registry = GrammarRegistry(str(grammar_dir))
+    assert registry.name_for_path('notes.txt') is None and registry.name_for_path('Makefile') is None
+    with pytest.raises(KeyError):
+        registry.grammar('cobol')
+    with pytest.raises(FileNotFoundError):
+        registry.grammar('absent')
+
+
+def test_registered_grammar_replaces_the_compiled_one(grammar_dir):
+    registry = GrammarRegistry(str(grammar_dir))
+    before = registry.tokenizer('toy')
+    registry.register(Grammar('toy', [('number', r'\d+')]), ['.num'])
+    assert registry.tokenizer('toy') is not before and registry.name_for_path('x.num') == 'toy'
+    assert registry.tokenizer('toy').tokenize_line('def 42') == ([(4, 6, 'number')], None)
+
+
+def test_styles_resolve_against_the_palette(grammar_dir):
+    rules = GrammarRegistry(str(grammar_dir)).grammar('toy').syntax_rules({'accent': '#fedfa4'})
+    assert rules == {'keyword': {'regex': r'\bdef\b', 'style': {'foreground': '#fedfa4'}},
+                     'comment': {'regex': '/\\*', 'style': {'font_style': 'italic'}}}
+
+
+def test_shipped_grammars_load_and_compile():
+    for name in grammar_registry.names():
+        assert grammar_registry.grammar(name).name == name
+        grammar_registry.tokenizer(name).tokenize_line('x = 1  # "text"')
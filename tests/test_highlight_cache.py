@@ -0,0 +1,49 @@
+import json
+import os
+import zlib
+
+import pytest
+
+from src.editors.highlight_cache import HighlightCache, content_key
+
+SPANS = {'keyword': [(1, 0, 1, 3), (4, 2, 6, 0)], 'comment': []}
+STATES = [None, 0, None, 2]
+
+
+def test_entries_round_trip_and_a_hit_refreshes_the_entry(tmp_path):
+    cache = HighlightCache(str(tmp_path))
+    key = content_key('def f():\n    pass', 'rules', 'palette')
+    assert cache.load(key) is None
+    cache.store(key, SPANS, STATES)
+    os.utime(cache._path(key), (1, 1))
+    assert cache.load(key) == (SPANS, STATES)
+    assert os.stat(cache._path(key)).st_mtime > 1
+    assert content_key('def f():\n    pass', 'rules', 'other palette') != key
+
+
+@pytest.mark.parametrize('data', [
+    b'not zlib at all',
+    zlib.compress(b'no header line'),
+    zlib.compress(b'{"format": 1}\n'),  # Header without tags: KeyError
+    zlib.compress(b'[1, 2]\n'),  # Header that is not an object
+    zlib.compress(json.dumps({'format': 1, 'byteorder': 'little', 'tags': [['keyword', 8]], 'states': 0}).encode()
+                  + b'\n' + b'\0' * 12),  # Arrays shorter than the header says
+    zlib.compress(json.dumps({'format': 0}).encode() + b'\n'),
+])
+def test_a_corrupt_entry_is_a_miss_and_is_deleted(tmp_path, data):
+    cache = HighlightCache(str(tmp_path))
+    path = cache._path('key')
+    with open(path, 'wb') as file:
+        file.write(data)
+    assert cache.load('key') is None
+    assert not os.path.exists(path)
+
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path):
+    cache = HighlightCache(str(tmp_path))
+    cache.store('old', SPANS, STATES)
+    cache.store('new', SPANS, STATES)
+    os.utime(cache._path('old'), (1, 1))
+    cache.max_bytes = os.path.getsize(cache._path('new'))
+    cache.store('newest', {}, [])
+    assert cache.load('old') is None and cache.load('newest') == ({}, [])
@@ -0,0 +1,79 @@
+import pytest
+
+from fakes import FakeText
+from src.editors import highlight_scheduler
+from src.editors.highlight_scheduler import HighlightScheduler
+
+
+class Viewport(FakeText):
+    # A FakeText showing `height` lines from `top`, ten pixels per line
+    def __init__(self, text, top, height):
+        super().__init__(text)
+        self.top = top
+        self.height = height
+
+    def index(self, index):
+        if str(index).startswith('@'):
+            return f'{self.top + int(index.split(",")[1]) // 10}.0'
+        return super().index(index)
+
+    def winfo_height(self):
+        return self.height * 10
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # A perf_counter that only advances while lines are highlighted, a second per line, so budgets add up exactly
+    now = [0.0]
+    monkeypatch.setattr(highlight_scheduler.time, 'perf_counter', lambda: now[0])
+    return now
+
+
+def scheduler_for(widget, clock, calls):
+    def highlight_lines(first, last):
+        calls.append((first, last))
+        clock[0] += last - first + 1
+
+    scheduler = HighlightScheduler(widget, highlight_lines, budget_ms=20000)
+    scheduler._lines_per_second = 1.0  # The fake clock's real throughput, so chunks fit the budget exactly
+    return scheduler
+
+
+def test_viewport_first_then_outward_within_the_budget(clock):
+    widget = Viewport('\n' * 99, top=41, height=9)
+    calls, ticks = [], []
+    scheduler = scheduler_for(widget, clock, calls)
+    scheduler.on_idle = lambda: ticks.append('idle')
+    scheduler.schedule(1, 100)
+    while widget.idle:
+        widget.run_idle(limit=1)
+        ticks.append(len(calls))
+    assert calls == [(41, 60), (21, 40), (61, 80), (1, 20), (81, 100)]
+    assert ticks == [1, 2, 3, 4, 'idle', 5]  # One budget's worth per tick
+    assert scheduler.is_idle()
+
+
+def test_each_tick_rereads_the_viewport(clock):
+    widget = Viewport('\n' * 99, top=1, height=9)
+    calls = []
+    scheduler = scheduler_for(widget, clock, calls)
+    scheduler.schedule(1, 100)
+    widget.run_idle(limit=1)
+    widget.top = 90  # Scrolled down
+    widget.run_idle(limit=1)
+    assert calls[0] == (1, 20) and calls[1][0] == 90
+
+
+def test_pending_ranges_follow_edits_and_cancel_drops_them():
+    widget = Viewport('', top=1, height=9)
+    scheduler = HighlightScheduler(widget, lambda first, last: None)
+    scheduler.schedule(10, 20)
+    scheduler.schedule(21, 25)  # Adjacent: merged
+    scheduler.schedule(30, 29)  # Empty: ignored
+    assert scheduler.pending == [[10, 25]] and len(widget.idle) == 1
+    scheduler.shift_lines(5, 0, 3)
+    assert scheduler.pending == [[13, 28]]
+    scheduler.shift_lines(14, 20, 0)  # Lines 15..34 merged into 14
+    assert scheduler.pending == [[13, 14]]
+    scheduler.cancel()
+    assert scheduler.is_idle() and widget.idle == []
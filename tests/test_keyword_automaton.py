@@ -0,0 +1,67 @@
+import random
+
+from src.managers.keyword_automaton import WORD, KeywordAutomaton, LinkedKeywords
+
+
+def brute_force(keywords, text, nocase=False):
+    # Every run of consecutive words equal to a keyword's words
+    fold = str.lower if nocase else str
+    tokens = list(WORD.finditer(text))
+    words = [fold(token.group()) for token in tokens]
+    found = set()
+    for keyword in keywords:
+        target = WORD.findall(fold(keyword))
+        for i in range(len(words) - len(target) + 1):
+            if target and words[i:i + len(target)] == target:
+                found.add((tokens[i].start(), tokens[i + len(target) - 1].end(), keyword))
+    return found
+
+
+def test_finds_overlapping_keywords_across_separators():
+    automaton = KeywordAutomaton()
+    automaton.update(['heat up', 'up', 'heat up doc', 'doc window'])
+    matches = list(automaton.finditer('heat-up doc window'))
+    assert set(matches) == {(0, 7, 'heat up'), (5, 7, 'up'), (0, 11, 'heat up doc'), (8, 18, 'doc window')}
+    assert [end for _, end, _ in matches] == sorted(end for _, end, _ in matches)
+
+
+def test_agrees_with_brute_force():
+    rng = random.Random(15)
+    vocabulary = ['a', 'b', 'ab', 'heat', 'up', 'Doc']
+    for _ in range(200):
+        nocase = rng.random() < 0.5
+        keywords = {' '.join(rng.choices(vocabulary, k=rng.randint(1, 3))) for _ in range(rng.randint(1, 6))}
+        automaton = KeywordAutomaton(nocase)
+        automaton.update(keywords)
+        for keyword in rng.sample(sorted(keywords), rng.randint(0, len(keywords) - 1)):
+            automaton.remove(keyword)
+            keywords.discard(keyword)
+        text = ' '.join(rng.choices(vocabulary + ['doc', '-', 'x'], k=rng.randint(0, 30)))
+        # Keywords equal after normalization are stored once, under the first spelling added
+        stored = {automaton.normalize(keyword): keyword for keyword in sorted(keywords, reverse=True)}
+        assert set(automaton.finditer(text)) == brute_force(stored.values(), text, nocase)
+
+
+def test_removal_reuses_pruned_nodes():
+    automaton = KeywordAutomaton()
+    automaton.update(['alpha beta gamma', 'alpha'])
+    size = len(automaton._goto)
+    for i in range(100):
+        automaton.add(f'keyword {i} here')
+        automaton.remove(f'keyword {i} here')
+    assert len(automaton._goto) <= size + 3
+    assert list(automaton.finditer('alpha beta gamma')) == [(0, 5, 'alpha'), (0, 16, 'alpha beta gamma')]
+    assert list(automaton.finditer('keyword 99 here')) == []
+
+
+def test_registrations_count_per_normalized_keyword():
+    linked = LinkedKeywords()
+    linked.register('heat up')
+    linked.register('heat-up')
+    linked.unregister('heat up')
+    assert 'heat-up' in linked.automaton  # Still linked by the second widget
+    linked.unregister('heat-up')
+    assert len(linked.automaton) == 0
+    linked.register('--')  # No word to match
+    linked.unregister('--')
+    assert linked._counts == {}
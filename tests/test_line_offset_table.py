@@ -0,0 +1,46 @@
+import random
+
+from fakes import FakeText
+from src.editors.edit_tracker import EditTracker
+from src.editors.line_offset_table import LineOffsetTable
+
+
+def test_conversions_round_trip():
+    text = 'one\n\ntwo lines\nend'
+    table = LineOffsetTable(text)
+    assert table.line_starts == [0, 4, 5, 15] and table.line_count() == 4
+    for offset in range(len(text) + 1):
+        line = text.count('\n', 0, offset) + 1
+        col = offset - (text.rfind('\n', 0, offset) + 1)
+        assert table.offset_to_position(offset) == (line, col)
+        assert table.index_to_offset(f'{line}.{col}') == offset
+    assert table.offsets_to_indices(list(range(len(text) + 1))) == [
+        table.offset_to_index(offset) for offset in range(len(text) + 1)]
+
+
+def test_origin_shifts_the_first_line_only():
+    table = LineOffsetTable('ab\ncd', origin=(3, 5))
+    assert table.offsets_to_indices([0, 1, 3, 4]) == ['3.5', '3.6', '4.0', '4.1']
+    assert table.index_to_offset('3.6') == 1 and table.index_to_offset((4, 1)) == 4
+
+
+def test_attached_table_follows_edits():
+    rng = random.Random(4)
+    widget = FakeText('first\nsecond\nthird')
+    table = LineOffsetTable.attach(EditTracker.for_widget(widget), widget.content)
+    for _ in range(500):
+        length = len(widget.content)
+        if length and rng.random() < 0.4:
+            start = rng.randint(0, length - 1)
+            widget.delete(f'1.0+{start}c', f'1.0+{start + rng.randint(1, 5)}c')
+        else:
+            # Mostly typing at one place, which only bumps the pending shift
+            at = rng.randint(0, length) if rng.random() < 0.3 else min(widget.marks['insert'], length)
+            text = rng.choice(['x', 'yz', '\n', 'a\nb'])
+            widget.insert(f'1.0+{at}c', text)
+            widget.mark_set('insert', f'1.0+{at + len(text)}c')
+        offset = rng.randint(0, len(widget.content))
+        assert table.offset_to_index(offset) == widget.index(f'1.0+{offset}c')
+        assert table.index_to_offset(widget.index(f'1.0+{offset}c')) == offset
+    table._flush()  # Apply the deferred shift before comparing the raw list
+    assert table.line_starts == LineOffsetTable(widget.content).line_starts
@@ -0,0 +1,89 @@
+import threading
+
+from fakes import FakeText
+from src.editors.edit_tracker import EditTracker
+from src.managers.link_graph import LinkGraph, line_references
+
+
+def notes(count):
+    return [(f'note {i}', f'see heat up\nand doc window {i}' if i % 3 else 'nothing here') for i in range(count)]
+
+
+def test_line_references_skip_self_mentions_and_line_breaks():
+    graph = LinkGraph(workers=1)
+    graph.add_keywords(['heat up', 'doc window'])
+    assert line_references(graph._automaton, 'heat up doc\nwindow heat up', key='heat up') == [None, None]
+    assert line_references(graph._automaton, 'a doc window', key='heat up') == [((2, 12, 'doc window'),)]
+
+
+def test_buffer_edits_update_backlinks_and_orphans():
+    graph = LinkGraph(workers=1)
+    graph.add_keywords(['heat up', 'doc window'])
+    widget = FakeText('heat up here')
+    graph.attach(EditTracker.for_widget(widget), 'buffer')
+    assert graph.what_links_here('heat up') == [('buffer', '1.0', '1.7')]
+    assert graph.orphans() == ['doc window']
+    widget.insert('1.end', '\nthe doc window')
+    widget.delete('1.0', '1.5')
+    assert graph.what_links_here('heat up') == []
+    assert graph.links_from('buffer') == [('2.4', '2.14', 'doc window')]
+    assert graph.orphans() == ['heat up']
+    graph.remove_keyword('doc window')
+    assert graph.links_from('buffer') == [] and graph.orphans() == ['heat up']
+
+
+def test_corpus_is_read_by_the_first_query_only():
+    reads = []
+
+    def corpus():
+        reads.append(1)
+        return iter(notes(10))
+
+    graph = LinkGraph(workers=1)
+    graph.add_keywords(['heat up'])
+    graph.set_corpus(corpus)
+    assert reads == []
+    graph.orphans()
+    graph.close()  # Waits for the background scan the query started
+    assert len(graph.linking_documents('heat up')) == 6
+    assert reads == [1]
+
+
+def test_first_query_answers_from_the_index_while_the_corpus_is_scanned():
+    release = threading.Event()
+
+    def corpus():
+        release.wait(5)
+        yield 'old note', 'heat up'
+        yield 'edited note', 'heat up'
+
+    graph = LinkGraph(workers=1)
+    graph.add_keywords(['heat up'])
+    graph.update_document('buffer', 'heat up')
+    graph.set_corpus(corpus)
+    assert graph.linking_documents('heat up') == {'buffer': 1}  # Without waiting for the corpus
+    graph.update_document('edited note', 'nothing now')  # Newer than the text the scan will read
+    release.set()
+    graph.close()
+    assert graph.linking_documents('heat up') == {'buffer': 1, 'old note': 1}
+
+
+def test_process_build_matches_scanning_here_and_reads_a_window_ahead():
+    consumed = []
+
+    def documents():
+        for document in notes(200):
+            consumed.append(document[0])
+            yield document
+
+    here = LinkGraph(workers=1)
+    pooled = LinkGraph(workers=2, chunk_size=8)
+    seen_at_first_result = []
+    for graph in (here, pooled):
+        graph.add_keywords(['heat up', 'doc window'])
+    here.build(notes(200))
+    pooled.build(documents(), batch_size=1, progress=lambda done: seen_at_first_result.append(len(consumed)))
+    assert pooled.what_links_here('doc window') == here.what_links_here('doc window')
+    assert pooled.linking_documents('heat up') == here.linking_documents('heat up')
+    # Two workers keep at most four chunks of eight in flight
+    assert seen_at_first_result[0] <= 4 * 8
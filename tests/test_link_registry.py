@@ -0,0 +1,67 @@
+import random
+
+from fakes import FakeText
+from src.editors.edit_tracker import EditTracker
+from src.managers.link_registry import LinkRegistry
+
+
+def covered(registry):
+    # Offsets of the characters the registry considers linked
+    offsets = set()
+    for start, end, _ in registry.links():
+        offsets.update(range(registry.table.index_to_offset(start), registry.table.index_to_offset(end)))
+    return offsets
+
+
+def test_links_resolve_and_replace_overlaps():
+    widget = FakeText('heat up the doc\nwindow')
+    registry = LinkRegistry(widget, EditTracker.for_widget(widget))
+    registry.add_many([('1.0', '1.7', 'heat up'), ('1.12', '1.15', 'doc'), ('2.0', '2.6', 'window')])
+    assert registry.keyword_at('1.3') == 'heat up' and registry.keyword_at('1.8') is None
+    registry.add('1.5', '1.14', 'up the do')  # Overlaps two links, which it replaces
+    assert registry.links() == [('1.5', '1.14', 'up the do'), ('2.0', '2.6', 'window')]
+    assert widget.tagged('link') == ['up the do', 'window']
+    assert registry.remove('window') == 1 and widget.tagged('link') == ['up the do']
+
+
+def test_links_follow_edits_like_the_tag():
+    widget = FakeText('see heat up here')
+    registry = LinkRegistry(widget, EditTracker.for_widget(widget))
+    registry.add('1.4', '1.11', 'heat up')
+    widget.insert('1.0', '>> ')
+    widget.insert('1.10', '-')  # Inside the link: extends it
+    widget.insert('1.15', '!')  # At its end: does not
+    assert registry.range_at('1.8') == ('1.7', '1.15', 'heat up')
+    widget.delete('1.5', '1.9')  # Clips its start
+    assert registry.links() == [('1.5', '1.11', 'heat up')] and widget.tagged('link') == ['a-t up']
+    widget.delete('1.0', '1.end')
+    assert registry.links() == [] and len(registry) == 0
+
+
+def test_text_typed_between_adjacent_links_joins_the_first():
+    widget = FakeText('abcd')
+    registry = LinkRegistry(widget, EditTracker.for_widget(widget))
+    registry.add_many([('1.0', '1.2', 'x'), ('1.2', 'end', 'y')])  # 'end' is the end of the text
+    widget.insert('1.2', 'Z')
+    assert registry.links() == [('1.0', '1.3', 'x'), ('1.3', '1.5', 'y')]
+    assert covered(registry) == widget.tags['link']
+
+
+def test_random_edits_keep_registry_and_tag_in_step():
+    rng = random.Random(21)
+    widget = FakeText('\n'.join(' '.join(rng.choices(['heat', 'up', 'doc', 'x'], k=8)) for _ in range(6)))
+    registry = LinkRegistry(widget, EditTracker.for_widget(widget))
+    for _ in range(300):
+        length = len(widget.content)
+        roll = rng.random()
+        if roll < 0.3 and length:
+            start = rng.randint(0, length - 1)
+            registry.add(f'1.0+{start}c', f'1.0+{start + rng.randint(1, 6)}c', rng.choice('ab'))
+        elif roll < 0.65:
+            widget.insert(f'1.0+{rng.randint(0, length)}c', rng.choice(['z', 'zz', '\n', 'z\nz']))
+        elif length:
+            start = rng.randint(0, length - 1)
+            widget.delete(f'1.0+{start}c', f'1.0+{start + rng.randint(1, 4)}c')
+        if rng.random() < 0.2:
+            assert covered(registry) == widget.tags['link']
+    assert covered(registry) == widget.tags['link']
@@ -0,0 +1,79 @@
+import re
+import sqlite3
+import threading
+
+from src.managers.project_search_manager import ProjectSearchManager, search_file
+
+
+def collect(search):
+    # Every hit of a search, in arrival order, once its closing None came
+    hits = []
+    for batch in iter(lambda: search.results.get(timeout=10), None):
+        hits.extend(batch)
+    return hits
+
+
+def test_search_file_reports_lines_and_columns(tmp_path):
+    path = tmp_path / 'notes.txt'
+    path.write_bytes('first line\r\nsecond Heat up, heat up\nheat'.encode('utf-8'))
+    hits = search_file(str(path), re.compile(b'(?i)heat'), threading.Event())
+    assert [(hit.line, hit.column, hit.length, hit.text) for hit in hits] == [
+        (2, 7, 4, 'second Heat up, heat up'), (2, 16, 4, 'second Heat up, heat up'), (3, 0, 4, 'heat')]
+    assert len(search_file(str(path), re.compile(b'heat'), threading.Event(), max_hits=1)) == 1
+    cancelled = threading.Event()
+    cancelled.set()
+    assert search_file(str(path), re.compile(b'heat'), cancelled) == []
+
+
+def test_binary_empty_and_missing_files_have_no_hits(tmp_path):
+    (tmp_path / 'binary.bin').write_bytes(b'heat\0up')
+    (tmp_path / 'empty.txt').write_bytes(b'')
+    for name in ('binary.bin', 'empty.txt', 'missing.txt'):
+        assert search_file(str(tmp_path / name), re.compile(b'heat'), threading.Event()) == []
+
+
+def test_search_stops_at_the_hit_cap(tmp_path):
+    for i in range(20):
+        (tmp_path / f'{i:02}.txt').write_text('heat up\n' * 5)
+    (tmp_path / '.git').mkdir()
+    (tmp_path / '.git' / 'skipped.txt').write_text('heat up')
+    manager = ProjectSearchManager(str(tmp_path), max_workers=4, max_hits=12)
+    try:
+        search = manager.search('HEAT', nocase=True)
+        hits = collect(search)
+        assert len(hits) == search.hit_count == 12 and search.capped and search.cancelled
+        manager.max_hits = 1000
+        full = manager.search('heat')
+        assert len(collect(full)) == 100 and not full.capped
+        assert all('.git' not in hit.path for hit in collect(manager.search('heat up')))
+    finally:
+        manager.shutdown()
+
+
+def test_a_new_search_cancels_the_previous_one(tmp_path):
+    for i in range(50):
+        (tmp_path / f'{i:02}.txt').write_text('heat up\n' * 100)
+    manager = ProjectSearchManager(str(tmp_path), max_workers=2)
+    try:
+        first = manager.search('heat')
+        second = manager.search('up')
+        assert first.cancelled and not second.cancelled
+        collect(first)
+        assert len(collect(second)) == 5000 and second.elapsed is not None
+    finally:
+        manager.shutdown()
+
+
+class BrokenIndex:
+    def candidates(self, query, regexp=False):
+        raise sqlite3.OperationalError('database is locked')
+
+
+def test_search_ends_with_none_even_when_the_index_fails(tmp_path):
+    (tmp_path / 'a.txt').write_text('heat up')
+    manager = ProjectSearchManager(str(tmp_path), index=BrokenIndex())
+    try:
+        search = manager.search('heat')
+        assert collect(search) == [] and search.elapsed is not None
+    finally:
+        manager.shutdown()
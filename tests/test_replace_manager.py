@@ -0,0 +1,68 @@
+import re
+
+import pytest
+
+from fakes import FakeText
+from src.editors.edit_tracker import EditTracker
+from src.managers.replace_manager import ReplaceManager, coalesce, plan_replacements
+
+PATTERN = re.compile(r'(?P<word>[a-z]+)(\d)?')
+CONTENT = 'abc1 de {x} f9\ng h2'
+TEMPLATES = [
+    'plain', r'x\&y', r'\1', r'\2', r'<\g<word>|\g<2>|\g<0>>', r'{\1}', r'}{', r'\n\t\\', r'\{\}',
+    r'\.\-\ ', '\\\n', r'\0', r'\101\1', r'\a\b\f\r\v', r'\10', r'\g<1>0',
+    # Invalid: unknown letter escape, missing group, unknown group name, trailing backslash
+    r'\q', r'\3', r'\g<missing>', 'x\\',
+]
+
+
+def applied(content, replacements):
+    pieces, position = [], 0
+    for start, end, text in replacements:
+        pieces.append(content[position:start])
+        pieces.append(text)
+        position = end
+    pieces.append(content[position:])
+    return ''.join(pieces)
+
+
+@pytest.mark.parametrize('template', TEMPLATES)
+def test_plan_agrees_with_re_sub(template):
+    try:
+        expected = PATTERN.sub(template, CONTENT)
+    except (re.error, IndexError) as error:
+        with pytest.raises(type(error)):
+            plan_replacements(PATTERN, CONTENT, template)
+        return
+    assert applied(CONTENT, plan_replacements(PATTERN, CONTENT, template)) == expected
+
+
+def test_coalesce_merges_close_replacements():
+    content = 'a.a......................a'
+    replacements = [(0, 1, 'X'), (2, 3, 'X'), (26, 27, 'X')]
+    assert coalesce(replacements, content, merge_gap=4) == [(0, 3, 'X.X'), (26, 27, 'X')]
+    assert applied(content, coalesce(replacements, content, merge_gap=4)) == applied(content, replacements)
+
+
+class Suspendable:
+    def __init__(self):
+        self.suspended = False
+        self.seen = []
+
+
+def test_replace_all_is_one_batch_with_suspended_targets():
+    widget = FakeText('cat dog\ncat bird cat\nfish')
+    tracker = EditTracker.for_widget(widget)
+    deltas = []
+    tracker.add_listener(lambda delta: deltas.append((delta.op, delta.start, delta.end, delta.text)))
+    target = Suspendable()
+    widget.replace = lambda *args, replace=widget.replace: (target.seen.append(target.suspended), replace(*args))
+    result = ReplaceManager(widget, tracker, suspend=[target], merge_gap=5).replace_all(
+        r'c(a)t', r'\1\1', regexp=True)
+    assert widget.content == 'aa dog\naa bird aa\nfish'
+    assert (result.count, result.edits) == (3, 2)
+    assert target.seen == [True, True] and not target.suspended
+    assert widget.options['autoseparators'] is True
+    # Listeners see one delete/insert pair spanning every replacement
+    assert deltas == [('delete', (1, 0), (2, 12), 'cat dog\ncat bird cat'),
+                      ('insert', (1, 0), (1, 0), 'aa dog\naa bird aa')]
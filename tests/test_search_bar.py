@@ -0,0 +1,81 @@
+import random
+import re
+
+import pytest
+
+from src.widgets.search_bar import LazyMatchList, self_overlapping
+
+
+def matches(query, content, nocase=False, previous=None, chunk=7):
+    # Scan a literal query to the end in small steps, refining a previous list when possible
+    pattern = re.compile(re.escape(query), re.MULTILINE | (re.IGNORECASE if nocase else 0))
+    found = LazyMatchList(pattern, content, query, nocase)
+    found.refine(previous)
+    while not found.complete:
+        found.scan(chunk)
+    return found
+
+
+def expected(query, content, nocase=False):
+    pattern = re.compile(re.escape(query), re.MULTILINE | (re.IGNORECASE if nocase else 0))
+    return [match.span() for match in pattern.finditer(content)]
+
+
+@pytest.mark.parametrize('query, overlapping', [
+    ('a', False), ('ab', False), ('aa', True), ('aba', True), ('abcab', True), ('abc', False),
+])
+def test_self_overlapping(query, overlapping):
+    assert self_overlapping(query) is overlapping
+
+
+def test_self_overlapping_follows_case_folding():
+    assert not self_overlapping('aA')
+    assert self_overlapping('aA', re.IGNORECASE)
+
+
+def test_typing_past_a_self_overlapping_query():
+    content = 'aaab xx aaab'
+    shorter = matches('aa', content)
+    assert shorter.starts == [0, 8]
+    longer = matches('aab', content, previous=shorter)
+    assert longer.starts == [1, 9]
+
+
+def test_refined_matches_do_not_overlap():
+    content = 'ababab abab'
+    shorter = matches('ab', content)
+    assert list(zip(matches('aba', content, previous=shorter).starts,
+                    matches('aba', content, previous=shorter).ends)) == expected('aba', content)
+
+
+@pytest.mark.parametrize('query, longer, content', [
+    ('stra', 'straß', 'STRASSE straße Straße'),
+    ('i', 'iz', 'İz iz Iz'),
+    ('k', 'ke', 'KE Ke Ke'),  # KELVIN SIGN folds to k under re.IGNORECASE
+])
+def test_refined_nocase_matches_agree_with_re(query, longer, content):
+    shorter = matches(query, content, nocase=True)
+    refined = matches(longer, content, nocase=True, previous=shorter)
+    assert list(zip(refined.starts, refined.ends)) == expected(longer, content, nocase=True)
+
+
+def test_refinement_agrees_with_finditer():
+    rng = random.Random(7)
+    for _ in range(300):
+        content = ''.join(rng.choice('abAB \n') for _ in range(rng.randint(0, 80)))
+        nocase = rng.random() < 0.5
+        query = ''.join(rng.choice('abAB') for _ in range(rng.randint(1, 4)))
+        previous = matches(query[:-1], content, nocase) if len(query) > 1 else None
+        found = matches(query, content, nocase, previous=previous)
+        assert list(zip(found.starts, found.ends)) == expected(query, content, nocase), (query, content, nocase)
+
+
+def test_navigation_wraps_before_the_scan_completes():
+    content = 'x\n' * 50 + 'needle\n' + 'x\n' * 50 + 'needle'
+    found = LazyMatchList(re.compile('needle'), content, 'needle')
+    first = content.index('needle')
+    assert found.next_after(0) == (first, first + 6)
+    last = content.rindex('needle')
+    assert found.next_after(first) == (last, last + 6)
+    assert found.next_after(last) == (first, first + 6)
+    assert found.previous_before(first) == (last, last + 6)
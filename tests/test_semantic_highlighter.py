@@ -0,0 +1,63 @@
+from fakes import FakeText
+from src.editors.edit_tracker import EditTracker
+from src.editors.semantic_highlighter import BlockAnalyzer, SemanticHighlighter, analyze_block, split_blocks
+
+MODULE = '''import os
+
+@decorated
+def greet(name, *rest, loud=False):
+    text = f"héllo {name}"
+    return print(text.upper(), len(rest))
+
+class Greeter:
+    def run(self):
+        greet(self)
+'''
+
+
+def tagged(spans_by_tag, lines, tag):
+    # The text under a tag's spans, in order; every span here stays on one line
+    return [lines[line - 1][start:end] for line, start, _, end in sorted(spans_by_tag.get(tag, ()))]
+
+
+def test_small_module_gets_semantic_spans():
+    lines = MODULE.split('\n')
+    spans = BlockAnalyzer().analyze(MODULE)
+    assert tagged(spans, lines, 'sem_definition') == ['greet', 'Greeter', 'run']
+    assert tagged(spans, lines, 'sem_parameter') == ['name', 'rest', 'loud', 'name', 'rest', 'self', 'self']
+    assert tagged(spans, lines, 'sem_builtin') == ['print', 'len']
+    assert tagged(spans, lines, 'sem_call') == ['upper', 'greet']
+
+
+def test_blocks_split_at_top_level_statements():
+    lines = ['import os', '', '@decorated', 'def f():', '    pass', 'else_thing = 1', 'try:', '    x', 'except E:', '    y']
+    assert split_blocks(lines) == [0, 2, 5, 6]  # A decorator starts its definition's block
+    assert split_blocks(['    indented', 'x = 1']) == [0, 1]
+    assert analyze_block('def broken(:') is None
+
+
+def test_unchanged_blocks_are_not_parsed_again():
+    analyzer = BlockAnalyzer()
+    analyzer.analyze('def a():\n    pass\n\ndef b(x):\n    return x')
+    parsed = {source for source in analyzer._results}
+    analyzer._results = {source: [('sem_definition', 1, 4, 1, 7)] for source in parsed}  # Marked results
+    spans = analyzer.analyze('x = 1\ndef a():\n    pass\n\ndef b(x):\n    return x')
+    assert spans['sem_definition'] == [(2, 4, 2, 7), (5, 4, 5, 7)]  # Reused, moved down a line
+
+
+def test_highlighter_tags_the_buffer_after_the_pause():
+    widget = FakeText(MODULE)
+    highlighter = SemanticHighlighter(widget, edit_tracker=EditTracker.for_widget(widget))
+    try:
+        highlighter.schedule()
+        widget.insert('end', 'greet(1)')  # An edit restarts the pause: one pass for both
+        assert len(widget.idle) == 1
+        widget.run_idle(limit=1)
+        highlighter._executor.submit(lambda: None).result(timeout=5)
+        widget.run_idle()
+        assert widget.tagged('sem_definition') == ['greet', 'Greeter', 'run']
+        assert widget.tagged('sem_call') == ['upper', 'greet', 'greet']
+        highlighter.clear()
+        assert widget.tagged('sem_call') == []
+    finally:
+        highlighter.shutdown()
@@ -0,0 +1,63 @@
+from fakes import FakeText
+from src.editors.edit_tracker import EditTracker
+from src.editors.tag_batcher import TagBatcher
+from src.managers.search_engine import SearchEngine
+
+
+def test_set_region_sends_only_the_difference():
+    widget = FakeText('alpha beta\ngamma delta\nepsilon')
+    batcher = TagBatcher(widget, ['kw'])
+    batcher.set_region(1, 3, {'kw': [(1, 0, 1, 5), (2, 0, 2, 5)]})
+    assert widget.tagged('kw') == ['alpha', 'gamma']
+    calls = widget.tag_calls
+    batcher.set_region(1, 3, {'kw': [(1, 0, 1, 5), (3, 0, 3, 7)]})
+    assert widget.tagged('kw') == ['alpha', 'epsilon']
+    assert widget.tag_calls - calls == 2  # One remove and one add call
+    calls = widget.tag_calls
+    batcher.set_region(1, 3, {'kw': [(1, 0, 1, 5), (3, 0, 3, 7)]})
+    assert widget.tag_calls == calls  # Nothing changed, nothing sent
+
+
+def test_edited_lines_are_retagged_from_scratch():
+    widget = FakeText('alpha beta\ngamma')
+    batcher = TagBatcher(widget, ['kw'], EditTracker.for_widget(widget))
+    batcher.set_region(1, 2, {'kw': [(1, 6, 1, 10)]})
+    widget.insert('1.0', 'x\n')  # Tk moves the tag along; the record marks the touched lines unknown
+    batcher.set_region(1, 3, {'kw': [(3, 0, 3, 5)]})
+    assert widget.tagged('kw') == ['gamma']
+    assert batcher.spans() == {'kw': [(3, 0, 3, 5)]}
+
+
+def test_set_tag_after_reset_clears_stale_tags():
+    widget = FakeText('foo bar\nfoo baz')
+    engine = SearchEngine(widget)
+    batcher = TagBatcher(widget, ['search'])
+    engine.highlight('foo', 'search', tag_batcher=batcher)
+    assert widget.tagged('search') == ['foo', 'foo']
+    widget.insert('1.0', 'changed ')
+    batcher.reset()  # The content changed, so the record can't be diffed against
+    result = engine.highlight('nothing', 'search', tag_batcher=batcher)
+    assert result.count == 0
+    assert widget.tagged('search') == []
+
+
+def test_add_ranges_chunks_calls():
+    widget = FakeText('abcdef')
+    TagBatcher.add_ranges(widget, 't', ['1.0', '1.1', '1.2', '1.3', '1.4', '1.5'], max_ranges_per_call=2)
+    assert widget.tagged('t') == ['a', 'c', 'e'] and widget.tag_calls == 2
+    TagBatcher.remove_ranges(widget, 't', ['1.0', '1.3'])
+    assert widget.tagged('t') == ['e']
+
+
+class Named(FakeText):
+    # Like DocumentWidget: a __str__ that is not the Tcl path name
+    def __str__(self):
+        return 'Named(view)'
+
+
+def test_ranges_are_sent_to_the_tcl_path_not_str():
+    widget = Named('abcdef')
+    TagBatcher.add_ranges(widget, 't', ['1.0', '1.2'])
+    batcher = TagBatcher(widget, ['kw'])
+    batcher.set_region(1, 1, {'kw': [(1, 3, 1, 5)]})
+    assert widget.tagged('t') == ['ab'] and widget.tagged('kw') == ['de']
@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+from src.editors.tokenizer import CombinedTokenizer
+
+RULES = [
+    ('string', r'"[^"\n]*"'),
+    ('comment', r'#[^\n]*'),
+    ('keyword', r'\b(def|class|return)\b'),
+    ('bracket', r'[]([)]'),
+    ('number', r'\d+'),
+    ('name', r'(?P<word>[A-Za-z_]\w*)'),
+]
+BLOCKS = [('docstring', r'"""', r'(?:[^"]|"(?!""))*"""')]
+
+
+def test_earlier_tokens_swallow_later_rules():
+    tokenizer = CombinedTokenizer(RULES)
+    text = 'x = "a # b" # c'
+    assert [(text[start:end], tag) for start, end, tag in tokenizer.tokenize(text)] == [
+        ('x', 'name'), ('"a # b"', 'string'), ('# c', 'comment')]
+
+
+def test_first_listed_rule_wins_and_groups_are_stripped():
+    tokenizer = CombinedTokenizer(RULES)
+    assert tokenizer.regex.groups == len(RULES)
+    text = 'def f(x]: return 42'
+    assert [tag for _, _, tag in tokenizer.tokenize(text)] == [
+        'keyword', 'name', 'bracket', 'name', 'bracket', 'keyword', 'number']
+
+
+def test_backreferences_are_refused():
+    with pytest.raises(ValueError):
+        CombinedTokenizer([('twice', r'(?P<a>x)(?P=a)')])
+
+
+def test_multiline_state_carries_across_lines():
+    tokenizer = CombinedTokenizer(RULES, multiline_rules=BLOCKS)
+    lines = ['x = """open', 'still # inside', 'done""" # after']
+    first, state = tokenizer.tokenize_line(lines[0])
+    assert first == [(0, 1, 'name'), (4, 11, 'docstring')] and state == 0
+    middle, state = tokenizer.tokenize_line(lines[1], state)
+    assert middle == [(0, 14, 'docstring')] and state == 0
+    last, state = tokenizer.tokenize_line(lines[2], state)
+    assert last == [(0, 7, 'docstring'), (8, 15, 'comment')] and state is None
+    text = '\n'.join(lines)
+    assert list(tokenizer.tokenize(text)) == [(0, 1, 'name'), (4, 34, 'docstring'), (35, 42, 'comment')]
+
+
+def test_lines_tokenize_like_the_whole_text():
+    rng = random.Random(2)
+    tokenizer = CombinedTokenizer(RULES, multiline_rules=BLOCKS)
+    pieces = ['def', 'x1', ' ', '"s #"', '# c', '42', '(', ']', '"""', 'q', '\n', '\n']
+    for _ in range(200):
+        text = ''.join(rng.choices(pieces, k=30))
+        expected = []
+        for start, end, tag in tokenizer.tokenize(text):
+            # Split tokens spanning lines, as per-line tokenizing reports them
+            offset = start
+            for piece in text[start:end].split('\n'):
+                if piece:
+                    expected.append((offset, offset + len(piece), tag))
+                offset += len(piece) + 1
+        found, state, line_start = [], None, 0
+        for line in text.split('\n'):
+            spans, state = tokenizer.tokenize_line(line, state)
+            found.extend((line_start + start, line_start + end, tag) for start, end, tag in spans)
+            line_start += len(line) + 1
+        assert found == expected
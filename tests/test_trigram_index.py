@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from src.managers.trigram_index import NOTE_PREFIX, TrigramIndex, required_literals
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = TrigramIndex(str(tmp_path / 'index.sqlite3'), workers=1)
+    yield index
+    index.close()
+
+
+def test_required_literals_of_a_pattern():
+    assert required_literals(r'heat\s+up(date)?') == ['heat']
+    assert required_literals(r'(doc) window') == ['doc', ' window']  # A group always present counts too
+    assert required_literals(r'heat|doc') == []
+
+
+def test_search_reads_only_the_candidate_notes(index):
+    for keyword, text in [('a', 'the heat up note'), ('b', 'Heat Up again'), ('c', 'a doc window'), ('d', 'heat, up')]:
+        index.index_note(keyword, text).result()
+    assert index.candidates('heat up') == {NOTE_PREFIX + 'a', NOTE_PREFIX + 'b'}
+    statements = []
+    index._connection().set_trace_callback(statements.append)
+    assert index.search_notes('heat up') == ['a']
+    assert index.search_notes('heat up', nocase=True) == ['a', 'b']
+    assert index.search_notes(r'heat\W+up', regexp=True) == ['a', 'd']
+    index._connection().set_trace_callback(None)
+    reads = [statement for statement in statements if 'content' in statement]
+    assert reads and all('key IN (' in statement and "'flare:c'" not in statement for statement in reads)
+    assert index.search_notes('up') == ['a', 'd']  # No trigram to narrow by: every note is read
+
+
+def test_updates_change_only_the_postings_that_differ(index):
+    index.index_note('a', 'heat up').result()
+    index.index_note('a', 'doc window').result()
+    assert index.candidates('heat') == set() and index.candidates('window') == {NOTE_PREFIX + 'a'}
+    index.remove(NOTE_PREFIX + 'a')
+    assert index.candidates('window') == set()
+    assert index._connection().execute('SELECT COUNT(*) FROM postings').fetchone()[0] == 0
+
+
+def test_build_indexes_new_and_changed_files_only(index, tmp_path):
+    paths = []
+    for name, text in [('one.txt', 'heat up'), ('two.txt', 'doc window')]:
+        path = tmp_path / name
+        path.write_text(text)
+        paths.append(str(path))
+    assert index.build(paths) == 2
+    assert index.build(paths) == 0
+    os.utime(paths[1], (1, 1))
+    with open(paths[1], 'a') as file:
+        file.write(' and heat up')
+    os.utime(paths[1], (1, 1))
+    assert index.build(paths) == 1
+    assert index.candidates('heat up') == set(paths)